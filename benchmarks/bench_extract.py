@@ -0,0 +1,127 @@
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import page_parser
+from fixtures import fixture_pages
+
+
+# Site name -> scraper module providing extract_products(html, category)
+SITES = {
+    "chewy": "chewy",
+    "petsmart": "petSmart",
+    "homesalive": "homesAlive",
+    "renspets": "rensPets",
+    "petvalu": "petValu"
+}
+
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+
+# A page is flagged when it parses this much slower than the stored baseline
+TOLERANCE = 0.25
+
+
+def bench_page(extract, html, repeat):
+    """Time extract(html) and measure its peak memory."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        extract(html, "Benchmark")  # Warm up imports and caches
+
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            product_data, _ = extract(html, "Benchmark")
+            timings.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        extract(html, "Benchmark")
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    seconds = statistics.median(timings)
+    return {
+        'products': len(product_data),
+        'page_kb': round(len(html) / 1024, 1),
+        'seconds_per_page': seconds,
+        'products_per_second': len(product_data) / seconds if seconds else 0,
+        'peak_memory_mb': peak / 1024 ** 2
+    }
+
+
+def run(sites, backends, repeat):
+    """Benchmark every fixture page of every site on every backend."""
+    results = {}
+    for site in sites:
+        module = importlib.import_module(SITES[site])
+        for page_name, html in fixture_pages(site):
+            for backend in backends:
+                page_parser.set_backend(backend)
+                results[f"{site}/{page_name}/{backend}"] = bench_page(module.extract_products, html, repeat)
+    return results
+
+
+def find_regressions(results, baseline, tolerance=TOLERANCE):
+    """Return (name, baseline seconds, current seconds) for pages slower than the baseline allows."""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        expected = baseline[name]['seconds_per_page']
+        if result['seconds_per_page'] > expected * (1 + tolerance):
+            regressions.append((name, expected, result['seconds_per_page']))
+    return regressions
+
+
+def print_report(results):
+    """Print one line per benchmarked page."""
+    print(f"{'page':<45} {'KB':>8} {'products':>9} {'ms/page':>9} {'products/s':>11} {'peak MB':>8}")
+    for name, result in results.items():
+        print(f"{name:<45} {result['page_kb']:>8} {result['products']:>9} "
+              f"{result['seconds_per_page'] * 1000:>9.2f} {result['products_per_second']:>11.0f} "
+              f"{result['peak_memory_mb']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the listing-page extractors on fixture pages")
+    parser.add_argument("--sites", nargs="+", choices=sorted(SITES), default=sorted(SITES))
+    parser.add_argument("--backends", nargs="+", choices=page_parser.BACKENDS, default=list(page_parser.BACKENDS))
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per page")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="Allowed slowdown against the baseline before a page is flagged")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Write the results to {BASELINE_FILE}")
+    args = parser.parse_args()
+
+    results = run(args.sites, args.backends, args.repeat)
+    print_report(results)
+
+    if args.save_baseline:
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {BASELINE_FILE}")
+        return
+
+    if not os.path.exists(BASELINE_FILE):
+        print("No baseline stored; run with --save-baseline to create one.")
+        return
+
+    with open(BASELINE_FILE) as f:
+        baseline = json.load(f)
+    regressions = find_regressions(results, baseline, args.tolerance)
+    for name, expected, actual in regressions:
+        print(f"REGRESSION {name}: {expected * 1000:.2f} ms/page -> {actual * 1000:.2f} ms/page")
+    if regressions:
+        sys.exit(1)
+    print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
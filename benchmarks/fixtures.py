@@ -0,0 +1,135 @@
+import glob
+import gzip
+import json
+import os
+
+
+# Captured pages go in benchmarks/pages/<site>/*.html or *.html.gz (e.g. copied
+# out of the page cache); synthetic pages are generated for every site so the
+# suite also runs on a fresh checkout
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pages")
+
+# Roughly the size of the header, navigation, scripts and footer around a real
+# rendered listing page
+FILLER_BLOCKS = 1500
+
+
+def filler(blocks=FILLER_BLOCKS):
+    """Markup that the extractors must skip over, like the rest of a real page."""
+    return ''.join(
+        f'<div class="nav-item"><a href="/nav/{i}">Link {i}</a><span class="badge">{i}</span>'
+        f'<script type="application/json">{{"id": {i}, "flags": [1, 2, 3]}}</script></div>'
+        for i in range(blocks)
+    )
+
+
+def page(cards, header=''):
+    """Wrap product cards in a full HTML document."""
+    return (f'<!DOCTYPE html><html><head><title>Listing</title></head><body>'
+            f'<header>{filler()}</header>{header}<main><div class="grid">{"".join(cards)}</div></main>'
+            f'<footer>{filler()}</footer></body></html>')
+
+
+def chewy_page(count=36):
+    """A chewy.com listing page with `count` product cards."""
+    cards = [
+        f'<div class="kib-product-card__content">'
+        f'<a class="kib-product-title" href="/ca/dp/{i}"><div class="kib-product-title__text">Brand Dry Food {i}, 12-lb bag</div></a>'
+        f'<div class="kib-product-rating"><div class="kib-product-rating__rating-display">4.{i % 10}</div>'
+        f'<span class="kib-product-rating__count">{(i * 37) % 900 + 1}</span></div>'
+        f'<div class="kib-product-price kib-product-price--deal kib-product-price--md">${20 + i}.99</div>'
+        f'</div>'
+        for i in range(count)
+    ]
+    return page(cards)
+
+
+def petsmart_page(count=36):
+    """A petsmart.ca listing page with `count` product cards."""
+    cards = [
+        f'<div class="sparky-l-grid__item"><div class="sparky-c-product-card">'
+        f'<a class="sparky-c-text-link sparky-c-product-card__text-link" href="/cat/food/{i}.html">Brand Cat Food {i}</a>'
+        f'<div class="sparky-c-star-rating__icons" aria-label="4.{i % 10} out of 5 stars"></div>'
+        f'<div class="sparky-c-star-rating__rating-after">({(i * 37) % 900})</div>'
+        f'<div class="sparky-c-price sparky-c-product-card__price-group sparky-c-price--lg">${20 + i}.99</div>'
+        f'</div></div>'
+        for i in range(count)
+    ]
+    return page(cards)
+
+
+def homesalive_page(count=36):
+    """A homesalive.ca listing page with `count` product cards."""
+    cards = [
+        f'<div class="product-item-info">'
+        f'<a class="product-item-link" href="https://www.homesalive.ca/food-{i}.html">Brand Dog Food {i}</a>'
+        f'<div class="price-box price-final_price"><span class="price-container price-final_price tax weee">'
+        f'<span class="price">${20 + i}.99</span></span></div>'
+        f'<div class="yotpo-sr-bottom-line-text yotpo-sr-bottom-line-text--right-panel">{(i * 37) % 900} Reviews</div>'
+        f'</div>'
+        for i in range(count)
+    ]
+    return page(cards, f'<p class="toolbar-amount"><span class="toolbar-number">{count * 10}</span></p>')
+
+
+def renspets_page(count=36):
+    """A renspets.com listing page with `count` product cards."""
+    cards = [
+        f'<div class="product-summary">'
+        f'<a class="product-summary__link" href="/products/food-{i}"></a>'
+        f'<div class="product-summary__name">Brand Cat Food {i}</div>'
+        f'<div class="product-prices__section"><div class="product-prices__price"><span>${20 + i}.99</span></div></div>'
+        f'<div class="product-summary__rating">'
+        f'<div class="bv_averageRating_component_container"><div class="bv_text">4.{i % 10}</div></div>'
+        f'<div class="bv_numReviews_component_container"><div class="bv_text">({(i * 37) % 900})</div></div>'
+        f'</div></div>'
+        for i in range(count)
+    ]
+    return page(cards, f'<span class="browse-controls__total-products">1 - {count} of {count * 10} results</span>')
+
+
+def petvalu_page(count=36, first=0, total=None):
+    """A petvalu.ca listing page with `count` product cards, numbered from `first`, of `total` in the category."""
+    cards = [
+        f'<div class="product-tile__details">'
+        f'<div class="title"><a href="/product/food-{i}"><p>Brand</p><p>Dog Food {i}</p></a></div>'
+        f'<div class="price"><p>${20 + i}.99</p></div>'
+        f'<div class="reviews__information"><p>4.{i % 10}</p><p>({(i * 37) % 900})</p></div>'
+        f'</div>'
+        for i in range(first, first + count)
+    ]
+    header = (f'<div class="filters-sort-order-wrapper show">'
+              f'<p class="P1 semi-bold">{first + 1}-{first + count} of {total or count * 10} Products</p></div>')
+    return page(cards, header)
+
+
+def json_ld(products):
+    """A JSON-LD ItemList script listing schema.org Product objects, as embedded in a page's head."""
+    items = [{"@type": "ListItem", "position": i + 1, "item": product} for i, product in enumerate(products)]
+    return (f'<script type="application/ld+json">'
+            f'{json.dumps({"@context": "https://schema.org", "@type": "ItemList", "itemListElement": items})}'
+            f'</script>')
+
+
+SYNTHETIC_PAGES = {
+    "chewy": chewy_page,
+    "petsmart": petsmart_page,
+    "homesalive": homesalive_page,
+    "renspets": renspets_page,
+    "petvalu": petvalu_page
+}
+
+
+def captured_pages(site):
+    """Return (name, html) for every captured page of a site."""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(PAGES_DIR, site, "*.html*"))):
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
+
+
+def fixture_pages(site):
+    """Return (name, html) for the synthetic page and any captured pages of a site."""
+    return [("synthetic", SYNTHETIC_PAGES[site]())] + captured_pages(site)
@@ -0,0 +1,59 @@
+import metrics
+
+
+# Read product cards in the browser with one execute_script call, instead of
+# serializing the DOM through page_source and parsing it again in Python
+ENABLED = False
+
+# Helpers for the sites' card scripts. text() is a Tag's .text and strings() is
+# get_text(strip=True), so the records match those parsed with BeautifulSoup
+PRELUDE = """
+const text = (root, selector) => {
+    const el = root && root.querySelector(selector);
+    return el ? el.textContent : null;
+};
+const attr = (root, selector, name) => {
+    const el = root && root.querySelector(selector);
+    return el ? el.getAttribute(name) : null;
+};
+const strings = (el) => {
+    const walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT);
+    const parts = [];
+    while (walker.nextNode()) {
+        const s = walker.currentNode.nodeValue.trim();
+        if (s) parts.push(s);
+    }
+    return parts.join('');
+};
+const cards = (selector, fields) => Array.from(document.querySelectorAll(selector), fields);
+"""
+
+
+def read_cards(driver, script):
+    """Run a site's card script in the page open in the browser and return the raw fields of each card.
+
+    script is the body of a function returning an array of objects, one per
+    product container, with the fields the site's card_fields reads from the soup.
+    """
+    return driver.execute_script(PRELUDE + script) or []
+
+
+def extract(driver, script, category, parse_fields, quiet=False):
+    """Return (product records, number of product containers) read from the page open in the browser.
+
+    parse_fields(fields, category) is the post-processing the site's
+    BeautifulSoup path applies to the same fields; cards it rejects are
+    counted as parse failures there as here. quiet skips the per-card error
+    message, for sites whose BeautifulSoup path drops such cards silently.
+    """
+    with metrics.stage("extract"):
+        cards = read_cards(driver, script)
+        product_data = []
+        for fields in cards:
+            try:
+                product_data.append(parse_fields(fields, category))
+            except AttributeError as e:
+                metrics.count("parse_failures")
+                if not quiet:
+                    print(f"Error parsing product data: {e}")
+    return product_data, len(cards)
@@ -0,0 +1,278 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.remote.command import Command
+import page_cache
+import page_ready
+import structured_data
+
+
+# Number of browsers scraping categories at the same time
+POOL_SIZE = 3
+
+# Tabs of one attached browser session scraping categories at the same time,
+# for retailers that only allow a single (trusted) session
+TABS = 1
+
+# Keep browsers from downloading what the scrapers never read
+BLOCK_RESOURCES = True
+
+BLOCKED_EXTENSIONS = ["png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico",
+                      "woff", "woff2", "ttf", "otf", "eot",
+                      "mp4", "webm", "m3u8", "mp3"]
+
+# Ad, analytics and third-party widget hosts; a site whose cards are filled in by
+# one of these widgets lists it in its allowed hosts
+BLOCKED_HOSTS = ["google-analytics.com", "doubleclick.net", "googlesyndication.com", "googleadservices.com",
+                 "facebook.net", "bat.bing.com", "clarity.ms", "hotjar.com", "criteo.com", "criteo.net",
+                 "adsrvr.org", "pinterest.com", "tiktok.com", "scorecardresearch.com", "quantserve.com",
+                 "bazaarvoice.com", "yotpo.com", "powerreviews.com", "klaviyo.com", "zendesk.com"]
+
+
+def blocked_url_patterns(allowed_hosts=()):
+    """Return the Network.setBlockedURLs patterns, leaving out hosts in allowed_hosts."""
+    patterns = []
+    for extension in BLOCKED_EXTENSIONS:
+        patterns += [f"*.{extension}", f"*.{extension}?*"]
+    for host in BLOCKED_HOSTS:
+        if not any(host == allowed or host.endswith(f".{allowed}") for allowed in allowed_hosts):
+            patterns.append(f"*{host}/*")
+    return patterns
+
+
+def block_resources(driver, allowed_hosts=()):
+    """Block images, fonts, media, trackers and unneeded widgets through the DevTools protocol."""
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked_url_patterns(allowed_hosts)})
+
+
+def make_headless_driver(allowed_hosts=()):
+    """Start a headless Chrome instance with the lean profile.
+
+    allowed_hosts are third-party hosts whose scripts render data the scraper reads.
+    """
+    options = Options()
+    options.add_argument("--headless=new")
+    options.add_argument("--window-size=1920,1080")
+    if BLOCK_RESOURCES:
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        options.add_argument("--mute-audio")
+        options.add_argument("--disable-extensions")
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    driver = webdriver.Chrome(options=options)
+    if BLOCK_RESOURCES:
+        block_resources(driver, allowed_hosts)
+    return driver
+
+
+class LazyDriver:
+    """Stands in for a driver and starts the browser the first time it is used.
+
+    In fast-path mode most pages never need a browser, so none is started for them.
+    """
+
+    def __init__(self, make_driver):
+        self._make_driver = make_driver
+        self._driver = None
+
+    @property
+    def started(self):
+        return self._driver is not None
+
+    def __getattr__(self, name):
+        if self._driver is None:
+            self._driver = self._make_driver()
+        return getattr(self._driver, name)
+
+
+class _TurnLock:
+    """A lock granted in the order it was asked for, so waiting tabs take turns."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._next_ticket = 0
+        self._serving = 0
+
+    def __enter__(self):
+        with self._condition:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            self._condition.wait_for(lambda: self._serving == ticket)
+
+    def __exit__(self, *exc_info):
+        with self._condition:
+            self._serving += 1
+            self._condition.notify_all()
+
+
+class TabSession:
+    """Several tabs of one browser session, each driven by its own thread.
+
+    WebDriver talks to one tab at a time, so every command is sent as a turn:
+    the session switches to the calling thread's tab, runs the command and
+    hands over to the next tab waiting, round robin. Pages load side by side in
+    the browser while only the short commands take turns. make_driver should
+    start the session with page_load_strategy "none", so a navigation does not
+    hold the session until its page has loaded; Tab.get waits for the new
+    document instead.
+    """
+
+    def __init__(self, make_driver, allowed_hosts=()):
+        self._make_driver = make_driver
+        self.allowed_hosts = allowed_hosts
+        self.driver = None
+        self.primary = None  # The tab the session was attached to; left open at the end
+        self.open_tabs = set()
+        self._turns = _TurnLock()
+        self._local = threading.local()
+        self._current = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        driver = self._make_driver()
+        send = driver.execute
+
+        def execute(command, params=None):
+            # Elements found in a tab send their commands through here too
+            handle = getattr(self._local, 'handle', None)
+            with self._turns:
+                if handle is not None and handle != self._current:
+                    send(Command.SWITCH_TO_WINDOW, {"handle": handle})
+                    self._current = handle
+                return send(command, params)
+
+        driver.execute = execute
+        self.primary = self._current = driver.current_window_handle
+        self.driver = driver
+
+    def bind(self, handle):
+        """Send the calling thread's commands to the tab with this window handle."""
+        self._local.handle = handle
+
+    def new_tab(self):
+        """Open a tab for one worker; the first one reuses the attached tab."""
+        with self._lock:
+            if self.driver is None:
+                self._start()
+            if self.primary not in self.open_tabs:
+                handle = self.primary
+            else:
+                self.bind(None)
+                handle = self.driver.execute(Command.NEW_WINDOW, {"type": "tab"})["value"]["handle"]
+            self.open_tabs.add(handle)
+        tab = Tab(self, handle)
+        if BLOCK_RESOURCES:
+            block_resources(tab, self.allowed_hosts)  # Blocking is set per tab
+        return tab
+
+    def close_tab(self, handle):
+        """Close a worker's tab; the session ends with its last tab, leaving the attached tab open."""
+        with self._lock:
+            self.open_tabs.discard(handle)
+            if handle != self.primary:
+                self.bind(handle)
+                try:
+                    self.driver.close()
+                except WebDriverException:
+                    pass
+                self._current = None
+            if not self.open_tabs:
+                quit_driver(self.driver)
+                # A later new_tab starts a fresh session instead of reusing the one that quit
+                self.driver = None
+                self._current = None
+
+
+class Tab:
+    """One tab of a TabSession, used like a driver by the thread that holds it."""
+
+    def __init__(self, session, handle):
+        self.session = session
+        self.handle = handle
+
+    def __getattr__(self, name):
+        self.session.bind(self.handle)
+        return getattr(self.session.driver, name)
+
+    def get(self, url):
+        """Start loading url and wait until the previous document has gone."""
+        self.session.bind(self.handle)
+        driver = self.session.driver
+        driver.execute_script("window.__scraperLeaving = true;")
+        driver.get(url)
+        page_ready.wait_until(driver, lambda d: d.execute_script("return window.__scraperLeaving === undefined"),
+                              "tab navigation")
+
+    def quit(self):
+        self.session.close_tab(self.handle)
+
+
+def is_alive(driver):
+    """Check whether the browser behind a driver still responds."""
+    if isinstance(driver, LazyDriver) and not driver.started:
+        return True
+    try:
+        driver.current_url
+    except WebDriverException:
+        return False
+    return True
+
+
+def quit_driver(driver):
+    """Quit a driver, ignoring errors from browsers that already died."""
+    if driver is None or (isinstance(driver, LazyDriver) and not driver.started):
+        return
+    try:
+        driver.quit()
+    except WebDriverException:
+        pass
+
+
+def scrape_categories(categories, scrape, pool_size=POOL_SIZE, make_driver=make_headless_driver, retries=1):
+    """Run scrape(driver, category, url) for every category on a bounded pool of drivers.
+
+    Each job takes whichever driver is free. A driver that crashes is replaced and
+    the job retried up to `retries` times. Results come back in the same order as
+    `categories`. In page-cache replay mode no browsers are started and scrape is
+    called with driver=None; in fast-path mode each browser starts only when a
+    page first needs it.
+    """
+    if page_cache.REPLAY:
+        make_driver = lambda: None
+    elif structured_data.FAST_PATH:
+        make_driver = lambda start=make_driver: LazyDriver(start)
+    pool_size = max(1, min(pool_size, len(categories)))
+    drivers = queue.Queue()
+    for _ in range(pool_size):
+        drivers.put(None)  # Drivers are started on first use
+
+    def run(category, url):
+        driver = drivers.get()
+        try:
+            for attempt in range(retries + 1):
+                if driver is None or not is_alive(driver):
+                    quit_driver(driver)
+                    driver = make_driver()
+                try:
+                    print(f"Scraping {category}...")
+                    return scrape(driver, category, url)
+                except WebDriverException as e:
+                    print(f"Browser failed while scraping {category} (attempt {attempt + 1}): {e}")
+                    quit_driver(driver)
+                    driver = None
+            print(f"Giving up on {category}.")
+            return []
+        finally:
+            drivers.put(driver)
+
+    try:
+        with ThreadPoolExecutor(max_workers=pool_size) as executor:
+            results = list(executor.map(lambda item: run(*item), categories.items()))
+    finally:
+        while not drivers.empty():
+            quit_driver(drivers.get())
+
+    return results
@@ -0,0 +1,155 @@
+import csv
+import json
+import os
+import threading
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional; CSV and JSON lines need nothing extra
+    pa = None
+    pq = None
+
+
+# Write every product scraped, not just each category's top products, to one file per retailer
+ENABLED = False
+
+# Where the catalog files go, and their format
+CATALOG_DIR = "catalog"
+FORMAT = "jsonl"
+FORMATS = ("csv", "jsonl", "parquet")
+
+# Records buffered before a chunk is appended to the file
+CHUNK_SIZE = 1000
+
+# Columns of a catalog file; a retailer whose cards lack a field leaves it empty
+COLUMNS = ['Category', 'Name', 'Link', 'Review', 'Rating', 'Price']
+
+
+def schema():
+    """Column types of a Parquet catalog file."""
+    return pa.schema([
+        ("Category", pa.string()),
+        ("Name", pa.string()),
+        ("Link", pa.string()),
+        ("Review", pa.int64()),
+        ("Rating", pa.float64()),
+        ("Price", pa.string())
+    ])
+
+
+def to_row(product):
+    """Convert a scraped product record to a catalog row with every column typed."""
+    rating = product.get('Rating')
+    return {
+        'Category': product['Category'],
+        'Name': product['Name'],
+        'Link': product['Link'],
+        'Review': int(product.get('Review') or 0),
+        'Rating': float(rating) if rating is not None else None,
+        'Price': None if product.get('Price') is None else str(product['Price'])
+    }
+
+
+class CatalogWriter:
+    """Append every product of one retailer to a catalog file, a chunk at a time.
+
+    At most chunk_size records are held before they are written. Repeats are
+    not filtered here: the page loop passes each product once, at its first
+    listing, as told by the run's dedup.DedupIndex. The file is started afresh
+    by each run. Safe to share between threads.
+    """
+
+    def __init__(self, retailer, base_dir=None, fmt=None, chunk_size=None):
+        self.fmt = fmt or FORMAT
+        self.path = os.path.join(base_dir or CATALOG_DIR, f"{retailer}.{self.fmt}")
+        self.chunk_size = chunk_size or CHUNK_SIZE
+        self.rows = []
+        self.written = 0
+        self._parquet = None
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if self.fmt == "csv":
+            with open(self.path, 'w', newline='', encoding='utf-8') as f:
+                csv.DictWriter(f, COLUMNS).writeheader()
+        elif self.fmt == "jsonl":
+            open(self.path, 'w').close()
+        else:
+            self._parquet = pq.ParquetWriter(self.path, schema())
+
+    def write(self, products):
+        """Buffer the records of one page, appending a chunk once enough are held."""
+        with self._lock:
+            self.rows.extend(to_row(product) for product in products)
+            if len(self.rows) >= self.chunk_size:
+                self._flush()
+
+    def close(self):
+        """Write any buffered records and finish the file."""
+        with self._lock:
+            self._flush()
+            if self._parquet is not None:
+                self._parquet.close()
+                self._parquet = None
+
+    def _flush(self):
+        if not self.rows:
+            return
+        if self.fmt == "csv":
+            with open(self.path, 'a', newline='', encoding='utf-8') as f:
+                csv.DictWriter(f, COLUMNS).writerows(self.rows)
+        elif self.fmt == "jsonl":
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(row, ensure_ascii=False) + '\n' for row in self.rows)
+        else:
+            # Each chunk becomes one row group of the open file
+            self._parquet.write_table(pa.Table.from_pylist(self.rows, schema=schema()))
+        self.written += len(self.rows)
+        self.rows = []
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def writer_for(retailer):
+    """Return the shared writer for a retailer, or None when the catalog is off."""
+    global FORMAT
+    if not ENABLED:
+        return None
+    if FORMAT == "parquet" and pa is None:
+        print("pyarrow is not installed; the catalog is written as JSON lines instead.")
+        FORMAT = "jsonl"
+    with _writers_lock:
+        if retailer not in _writers:
+            _writers[retailer] = CatalogWriter(retailer)
+        return _writers[retailer]
+
+
+def record_page(retailer, products):
+    """Append the records of one scraped page to the retailer's catalog, if it is on."""
+    writer = writer_for(retailer)
+    if writer is not None and products:
+        writer.write(products)
+
+
+def close_all():
+    """Write every buffered record and finish the catalog files; call at the end of a run."""
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.close()
+        print(f"{writer.written} products written to {writer.path}")
+
+
+def read_catalog(path, chunk_size=None):
+    """Yield a catalog file as DataFrames of at most chunk_size rows, so it is never loaded whole."""
+    chunk_size = chunk_size or CHUNK_SIZE
+    if path.endswith(".parquet"):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    elif path.endswith(".csv"):
+        yield from pd.read_csv(path, chunksize=chunk_size)
+    else:
+        yield from pd.read_json(path, lines=True, chunksize=chunk_size)
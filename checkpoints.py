@@ -0,0 +1,82 @@
+import json
+import os
+import re
+
+
+# Where page checkpoints are written, and whether a run picks up from them
+CHECKPOINT_DIR = ".checkpoints"
+RESUME = False
+
+
+class CategoryCheckpoint:
+    """Pages of one (retailer, category) parsed so far, appended to a JSON-lines file.
+
+    Each parsed page is written as soon as it is extracted, so a crash loses at
+    most the page in progress. Without RESUME the file is started afresh. Only
+    pages restored from the file keep their records in memory; pages saved
+    during the run keep just their number.
+    """
+
+    def __init__(self, retailer, category):
+        slug = re.sub(r'[^a-z0-9]+', '-', category.lower()).strip('-')
+        self.path = os.path.join(CHECKPOINT_DIR, retailer, f"{slug}.jsonl")
+        self.pages = {}  # restored page -> (product records, number of product containers)
+        self.fingerprints = {}  # restored page -> page_fingerprint of its product links
+        self.saved = set()  # pages saved during this run
+        self.meta = {}
+        self.done = False
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        if RESUME and os.path.exists(self.path):
+            self._load()
+        else:
+            open(self.path, 'w').close()
+
+    def _load(self):
+        valid_size = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # A line cut short by a crash; it and anything after it are dropped
+                valid_size += len(line)
+                if 'page' in entry:
+                    self.pages[entry['page']] = (entry['records'], entry['count'])
+                    if entry.get('fingerprint'):
+                        self.fingerprints[entry['page']] = entry['fingerprint']
+                elif 'meta' in entry:
+                    self.meta.update(entry['meta'])
+                elif entry.get('done'):
+                    self.done = True
+
+        # New checkpoints are appended after the last complete line
+        with open(self.path, 'r+b') as f:
+            f.truncate(valid_size)
+
+    def _append(self, entry):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+
+    @property
+    def last_page(self):
+        """The highest page number with a checkpoint, or 0 if there is none."""
+        return max(self.pages.keys() | self.saved, default=0)
+
+    def save_meta(self, **meta):
+        """Store category-level facts such as the total product count."""
+        self.meta.update(meta)
+        self._append({'meta': meta})
+
+    def save_page(self, page, records, count, fingerprint=None):
+        """Store the records extracted from a page, and the fingerprint of its product links if it has one."""
+        self.saved.add(page)
+        entry = {'page': page, 'count': count, 'records': records}
+        if fingerprint is not None:
+            entry['fingerprint'] = fingerprint
+        self._append(entry)
+
+    def mark_done(self):
+        """Record that the category was scraped to the end."""
+        self.done = True
+        self._append({'done': True})
@@ -1,16 +1,16 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-import re
-import openpyxl
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
-import time
-import random
-from playwright.sync_api import sync_playwright
+import browser_pool
+import browser_extract
+import page_ready
+import page_fingerprint
+import page_parser
+import metrics
+import rate_limit
+import structured_data
+import cli
+import site_adapter
 
 
 # Define the product categories and URLs
@@ -24,8 +24,36 @@ categories = {
     "Dog Toys": "https://www.chewy.com/ca/b/toys-315"
 }
 
+# Short name used for checkpoints, stored history and log labels
+SITE = "chewy"
+
+# Selectors used to tell when a listing page has rendered
+CARD_SELECTOR = "div.kib-product-card__content"
+LINK_SELECTOR = "a.kib-product-title"
+
+# Chewy watches for bots closely, so its pace starts slow and stays capped
+rate_limit.configure("www.chewy.com", rate=0.2, max_rate=1.0)
+
+# Third-party hosts the lean browser must load; Chewy renders its cards itself
+ALLOWED_HOSTS = []
+
+# Listing order crawled with --early-stop, as a site_adapter.ListingSort. None while
+# the site's review-count sort parameter is unknown: the default order is crawled,
+# --early-stop warns that it cannot apply (unless ranking by rating), and only a bound
+# that holds on any order can stop it early. To try a parameter, set it here and run
+# with --verify-early-stop
+LISTING_SORT = None
+
+# Elements read from the page, for parser backends that only build part of the tree
+PARSE_TARGETS = [('div', 'kib-product-card__content')]
+
 def click_next_button(driver):
-    """Click the Next button on the page."""
+    """Click the Next button on the page.
+
+    Returns site_adapter.NEXT_PAGE, LAST_PAGE when the button is disabled or
+    missing from the pagination bar, or CLICK_FAILED when the click or the
+    page it should bring up failed.
+    """
     try:
         next_li = driver.find_element(By.CSS_SELECTOR, "li.kib-pagination-new__list-item--next")
         print(f"Next button HTML: {next_li.get_attribute('outerHTML')}")  # 打印 HTML 结构
@@ -37,102 +65,143 @@ def click_next_button(driver):
                 next_button = next_li.find_element(By.CSS_SELECTOR, "button")  # 查找 <button>
             except Exception:
                 print("No clickable element in Next button. Reached the last page.")
-                return False
+                return site_adapter.LAST_PAGE
 
         if "disabled" in next_button.get_attribute("class") or next_button.get_attribute("aria-disabled") == "true":
             print("Next button is disabled. Reached the last page.")
-            return False
+            return site_adapter.LAST_PAGE
 
+        marker = page_ready.capture_marker(driver, LINK_SELECTOR)
+        previous = page_fingerprint.browser_fingerprint(driver, LINK_SELECTOR)
         driver.execute_script("arguments[0].scrollIntoView(true);", next_button)
-        next_button.click()
-        time.sleep(3)
+        with rate_limit.paced(driver.current_url):
+            with metrics.stage("navigate"):
+                next_button.click()
+            page_ready.wait_until(driver, page_ready.page_changed(marker, LINK_SELECTOR), f"{SITE} next page")
+            page_ready.wait_for_listing(driver, CARD_SELECTOR, SITE)
+            if not page_fingerprint.wait_for_new_cards(driver, previous, LINK_SELECTOR, CARD_SELECTOR, SITE):
+                return site_adapter.CLICK_FAILED
     except Exception as e:
         print(f"Failed to click 'Next' button: {e}")
-        return False
-
-    return True
-
-
-def remove_duplicates(products):
-    """Remove duplicate products based on all fields."""
-    seen = set()
-    unique_products = []
+        return site_adapter.CLICK_FAILED
+
+    return site_adapter.NEXT_PAGE
+
+
+def find_product_containers(soup):
+    """Return the product containers on a listing page."""
+    return soup.find_all('div', class_='kib-product-card__content')
+
+def card_fields(product):
+    """Read the raw text of a product container's fields; missing optional fields are None."""
+    review_tag = product.find('span', class_='kib-product-rating__count')
+    rating_tag = product.find('div', class_='kib-product-rating__rating-display')
+    price_tag = product.find('div', class_='kib-product-price kib-product-price--deal kib-product-price--md')
+    link_tag = product.find('a', class_='kib-product-title')
+    return {
+        'name': product.find('div', class_='kib-product-title__text').text,
+        'link': link_tag.get('href') if link_tag else None,
+        'review': review_tag.text if review_tag else None,
+        'rating': rating_tag.text if rating_tag else None,
+        'price': price_tag.text if price_tag else None
+    }
+
+# The same fields read in the browser by browser_extract
+CARD_SCRIPT = """
+return cards('div.kib-product-card__content', card => ({
+    name: text(card, 'div.kib-product-title__text'),
+    link: attr(card, 'a.kib-product-title', 'href'),
+    review: text(card, 'span.kib-product-rating__count'),
+    rating: text(card, 'div.kib-product-rating__rating-display'),
+    price: text(card, 'div[class="kib-product-price kib-product-price--deal kib-product-price--md"]')
+}));
+"""
+
+def parse_fields(fields, category):
+    """Build a product record from a card's raw fields, read from the soup or in the browser."""
+    name = fields['name'].strip()
+    link = fields['link']
+    if link is None:
+        raise AttributeError("Product link not found")
+    if "https" not in link:
+        link = f"https://www.chewy.com{link}"
+
+    review_text = fields['review']
+    if review_text is not None:
+        if "Review" in review_text:
+            review = int(review_text.split("Review")[0].strip())
+        else:
+            review = int(review_text.replace(",", "").strip())
+    else:
+        print("No Review Data Found")
+        review = 0
+
+    rating = float(fields['rating']) if fields['rating'] is not None else 0
+
+    price = fields['price'].strip() if fields['price'] is not None else "N/A"
+
+    return {
+        'Category': category,
+        'Name': name,
+        'Link': link,
+        'Review': review,
+        'Rating': rating,
+        'Price': price
+    }
+
+def parse_product(product, category):
+    """Build a product record from a single product container."""
+    return parse_fields(card_fields(product), category)
+
+def extract_products(html, category):
+    """Parse a listing page and return (product records, number of product containers).
+
+    Works on HTML alone, without the network or a browser.
+    """
+    soup = page_parser.make_soup(html, PARSE_TARGETS)
+    products = find_product_containers(soup)
+    product_data = []
     for product in products:
-        product_tuple = tuple(product.items())  # Convert the product dict to a tuple of items
-        if product_tuple not in seen:
-            seen.add(product_tuple)
-            unique_products.append(product)
-    return unique_products
-
-def scrape_category(driver, url, category):
-    """Scrape all pages for a single category."""
-    driver.get(url)
-    # print(f"Page Source: {driver.page_source}")
-    time.sleep(random.uniform(20, 50))
-
-    all_products = []
-    page_number = 1
-
-    while True:
-        print(f"Scraping page {page_number} of {category}...")
-
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        products = soup.find_all('div', class_='kib-product-card__content')
-        print(f"Page {page_number} returned {len(products)} products.")
-
-        for product in products:
-            try:
-                name = product.find('div', class_='kib-product-title__text').text.strip()
-                link = product.find('a', class_='kib-product-title')['href']
-                if "https" not in link:
-                    link = f"https://www.chewy.com{link}"
-
-                review_tag = product.find('span', class_='kib-product-rating__count')
-                if review_tag:
-                    review_text = review_tag.text
-                    if "Review" in review_text:
-                        review = int(review_text.split("Review")[0].strip())
-                    else:
-                        review = int(review_tag.text.replace(",", "").strip())
-                else:
-                    print("No Review Data Found")
-                    review = 0
-
-                rating_tag = product.find('div', class_='kib-product-rating__rating-display')
-                rating = float(rating_tag.text) if rating_tag else 0
-
-                price_tag = product.find('div', class_='kib-product-price kib-product-price--deal kib-product-price--md')
-                price = price_tag.text.strip() if price_tag else "N/A"
-
-                if rating != 0:
-                    all_products.append({
-                        'Category': category,
-                        'Name': name,
-                        'Link': link,
-                        'Review': review,
-                        'Rating': rating,
-                        'Price': price
-                    })
-
-            except AttributeError:
-                continue
-
-        # Click the next page
-        if not click_next_button(driver):
-            break
-
-        page_number += 1
-
-    # Remove duplicates
-    all_products = remove_duplicates(all_products)
-    print("----Product Detail----")
-    print(f"Category: {category}, Count: {len(all_products)}")
-    # Sort by reviews in descending order and keep top 10
-    sorted_products = sorted(all_products, key=lambda x: x['Review'], reverse=True)[:10]
-    return sorted_products
-
-def main():
-
+        try:
+            product_record = parse_product(product, category)
+            if product_record['Rating'] != 0:
+                product_data.append(product_record)
+        except AttributeError:
+            metrics.count("parse_failures")
+            continue
+    soup.decompose()
+    return product_data, len(products)
+
+def extract_structured(html, category, page_url):
+    """Read a listing page's products from its embedded JSON-LD or hydration data.
+
+    Returns (product records, number of products), or None when the page carries none.
+    """
+    found = structured_data.product_records(html, category, page_url)
+    if found is None:
+        return None
+    product_data, product_count = found
+    # Same rule as the card parser: unrated products are left out
+    return [record for record in product_data if record['Rating'] != 0], product_count
+
+def extract_in_browser(driver, category):
+    """Read the open listing page's products in the browser, without page_source.
+
+    Returns (product records, number of product containers), like extract_products.
+    """
+    product_data, product_count = browser_extract.extract(driver, CARD_SCRIPT, category, parse_fields, quiet=True)
+    # Same rule as the card parser: unrated products are left out
+    return [record for record in product_data if record['Rating'] != 0], product_count
+
+def page_url(url, page_number):
+    """Return the URL of a listing page; Chewy serves later pages as <category url>_p<N>."""
+    if page_number == 1:
+        return url
+    base, separator, query = url.partition("?")
+    return f"{base}_p{page_number}{separator}{query}"
+
+def connect_driver(page_load_strategy="normal"):
+    """Attach to the trusted Chrome session listening on the remote debugging port."""
     # with sync_playwright() as p:
     #     browser = p.chromium.connect_over_cdp("http://127.0.0.1:9222")
     #     context = browser.contexts[0]  # 使用现有的上下文
@@ -145,28 +214,48 @@ def main():
     # 配置 ChromeOptions
     options = Options()
     options.debugger_address = "127.0.0.1:9222"  # 连接到远程调试端口
+    options.page_load_strategy = page_load_strategy
 
     # 连接到现有的 Chrome 实例
     driver = webdriver.Chrome(options=options)
+    if browser_pool.BLOCK_RESOURCES:
+        browser_pool.block_resources(driver, ALLOWED_HOSTS)
+    return driver
+
+
+def connect_tabs():
+    """Split the trusted Chrome session into tabs, one per category scraped at once (--tabs)."""
+    # Navigations return at once so one tab's page load does not hold up the others
+    return browser_pool.TabSession(lambda: connect_driver(page_load_strategy="none"), ALLOWED_HOSTS)
+
+
+# Only one trusted browser session is available, so categories run one at a time,
+# or in several tabs of that session with --tabs
+ADAPTER = site_adapter.SiteAdapter(
+    site=SITE,
+    name="Chewy",
+    categories=categories,
+    pagination=site_adapter.next_button(click_next_button, page_url),
+    extract_products=extract_products,
+    extract_structured=extract_structured,
+    extract_in_browser=extract_in_browser,
+    card_selector=CARD_SELECTOR,
+    link_selector=LINK_SELECTOR,
+    listing_sort=LISTING_SORT,
+    output_file="chewy_top_products.xlsx",
+    make_driver=connect_driver,
+    concurrency=1,
+    make_tab_session=connect_tabs
+)
 
-    all_products = []
-
-    for category, url in categories.items():
-        print(f"Scraping {category}...")
-        products = scrape_category(driver, url, category)
-        all_products.extend(products)
 
-    driver.quit()
+def main():
+    args = cli.parse_args("Scrape the top products per category from chewy.com")
 
-    # Save data to Excel
-    df = pd.DataFrame(all_products)
-    output_file = "chewy_top_products.xlsx"
-    try:
-        df.to_excel(output_file, index=False)
-        print(f"Data saved to {output_file}")
-    except Exception as e:
-        print(f"Error saving data to Excel: {e}")
+    products = site_adapter.run_site(ADAPTER, k=args.top_k, rank_by=args.rank_by)
+    print(f"Time spent waiting for pages: {page_ready.total_wait_time():.1f}s")
+    site_adapter.save_products(products, ADAPTER.output_file)
+    metrics.write_outputs()
 
 if __name__ == "__main__":
     main()
-
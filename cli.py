@@ -0,0 +1,136 @@
+import argparse
+import browser_extract
+import browser_pool
+import catalog_store
+import page_cache
+import parse_pool
+import checkpoints
+import dedup
+import early_stop
+import history_store
+import snapshot_store
+import http_client
+import metrics
+import page_parser
+import site_adapter
+import structured_data
+import top_k
+
+
+def positive_int(value):
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def build_parser(description):
+    """Return an argument parser with the options every scraper accepts."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--top-k", type=positive_int, default=top_k.TOP_K,
+                        help="Products kept per category")
+    parser.add_argument("--rank-by", type=str.capitalize, choices=sorted(top_k.RANKINGS), default=top_k.RANK_BY,
+                        help="What the top products are ranked by: review count, star rating, "
+                             "or rating weighted by review count")
+    parser.add_argument("--replay", action="store_true",
+                        help="Run the parsing pipeline from the page cache, with no network or browser")
+    parser.add_argument("--cache-dir", default=page_cache.CACHE_DIR,
+                        help="Directory holding cached pages")
+    parser.add_argument("--cache-ttl", type=float, default=page_cache.TTL,
+                        help="Seconds a cached page is used before it is revalidated")
+    parser.add_argument("--http2", action="store_true",
+                        help="Fetch pages over HTTP/2 with httpx (needs httpx[http2])")
+    parser.add_argument("--connect-timeout", type=float, default=http_client.TIMEOUT[0],
+                        help="Seconds to wait for an HTTP connection")
+    parser.add_argument("--read-timeout", type=float, default=http_client.TIMEOUT[1],
+                        help="Seconds to wait for an HTTP response")
+    parser.add_argument("--fast-path", action="store_true",
+                        help="Read products from the JSON embedded in listing pages over plain HTTP, "
+                             "starting a browser only for pages without it")
+    parser.add_argument("--no-blocking", action="store_true",
+                        help="Let browsers load images, fonts, media and trackers")
+    parser.add_argument("--browser-extract", action="store_true",
+                        help="Read product cards in the browser with one script call instead of parsing page_source "
+                             "(chewy, petSmart, homesAlive, rensPets)")
+    parser.add_argument("--tabs", type=int, default=browser_pool.TABS,
+                        help="Tabs of the one attached browser session that scrape categories at once (chewy)")
+    parser.add_argument("--parser-backend", choices=page_parser.BACKENDS, default=page_parser.PARSER_BACKEND,
+                        help="HTML parser used to read listing pages (lxml-strainer builds only the product cards)")
+    parser.add_argument("--parse-workers", type=int, default=parse_pool.PARSE_WORKERS,
+                        help="Processes parsing pages while the browser moves on (0 parses in the scraping thread)")
+    parser.add_argument("--dedup-across-categories", action="store_true",
+                        help="Count a product listed under several categories of a retailer once, "
+                             "in the first category it is seen in")
+    parser.add_argument("--early-stop", action="store_true",
+                        help="Stop paginating a category once later pages cannot change its top products")
+    parser.add_argument("--verify-early-stop", action="store_true",
+                        help="Crawl every page but report whether --early-stop would have kept the same top products")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip pages and categories already checkpointed by an earlier run")
+    parser.add_argument("--checkpoint-dir", default=checkpoints.CHECKPOINT_DIR,
+                        help="Directory holding page checkpoints")
+    parser.add_argument("--history-dir", default=history_store.HISTORY_DIR,
+                        help="Root of the Parquet history dataset")
+    parser.add_argument("--no-history", action="store_true",
+                        help="Do not append scraped pages to the history dataset")
+    parser.add_argument("--snapshot-db", default=snapshot_store.DB_FILE,
+                        help="SQLite database of daily listing snapshots")
+    parser.add_argument("--no-snapshots", action="store_true",
+                        help="Do not upsert scraped pages into the snapshot database")
+    parser.add_argument("--catalog", action="store_true",
+                        help="Write every product scraped, not just the top products, to one file per retailer "
+                             "(crawls every page, so --early-stop is ignored)")
+    parser.add_argument("--catalog-dir", default=catalog_store.CATALOG_DIR,
+                        help="Directory holding the catalog files")
+    parser.add_argument("--catalog-format", choices=catalog_store.FORMATS, default=catalog_store.FORMAT,
+                        help="Format of the catalog files (parquet needs pyarrow)")
+    parser.add_argument("--no-excel", action="store_true",
+                        help="Do not export the top products to Excel")
+    parser.add_argument("--report-file", default=metrics.REPORT_FILE,
+                        help="JSON run report with per-stage timings and counters")
+    parser.add_argument("--prometheus-file", default=metrics.PROMETHEUS_FILE,
+                        help="Also write the metrics to this Prometheus textfile-collector file")
+    parser.add_argument("--profile-page", type=int, default=metrics.PROFILE_PAGE,
+                        help="Run cProfile over the extraction of this page number (first category to reach it)")
+    return parser
+
+
+def apply_args(args):
+    """Apply parsed options to the shared modules."""
+    top_k.TOP_K = args.top_k
+    top_k.RANK_BY = args.rank_by
+    page_cache.REPLAY = args.replay
+    page_cache.CACHE_DIR = args.cache_dir
+    page_cache.TTL = args.cache_ttl
+    structured_data.FAST_PATH = args.fast_path
+    http_client.HTTP2 = args.http2
+    http_client.TIMEOUT = (args.connect_timeout, args.read_timeout)
+    browser_pool.BLOCK_RESOURCES = not args.no_blocking
+    browser_pool.TABS = args.tabs
+    browser_extract.ENABLED = args.browser_extract
+    page_parser.set_backend(args.parser_backend)
+    parse_pool.PARSE_WORKERS = args.parse_workers
+    dedup.DEDUP_ACROSS_CATEGORIES = args.dedup_across_categories
+    # A full catalog needs every page
+    early_stop.EARLY_STOP = args.early_stop and not args.catalog
+    early_stop.VERIFY = args.verify_early_stop
+    checkpoints.RESUME = args.resume
+    checkpoints.CHECKPOINT_DIR = args.checkpoint_dir
+    history_store.HISTORY_DIR = args.history_dir
+    history_store.ENABLED = not args.no_history
+    snapshot_store.DB_FILE = args.snapshot_db
+    snapshot_store.ENABLED = not args.no_snapshots
+    catalog_store.ENABLED = args.catalog
+    catalog_store.CATALOG_DIR = args.catalog_dir
+    catalog_store.FORMAT = args.catalog_format
+    site_adapter.EXPORT_EXCEL = not args.no_excel
+    metrics.REPORT_FILE = args.report_file
+    metrics.PROMETHEUS_FILE = args.prometheus_file
+    metrics.PROFILE_PAGE = args.profile_page
+    return args
+
+
+def parse_args(description, argv=None):
+    """Parse the command line and apply the options to the shared modules."""
+    return apply_args(build_parser(description).parse_args(argv))
@@ -0,0 +1,64 @@
+import threading
+from collections import Counter
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+
+# Query parameters that identify a product variant; everything else (tracking,
+# sort order, list position) is dropped from the canonical key
+KEEP_QUERY_PARAMS = ("sku", "variant")
+
+# Whether a product already seen in one category is skipped in later categories
+# (--dedup-across-categories)
+DEDUP_ACROSS_CATEGORIES = False
+
+
+def canonical_key(product):
+    """Normalize a product's Link into a key shared by every listing of that product."""
+    parts = urlsplit(product['Link'].strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    path = parts.path.rstrip('/').lower()
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query) if k.lower() in KEEP_QUERY_PARAMS))
+    return f"{host}{path}?{query}" if query else f"{host}{path}"
+
+
+class DedupIndex:
+    """Canonical keys of the products seen so far and the category each was first seen in.
+
+    By default keys are (category, link), so one index can be shared by every
+    category of a run. With across_categories=True the key is the link alone and a
+    product listed in several categories is recognised as the same product. Only
+    keys are held, not records; TopK keeps the freshest record of the products it
+    retains. across_categories defaults to DEDUP_ACROSS_CATEGORIES. The index
+    lives for one run; nothing is kept between runs. Safe to share between threads.
+    """
+
+    def __init__(self, across_categories=None):
+        self.across_categories = DEDUP_ACROSS_CATEGORIES if across_categories is None else across_categories
+        self.categories = {}
+        self.duplicates = 0
+        self.category_counts = Counter()  # category -> products first seen in it
+        self.category_duplicates = Counter()  # category -> repeats listed in it
+        self._lock = threading.Lock()
+
+    def key(self, product):
+        """Return the index key for a product."""
+        key = canonical_key(product)
+        return key if self.across_categories else (product['Category'], key)
+
+    def add(self, product):
+        """Record a product and return the category it was first seen in, or None if it is new."""
+        key = self.key(product)
+        with self._lock:
+            first_category = self.categories.get(key)
+            if first_category is None:
+                self.categories[key] = product['Category']
+                self.category_counts[product['Category']] += 1
+            else:
+                self.duplicates += 1
+                self.category_duplicates[product['Category']] += 1
+        return first_category
+
+    def __len__(self):
+        return len(self.categories)
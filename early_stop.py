@@ -0,0 +1,143 @@
+import math
+import metrics
+
+
+# Stop paginating a category as soon as later pages can no longer change its top products
+EARLY_STOP = False
+
+# Crawl every page anyway, and report whether stopping early would have kept the same top products
+VERIFY = False
+
+# Pages in a row that must leave the top products unchanged before a best-seller listing is cut off
+PATIENCE = 2
+
+# Listing orders a retailer may offer: most reviews first gives a strict bound on
+# every later product; best sellers first only tends to follow review counts
+REVIEWS = "reviews"
+POPULARITY = "popularity"
+
+MAX_RATING = 5.0
+
+
+def applies(listing_sort, rank_by):
+    """Whether a retailer's listings can be cut short: sorted by review count or best sellers, or ranked by rating."""
+    return listing_sort is not None or rank_by == "Rating"
+
+
+def listing_url(url, listing_sort):
+    """Return the category URL to crawl: the sorted listing when early stopping and the site offers one."""
+    if (EARLY_STOP or VERIFY) and listing_sort is not None:
+        return listing_sort.url(url)
+    return url
+
+
+def score_bound(rank_by, order, product_data):
+    """The highest score any product on later pages can reach, or None when nothing bounds it.
+
+    On a listing sorted by review count no later product has more reviews than
+    the fewest on this page; ratings are bounded by MAX_RATING on any listing.
+    """
+    if rank_by == "Rating":
+        return MAX_RATING
+    if order != REVIEWS or not product_data:
+        return None
+    reviews = min(product.get('Review', 0) for product in product_data)
+    if rank_by == "Review":
+        return reviews
+    if rank_by == "Weighted":
+        return MAX_RATING * math.log1p(reviews)
+    return None
+
+
+class EarlyStop:
+    """Watch a category's pages, in listing order, for the point where its top products are settled.
+
+    A page settles the top products when the best score later pages could reach
+    does not beat the k-th product held (an equal score never displaces an
+    earlier product), or, on a best-seller listing with no such bound, after
+    PATIENCE pages in a row that changed nothing. With VERIFY the crawl carries
+    on and verify() compares the settled products with the full crawl's.
+
+    A listing meant to be sorted by review count is checked as it goes: a page
+    out of that order (the site ignored the sort) turns the bound off for the
+    rest of the category.
+    """
+
+    def __init__(self, top_products, listing_sort=None):
+        self.top_products = top_products
+        self.order = listing_sort.order if listing_sort is not None and (EARLY_STOP or VERIFY) else None
+        self.settled_page = None
+        self.settled_links = None
+        self.quiet_pages = 0
+        self.changes = top_products.changes
+        self.fewest_reviews = None  # On the pages so far, for checking a review-count order
+
+    @property
+    def enabled(self):
+        """Whether this category can stop early; each page must then be parsed before the next is requested."""
+        return (EARLY_STOP or VERIFY) and (self.order is not None or self.top_products.rank_by == "Rating")
+
+    @property
+    def done(self):
+        """Whether pagination should stop now."""
+        return self.settled_page is not None and not VERIFY
+
+    def page_done(self, page, product_data):
+        """Check a page after its products were offered to the top k; return True to stop paginating."""
+        if not self.enabled or self.settled_page is not None:
+            return self.done
+        if self.order == REVIEWS and not self.in_review_order(product_data):
+            self.order = None
+            metrics.count("unsorted_listings")
+            print(f"Page {page} is not in review-count order, so the listing sort did not apply; "
+                  f"crawling every page.")
+            if not self.enabled:
+                return False
+        changed = self.top_products.changes != self.changes
+        self.changes = self.top_products.changes
+        self.quiet_pages = 0 if changed else self.quiet_pages + 1
+
+        threshold = self.top_products.threshold()
+        if threshold is None:
+            return False
+        bound = score_bound(self.top_products.rank_by, self.order, product_data)
+        if bound is not None:
+            settled = bound <= threshold
+        else:
+            settled = self.order == POPULARITY and self.quiet_pages >= PATIENCE
+        if not settled:
+            return False
+
+        self.settled_page = page
+        self.settled_links = [product['Link'] for product in self.top_products.results()]
+        metrics.count("early_stops")
+        if VERIFY:
+            print(f"Top products settled after page {page}; crawling on to verify.")
+        else:
+            print(f"Top products settled after page {page}; stopping early.")
+        return self.done
+
+    def in_review_order(self, product_data):
+        """Whether a page continues the listing in order of falling review counts."""
+        reviews = [product.get('Review', 0) for product in product_data]
+        if self.fewest_reviews is not None:
+            reviews.insert(0, self.fewest_reviews)
+        if reviews:
+            self.fewest_reviews = reviews[-1]
+        return all(earlier >= later for earlier, later in zip(reviews, reviews[1:]))
+
+    def verify(self, results):
+        """With VERIFY, compare the top products at the settling page with the full crawl's results."""
+        if not VERIFY:
+            return
+        if self.settled_page is None:
+            print("Early stop never settled; the full crawl was needed.")
+            return
+        links = [product['Link'] for product in results]
+        if links == self.settled_links:
+            metrics.count("early_stop_verified")
+            print(f"Early stop verified: stopping after page {self.settled_page} gives the same top {len(links)}.")
+        else:
+            metrics.count("early_stop_mismatches")
+            missed = [link for link in links if link not in self.settled_links]
+            print(f"Early stop after page {self.settled_page} would have been wrong; missed {missed or 'the order'}.")
@@ -0,0 +1,162 @@
+import datetime
+import threading
+import uuid
+import openpyxl
+import pandas as pd
+import price_normalize
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # The history store is optional; the scrapers run without it
+    pa = None
+    pq = None
+
+
+# Root of the Parquet dataset, partitioned as retailer=/category=/scrape_date=
+HISTORY_DIR = "history"
+
+# Records buffered per retailer before a Parquet file is written
+BATCH_SIZE = 500
+
+# Whether scraped pages are appended to the history store
+ENABLED = True
+
+PARTITION_COLS = ["retailer", "category", "scrape_date"]
+
+
+def schema():
+    """Column types of the history dataset."""
+    return pa.schema([
+        ("retailer", pa.string()),
+        ("category", pa.string()),
+        ("scrape_date", pa.string()),
+        ("scraped_at", pa.timestamp("s", tz="UTC")),
+        ("name", pa.string()),
+        ("link", pa.string()),
+        ("review", pa.int64()),
+        ("rating", pa.float64()),
+        ("price_raw", pa.string()),
+        ("price_min", pa.float64()),
+        ("price_max", pa.float64()),
+        ("price_regular", pa.float64()),
+        ("price_sale", pa.float64()),
+        ("currency", pa.string()),
+        ("price_unparsed", pa.bool_())
+    ])
+
+
+def to_row(retailer, product, scraped_at):
+    """Convert a scraped product record to a typed history row, before price normalization."""
+    rating = product.get('Rating')
+    return {
+        "retailer": retailer,
+        "category": product['Category'],
+        "scrape_date": scraped_at.date().isoformat(),
+        "scraped_at": scraped_at,
+        "name": product['Name'],
+        "link": product['Link'],
+        "review": int(product.get('Review') or 0),
+        "rating": float(rating) if rating is not None else None,
+        "price_raw": None if product.get('Price') is None else str(product['Price'])
+    }
+
+
+class HistoryWriter:
+    """Append scraped records for one retailer to the history dataset in batches.
+
+    Every flush writes new Parquet files under the right partitions and never
+    touches existing ones, so each run adds a snapshot next to the earlier ones.
+    Safe to share between threads.
+    """
+
+    def __init__(self, retailer, base_dir=None, batch_size=None):
+        self.retailer = retailer
+        self.base_dir = base_dir or HISTORY_DIR
+        self.batch_size = batch_size or BATCH_SIZE
+        self.rows = []
+        self.written = 0
+        self._lock = threading.Lock()
+
+    def write(self, products):
+        """Buffer the records of one page, flushing once a batch is full."""
+        scraped_at = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+        with self._lock:
+            self.rows.extend(to_row(self.retailer, product, scraped_at) for product in products)
+            if len(self.rows) >= self.batch_size:
+                self._flush()
+
+    def flush(self):
+        """Write any buffered records."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self.rows:
+            return
+        # Prices are normalized per batch, so the stored columns are ready for analysis
+        df = price_normalize.add_price_columns(pd.DataFrame(self.rows), column='price_raw')
+        table = pa.Table.from_pandas(df, schema=schema(), preserve_index=False)
+        pq.write_to_dataset(table, self.base_dir, partition_cols=PARTITION_COLS,
+                            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet")
+        self.written += len(self.rows)
+        self.rows = []
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def writer_for(retailer):
+    """Return the shared writer for a retailer, or None when the history store is off."""
+    global ENABLED
+    if not ENABLED:
+        return None
+    if pa is None:
+        print("pyarrow is not installed; scraped pages are not added to the history store.")
+        ENABLED = False
+        return None
+    with _writers_lock:
+        if retailer not in _writers:
+            _writers[retailer] = HistoryWriter(retailer)
+        return _writers[retailer]
+
+
+def record_page(retailer, products):
+    """Append the records of one scraped page to the history store, if it is on."""
+    writer = writer_for(retailer)
+    if writer is not None and products:
+        writer.write(products)
+
+
+def flush_all():
+    """Write every buffered record; call at the end of a run."""
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.flush()
+
+
+def read_history(base_dir=None, filters=None, columns=None):
+    """Load (part of) the history dataset into a DataFrame.
+
+    filters use pyarrow's syntax, e.g. [("retailer", "=", "chewy"), ("scrape_date", ">=", "2024-01-01")],
+    and prune whole partitions before any data is read.
+    """
+    table = pq.read_table(base_dir or HISTORY_DIR, filters=filters, columns=columns,
+                          partitioning="hive")
+    return table.to_pandas()
+
+
+def export_excel(products, output_file):
+    """Write records to Excel with openpyxl's write-only (streaming) workbook."""
+    columns = []
+    for product in products:
+        columns.extend(key for key in product if key not in columns)
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(columns)
+    for product in products:
+        sheet.append([product.get(column) for column in columns])
+    workbook.save(output_file)
@@ -1,10 +1,11 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-import time
-import openpyxl
+import browser_pool
+import browser_extract
+import page_ready
+import page_parser
+import metrics
+import structured_data
+import cli
+import site_adapter
 
 
 # Define the product categories and URLs
@@ -18,145 +19,212 @@ categories = {
     "Dog Toys": "https://www.homesalive.ca/dog/toys.html"
 }
 
-def get_total_products(soup):
-    """Extract the total number of products from the HTML."""
-    total_text = soup.find('span', class_='toolbar-number').text.strip()
-    total_products = int(total_text)
-    return total_products
+# Short name used for checkpoints, stored history and log labels
+SITE = "homesalive"
 
+# Listing pages are addressed as ?p=N
+PAGINATION = site_adapter.page_param("p")
 
-def get_product_data(driver, category, base_url):
-    """Scrape product data for a specific category."""
+# Selectors used to tell when a listing page has rendered; the review widgets
+# are injected by a third-party script after the cards appear
+CARD_SELECTOR = "div.product-item-info"
+WIDGET_SELECTOR = "div.yotpo-sr-bottom-line-text"
 
-    # Fetch the first page to get total products
-    driver.get(base_url)
-    time.sleep(5)  # 等待页面加载
-    page_source = driver.page_source
-    soup = BeautifulSoup(page_source, 'html.parser')
+# Product links, fingerprinted to catch a page number that serves an earlier page again
+LINK_SELECTOR = "a.product-item-link"
 
-    # Get total products
-    total_products = get_total_products(soup)
-    print(f"Total products for {category}: {total_products}")
+# Fields of a product record; Homes Alive cards carry no star rating
+RECORD_FIELDS = ['Category', 'Name', 'Link', 'Review', 'Price']
 
-    product_data = []
-    total_processed = 0
-    page = 1
-
-    while total_processed < total_products:
-        url = f"{base_url}?p={page}"
-        print(f"Fetching data from: {url}")
-
-        # try:
-        #     response = session.get(url, headers=headers, timeout=30)
-        #     response.raise_for_status()
-        # except requests.exceptions.RequestException as e:
-        #     print(f"Error fetching data from {url}: {e}")
-        #     break
-        #
-        # soup = BeautifulSoup(response.text, 'html.parser')
-
-        # Fetch each page to get total products
-        driver.get(url)
-        time.sleep(5)  # 等待页面加载
-        page_source = driver.page_source
-        soup = BeautifulSoup(page_source, 'html.parser')
-
-        # Find product containers (adjust selectors as needed)
-        products = soup.find_all('div', class_='product-item-info')
-        print(f"Page {page} returned {len(products)} products.")
-
-        for product in products:
-            try:
-                name_tag = product.find('a', class_='product-item-link')
-                name = name_tag.text.strip()
-                print(f"Product Name: {name}")
-                link = name_tag['href']
-                print(f"Product Link: {link}")
-
-                price_section = product.find('div', class_='price-box price-final_price')
-
-                # print(f"Price Section Info: {price_section}")
-
-                if price_section:
-                    # 查找 特价 格式的价格
-                    price_special = price_section.find('span',
-                                                     class_='special-price hidden-price')
-
-
-                    # 查找 正常价 格式的价格
-                    price_final = price_section.find('span',
-                                                     class_='price-container price-final_price tax weee')
-
-                    # 处理不同的价格情况
-                    if price_special and not price_final:
-                        price = price_special.find('span', class_='price').text.strip()
-                    elif not price_special and price_final:
-                        price = price_final.find('span', class_='price').text.strip()
-                    elif price_special and price_final:
-                        print(f"Both Price Format Found: {price_section}")
-                        price = 0
-                    else:
-                        print(f"Irregular Price Format: {price_section}")
-                        price = 0
-                else:
-                    print("Price section not found!")
-                    price = 0
-                # print(f"Price: {price}")
-
-                review_tag = product.find('div', class_='yotpo-sr-bottom-line-text yotpo-sr-bottom-line-text--right-panel')
-                review = int(review_tag.text.split('Review')[0].strip()) if review_tag else 0
-
-                product_data.append({
-                    'Category': category,
-                    'Name': name,
-                    'Link': link,
-                    'Review': review,
-                    'Price': price
-                })
-
-                total_processed += 1
-
-            except AttributeError as e:
-                print(f"Error parsing product data: {e}")
-                continue
-
-        if len(products) == 0:  # No more products found on the page
-            print("No more products found. Ending pagination.")
-            break
-
-        page += 1
-
-    # Sort by ratings in descending order and keep top 10
-    sorted_products = sorted(product_data, key=lambda x: x['Review'], reverse=True)[:10]
-
-    return sorted_products
+# Third-party hosts the lean browser must load: Yotpo injects the review counts
+ALLOWED_HOSTS = ["yotpo.com"]
 
+# Listing order crawled with --early-stop, as a site_adapter.ListingSort. None while
+# the site's review-count sort parameter is unknown: the default order is crawled,
+# --early-stop warns that it cannot apply (unless ranking by rating), and only a bound
+# that holds on any order can stop it early. To try a parameter, set it here and run
+# with --verify-early-stop
+LISTING_SORT = None
 
-def main():
-    driver = webdriver.Chrome()  # 确保安装了 ChromeDriver
-    all_products = []
+# Elements read from the page, for parser backends that only build part of the tree
+PARSE_TARGETS = [('div', 'product-item-info'), ('span', 'toolbar-number')]
+
+def get_total_products(soup):
+    """Extract the total number of products from the HTML."""
+    total_text = soup.find('span', class_='toolbar-number').text.strip()
+    total_products = int(total_text)
+    return total_products
 
-    for category, url in categories.items():
-        print(f"Scraping {category}...")
-        products = get_product_data(driver, category, url)
-        all_products.extend(products)
 
-    driver.quit()
+def count_products(html):
+    """Return the total number of products a listing page reports."""
+    soup = page_parser.make_soup(html, PARSE_TARGETS)
+    try:
+        return get_total_products(soup)
+    finally:
+        soup.decompose()
+
+
+def find_product_containers(soup):
+    """Return the product containers on a listing page."""
+    return soup.find_all('div', class_='product-item-info')
+
+
+def card_fields(product):
+    """Read the raw text of a product container's fields; missing optional fields are None.
+
+    special and final are the prices shown in the price box's special-price and
+    regular-price formats, or None when a format lacks its price span;
+    special_box and final_box tell whether each format is shown, and
+    price_section whether the box exists at all.
+    """
+    name_tag = product.find('a', class_='product-item-link')
+    price_section = product.find('div', class_='price-box price-final_price')
+    price_special = price_section.find('span', class_='special-price hidden-price') if price_section else None
+    price_final = price_section.find('span', class_='price-container price-final_price tax weee') if price_section else None
+    review_tag = product.find('div', class_='yotpo-sr-bottom-line-text yotpo-sr-bottom-line-text--right-panel')
+    special_tag = price_special.find('span', class_='price') if price_special else None
+    final_tag = price_final.find('span', class_='price') if price_final else None
+    return {
+        'name': name_tag.text,
+        'link': name_tag.get('href'),
+        'price_section': price_section is not None,
+        'special_box': price_special is not None,
+        'final_box': price_final is not None,
+        'special': special_tag.text if special_tag else None,
+        'final': final_tag.text if final_tag else None,
+        'review': review_tag.text if review_tag else None
+    }
+
+
+# The same fields read in the browser by browser_extract
+CARD_SCRIPT = """
+return cards('div.product-item-info', card => {
+    const section = card.querySelector('div[class="price-box price-final_price"]');
+    const box = selector => section && section.querySelector(selector);
+    const special = box('span[class="special-price hidden-price"]');
+    const final = box('span[class="price-container price-final_price tax weee"]');
+    return {
+        name: text(card, 'a.product-item-link'),
+        link: attr(card, 'a.product-item-link', 'href'),
+        price_section: section !== null,
+        special_box: special !== null,
+        final_box: final !== null,
+        special: text(special, 'span.price'),
+        final: text(final, 'span.price'),
+        review: text(card, 'div[class="yotpo-sr-bottom-line-text yotpo-sr-bottom-line-text--right-panel"]')
+    };
+});
+"""
+
+
+def parse_fields(fields, category):
+    """Build a product record from a card's raw fields, read from the soup or in the browser."""
+    name = fields['name'].strip()
+    if fields['link'] is None:
+        raise AttributeError("Product link not found")
+    print(f"Product Name: {name}")
+    link = fields['link']
+    print(f"Product Link: {link}")
+
+    if fields['price_section']:
+        # 处理不同的价格情况
+        # A format shown without its price span rejects the card only where its price is read
+        if fields['special_box'] and not fields['final_box']:
+            if fields['special'] is None:
+                raise AttributeError("Special price without its span")
+            price = fields['special'].strip()
+        elif not fields['special_box'] and fields['final_box']:
+            if fields['final'] is None:
+                raise AttributeError("Final price without its span")
+            price = fields['final'].strip()
+        elif fields['special_box'] and fields['final_box']:
+            print(f"Both Price Format Found: {name}")
+            price = 0
+        else:
+            print(f"Irregular Price Format: {name}")
+            price = 0
+    else:
+        print("Price section not found!")
+        price = 0
+    # print(f"Price: {price}")
+
+    review = int(fields['review'].split('Review')[0].strip()) if fields['review'] is not None else 0
+
+    return {
+        'Category': category,
+        'Name': name,
+        'Link': link,
+        'Review': review,
+        'Price': price
+    }
+
+
+def parse_product(product, category):
+    """Build a product record from a single product container."""
+    return parse_fields(card_fields(product), category)
+
+
+def extract_structured(html, category, page_url):
+    """Read a listing page's products from its embedded JSON-LD or hydration data.
+
+    Returns (product records, number of products), or None when the page carries none.
+    """
+    return structured_data.product_records(html, category, page_url, fields=RECORD_FIELDS)
+
+
+def extract_in_browser(driver, category):
+    """Read the open listing page's products in the browser, without page_source.
+
+    Returns (product records, number of product containers), like extract_products.
+    """
+    return browser_extract.extract(driver, CARD_SCRIPT, category, parse_fields)
+
+
+def extract_products(html, category):
+    """Parse a listing page and return (product records, number of product containers).
+
+    Works on HTML alone, without the network or a browser.
+    """
+    soup = page_parser.make_soup(html, PARSE_TARGETS)
+    products = find_product_containers(soup)
+    product_data = []
+    for product in products:
+        try:
+            product_data.append(parse_product(product, category))
+        except AttributeError as e:
+            metrics.count("parse_failures")
+            print(f"Error parsing product data: {e}")
+    soup.decompose()
+    return product_data, len(products)
+
+
+ADAPTER = site_adapter.SiteAdapter(
+    site=SITE,
+    name="Homes Alive",
+    categories=categories,
+    pagination=PAGINATION,
+    extract_products=extract_products,
+    extract_structured=extract_structured,
+    extract_in_browser=extract_in_browser,
+    count_products=count_products,
+    card_selector=CARD_SELECTOR,
+    widget_selector=WIDGET_SELECTOR,
+    link_selector=LINK_SELECTOR,
+    listing_sort=LISTING_SORT,
+    output_file="homesalive_top_products.xlsx",
+    make_driver=lambda: browser_pool.make_headless_driver(ALLOWED_HOSTS),
+    concurrency=browser_pool.POOL_SIZE
+)
 
-    if not all_products:
-        print("No products found. Exiting...")
-        return
 
-    # Convert to DataFrame
-    df = pd.DataFrame(all_products)
+def main():
+    args = cli.parse_args("Scrape the top products per category from homesalive.ca")
 
-    # Save to Excel
-    output_file = "homesalive_top_products.xlsx"
-    try:
-        df.to_excel(output_file, index=False)
-        print(f"Data saved to {output_file}")
-    except Exception as e:
-        print(f"Error saving data to Excel: {e}")
+    products = site_adapter.run_site(ADAPTER, k=args.top_k, rank_by=args.rank_by)
+    print(f"Time spent waiting for pages: {page_ready.total_wait_time():.1f}s")
+    site_adapter.save_products(products, ADAPTER.output_file)
+    metrics.write_outputs()
 
 if __name__ == "__main__":
     main()
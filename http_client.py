@@ -0,0 +1,120 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import brotli  # noqa: F401  urllib3 decodes br responses when a brotli module is installed
+    _ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        _ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        _ACCEPT_ENCODING = "gzip, deflate"
+
+try:
+    import httpx
+except ImportError:  # HTTP/2 is optional; requests over HTTP/1.1 keep-alive is the default
+    httpx = None
+
+
+# Hosts kept in the pool, and connections kept open per host; at least the
+# number of pages fetched at once across every scraper sharing the session
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 32
+
+# (connect, read) seconds; callers may pass their own per request
+TIMEOUT = (5, 30)
+
+# Fetch over HTTP/2 through httpx (with its h2 extra) instead of requests
+HTTP2 = False
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/86.0.4240.75 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-CA,en;q=0.9",
+    "Accept-Encoding": _ACCEPT_ENCODING,
+    "Connection": "keep-alive"
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class Http2Response:
+    """An httpx response with the parts of the requests API the scrapers use."""
+
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+
+    @property
+    def text(self):
+        return self._response.text
+
+    @property
+    def content(self):
+        return self._response.content
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} error for url: {self.url}", response=self)
+
+
+class Http2Session:
+    """Multiplexes requests over HTTP/2 connections with httpx behind a requests-style get().
+
+    httpx errors are raised as the matching requests exceptions, so callers and
+    the rate limiter handle both clients the same way.
+    """
+
+    def __init__(self):
+        limits = httpx.Limits(max_connections=POOL_MAXSIZE, max_keepalive_connections=POOL_MAXSIZE)
+        self.client = httpx.Client(http2=True, headers=HEADERS, limits=limits, follow_redirects=True)
+
+    def get(self, url, headers=None, timeout=None):
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        try:
+            return Http2Response(self.client.get(url, headers=headers,
+                                                 timeout=httpx.Timeout(read, connect=connect)))
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e))
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(str(e))
+
+    def close(self):
+        self.client.close()
+
+
+def _make_session():
+    if HTTP2:
+        if httpx is not None:
+            try:
+                return Http2Session()
+            except ImportError:
+                print("The h2 package is not installed; falling back to HTTP/1.1.")
+        else:
+            print("httpx is not installed; falling back to HTTP/1.1.")
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(HEADERS)
+    return session
+
+
+def session():
+    """Return the process-wide HTTP session, so connections are reused across categories and scrapers."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = _make_session()
+        return _session
+
+
+def timeout(seconds=None):
+    """Return the timeout for one request: seconds if given, else the configured (connect, read) pair."""
+    return TIMEOUT if seconds is None else seconds
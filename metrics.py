@@ -0,0 +1,262 @@
+import cProfile
+import datetime
+import json
+import os
+import pstats
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+# Where the run report goes, and the optional Prometheus textfile-collector output
+REPORT_FILE = "run_report.json"
+PROMETHEUS_FILE = None
+
+# Page number whose extraction is run under cProfile (once per run), or None
+PROFILE_PAGE = None
+
+# Upper bounds, in seconds, of the stage histogram buckets
+BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+
+# Labels used for work done outside any retailer/category, such as the output stage
+NO_CONTEXT = ("run", "-")
+
+_lock = threading.Lock()
+_local = threading.local()
+_histograms = {}  # (retailer, category, stage) -> Histogram
+_counters = defaultdict(int)  # (retailer, category, name) -> count
+_profiled = False
+_started_at = datetime.datetime.now(datetime.timezone.utc)
+
+
+class Histogram:
+    """Durations of one stage, bucketed like a Prometheus histogram."""
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def merge(self, other):
+        """Add the observations of another histogram of the same stage."""
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def cumulative(self):
+        """Return [(upper bound, observations at or below it)], ending with +Inf."""
+        total = 0
+        result = []
+        for bound, n in zip(BUCKETS, self.buckets):
+            total += n
+            result.append((bound, total))
+        result.append(("+Inf", self.count))
+        return result
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "total_s": round(self.sum, 4),
+            "mean_s": round(self.sum / self.count, 4) if self.count else 0.0,
+            "max_s": round(self.max, 4),
+            "buckets": {str(bound): n for bound, n in self.cumulative()}
+        }
+
+
+def current_labels():
+    """The (retailer, category) the calling thread is working on."""
+    return getattr(_local, 'labels', NO_CONTEXT)
+
+
+@contextmanager
+def context(retailer, category):
+    """Attribute every measurement made by this thread to a retailer and category."""
+    previous = current_labels()
+    _local.labels = (retailer, category)
+    try:
+        yield
+    finally:
+        _local.labels = previous
+
+
+def carry(fn):
+    """Wrap fn so it runs under the caller's retailer/category in a worker thread."""
+    labels = current_labels()
+
+    def run(*args, **kwargs):
+        with context(*labels):
+            return fn(*args, **kwargs)
+    return run
+
+
+def observe(stage_name, seconds):
+    """Record one duration of a stage."""
+    key = (*current_labels(), stage_name)
+    with _lock:
+        if key not in _histograms:
+            _histograms[key] = Histogram()
+        _histograms[key].observe(seconds)
+
+
+@contextmanager
+def stage(stage_name):
+    """Time the enclosed block as one run of a stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage_name, time.perf_counter() - start)
+
+
+def count(name, n=1):
+    """Add n to a counter such as pages, cards or parse_failures."""
+    with _lock:
+        _counters[(*current_labels(), name)] += n
+
+
+def take_counters(labels):
+    """Remove and return {name: count} for the counters recorded under labels."""
+    with _lock:
+        keys = [key for key in _counters if key[:2] == labels]
+        return {key[2]: _counters.pop(key) for key in keys}
+
+
+def take_histograms(labels):
+    """Remove and return {stage: Histogram} for the stages recorded under labels."""
+    with _lock:
+        keys = [key for key in _histograms if key[:2] == labels]
+        return {key[2]: _histograms.pop(key) for key in keys}
+
+
+def merge_histograms(histograms):
+    """Add {stage: Histogram} taken from another process to the calling thread's labels."""
+    labels = current_labels()
+    with _lock:
+        for stage_name, histogram in histograms.items():
+            key = (*labels, stage_name)
+            if key not in _histograms:
+                _histograms[key] = Histogram()
+            _histograms[key].merge(histogram)
+
+
+@contextmanager
+def profiled(page):
+    """Run the enclosed block under cProfile if it handles PROFILE_PAGE, the first time only."""
+    global _profiled
+    with _lock:
+        selected = PROFILE_PAGE is not None and page == PROFILE_PAGE and not _profiled
+        _profiled = _profiled or selected
+    if not selected:
+        yield
+        return
+
+    retailer, category = current_labels()
+    slug = re.sub(r'[^a-z0-9]+', '-', category.lower()).strip('-')
+    path = f"profile-{retailer}-{slug}-p{page}.prof"
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"Profile of {retailer} {category} page {page} saved to {path}")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+
+
+def report():
+    """Return the run's counters and stage histograms, grouped by retailer and category."""
+    finished_at = datetime.datetime.now(datetime.timezone.utc)
+    retailers = {}
+
+    def entry(retailer, category):
+        site = retailers.setdefault(retailer, {"counters": defaultdict(int), "stage_seconds": defaultdict(float),
+                                               "categories": {}})
+        return site, site["categories"].setdefault(category, {"counters": {}, "stages": {}})
+
+    with _lock:
+        for (retailer, category, name), n in sorted(_counters.items()):
+            site, group = entry(retailer, category)
+            group["counters"][name] = n
+            site["counters"][name] += n
+        for (retailer, category, name), histogram in sorted(_histograms.items()):
+            site, group = entry(retailer, category)
+            group["stages"][name] = histogram.summary()
+            site["stage_seconds"][name] += histogram.sum
+
+    for site in retailers.values():
+        site["counters"] = dict(site["counters"])
+        site["stage_seconds"] = {name: round(seconds, 4) for name, seconds in site["stage_seconds"].items()}
+
+    return {
+        "started_at": _started_at.isoformat(),
+        "finished_at": finished_at.isoformat(),
+        "duration_s": round((finished_at - _started_at).total_seconds(), 3),
+        "retailers": retailers
+    }
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def prometheus_text():
+    """Render the counters and histograms in the Prometheus text exposition format."""
+    lines = ["# HELP scraper_stage_seconds Time spent in each scraping stage",
+             "# TYPE scraper_stage_seconds histogram"]
+    with _lock:
+        histograms = sorted(_histograms.items())
+        # Lines of one metric family must be adjacent, so counters are grouped by name
+        counters = sorted(_counters.items(), key=lambda item: (item[0][2], item[0][:2]))
+
+    for (retailer, category, name), histogram in histograms:
+        for bound, n in histogram.cumulative():
+            lines.append(f"scraper_stage_seconds_bucket"
+                         f"{_labels(retailer=retailer, category=category, stage=name, le=bound)} {n}")
+        labels = _labels(retailer=retailer, category=category, stage=name)
+        lines.append(f"scraper_stage_seconds_sum{labels} {histogram.sum:.6f}")
+        lines.append(f"scraper_stage_seconds_count{labels} {histogram.count}")
+
+    typed = set()
+    for (retailer, category, name), n in counters:
+        metric = f"scraper_{name}_total"
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} counter")
+            typed.add(metric)
+        lines.append(f"{metric}{_labels(retailer=retailer, category=category)} {n}")
+    return "\n".join(lines) + "\n"
+
+
+def _write_atomic(path, text):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def write_outputs():
+    """Write the JSON run report and, if configured, the Prometheus textfile."""
+    if REPORT_FILE:
+        _write_atomic(REPORT_FILE, json.dumps(report(), indent=2, ensure_ascii=False))
+        print(f"Run report saved to {REPORT_FILE}")
+    if PROMETHEUS_FILE:
+        # Written whole and renamed into place, as the textfile collector expects
+        _write_atomic(PROMETHEUS_FILE, prometheus_text())
+        print(f"Prometheus metrics saved to {PROMETHEUS_FILE}")
@@ -0,0 +1,200 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import http_client
+import metrics
+import rate_limit
+
+
+# Where cached pages live, how long a page is served without revalidating, and
+# how large the cache may grow before the least recently used pages are evicted.
+# With no TTL every fetch is revalidated with a conditional GET, so a run never
+# records an earlier day's page as scraped today; --replay ignores the TTL
+CACHE_DIR = ".page_cache"
+TTL = 0
+MAX_SIZE = 2 * 1024 ** 3
+
+# Rendered pages are cached apart from the raw HTTP bodies of the same URL,
+# which lack the cards the front end draws
+RENDERED_PREFIX = "rendered:"
+
+# Serve every page from the cache and never touch the network or a browser
+REPLAY = False
+
+_lock = threading.Lock()
+_cache_size = None  # Bytes on disk, computed on first write
+
+
+def cache_key(url):
+    """Return the content address for a URL (or a URL with a #page=N suffix for click-through pages)."""
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def _paths(url):
+    key = cache_key(url)
+    directory = os.path.join(CACHE_DIR, key[:2])
+    return os.path.join(directory, f"{key}.html.gz"), os.path.join(directory, f"{key}.json")
+
+
+def load(url):
+    """Return (html, metadata) for a cached page, or (None, None) if it is not cached."""
+    body_path, meta_path = _paths(url)
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        with gzip.open(body_path, 'rt', encoding='utf-8') as f:
+            html = f.read()
+    except (OSError, ValueError):
+        return None, None
+    os.utime(meta_path)  # Mark as recently used for eviction
+    return html, meta
+
+
+def _entry_size(body_path, meta_path):
+    try:
+        return os.path.getsize(body_path) + os.path.getsize(meta_path)
+    except OSError:
+        return 0
+
+
+def store(url, html, etag=None, last_modified=None):
+    """Write a page and its validators to the cache."""
+    global _cache_size
+    body_path, meta_path = _paths(url)
+    os.makedirs(os.path.dirname(body_path), exist_ok=True)
+    replaced_size = _entry_size(body_path, meta_path)
+    with gzip.open(body_path, 'wt', encoding='utf-8') as f:
+        f.write(html)
+    meta = {
+        'url': url,
+        'fetched_at': time.time(),
+        'etag': etag,
+        'last_modified': last_modified
+    }
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+    with _lock:
+        if _cache_size is None:
+            _cache_size = directory_size()
+        else:
+            _cache_size += _entry_size(body_path, meta_path) - replaced_size
+        if _cache_size > MAX_SIZE:
+            _cache_size = evict(int(MAX_SIZE * 0.9))
+
+
+def touch(url):
+    """Reset a cached page's age after the server confirmed it is unchanged."""
+    _, meta_path = _paths(url)
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    meta['fetched_at'] = time.time()
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+
+def is_fresh(meta, ttl=None):
+    """Check whether a cached page is younger than the TTL."""
+    ttl = TTL if ttl is None else ttl
+    return time.time() - meta['fetched_at'] < ttl
+
+
+def _entries():
+    for root, _, files in os.walk(CACHE_DIR):
+        for name in files:
+            if name.endswith('.json'):
+                key = name[:-len('.json')]
+                yield os.path.join(root, f"{key}.html.gz"), os.path.join(root, name)
+
+
+def directory_size():
+    """Total bytes used by the cache on disk."""
+    size = 0
+    for body_path, meta_path in _entries():
+        for path in (body_path, meta_path):
+            try:
+                size += os.path.getsize(path)
+            except OSError:
+                pass
+    return size
+
+
+def evict(target_size=None):
+    """Delete least recently used pages until the cache is under target_size; return the new size."""
+    target_size = MAX_SIZE if target_size is None else target_size
+    entries = []
+    size = 0
+    for body_path, meta_path in _entries():
+        try:
+            entry_size = os.path.getsize(body_path) + os.path.getsize(meta_path)
+            entries.append((os.path.getmtime(meta_path), entry_size, body_path, meta_path))
+        except OSError:
+            continue
+        size += entry_size
+
+    for _, entry_size, body_path, meta_path in sorted(entries):
+        if size <= target_size:
+            break
+        for path in (body_path, meta_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        size -= entry_size
+    return size
+
+
+def cached_get(session, url, headers=None, timeout=None):
+    """GET a page through the cache and return its HTML, or None in replay mode when it is not cached.
+
+    Fresh pages are served from disk. Stale pages are revalidated with a
+    conditional GET and served from disk on 304 Not Modified. Requests are paced
+    and retried by rate_limit; errors left after the retries propagate to the caller.
+    """
+    html, meta = load(url)
+    if REPLAY:
+        if html is None:
+            print(f"Not in page cache, skipping: {url}")
+        return html
+    if html is not None and is_fresh(meta):
+        metrics.count("cache_hits")
+        return html
+
+    request_headers = dict(headers or {})
+    if html is not None:
+        if meta.get('etag'):
+            request_headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            request_headers['If-Modified-Since'] = meta['last_modified']
+
+    with metrics.stage("fetch"):
+        response = rate_limit.get(session, url, headers=request_headers, timeout=http_client.timeout(timeout))
+    if response.status_code == 304 and html is not None:
+        metrics.count("cache_hits")
+        touch(url)
+        return html
+    response.raise_for_status()
+    store(url, response.text, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    return response.text
+
+
+def rendered_page(driver, key):
+    """Return the page currently rendered in the browser and cache it under key.
+
+    The key is kept apart from cached_get's, so a rendered page and the raw
+    HTTP body of the same URL do not overwrite each other. In replay mode the
+    browser is not used (driver may be None) and the cached copy is returned,
+    or None if there is none.
+    """
+    if REPLAY:
+        html, _ = load(RENDERED_PREFIX + key)
+        if html is None:
+            print(f"Not in page cache, stopping: {key}")
+        return html
+    with metrics.stage("page_source"):
+        html = driver.page_source
+    store(RENDERED_PREFIX + key, html)
+    return html
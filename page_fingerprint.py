@@ -0,0 +1,89 @@
+import hashlib
+import re
+import metrics
+import page_ready
+
+
+_CLASS = re.compile(r'\bclass\s*=\s*["\']([^"\']*)["\']', re.I)
+_HREF = re.compile(r'\bhref\s*=\s*["\']([^"\']*)["\']', re.I)
+
+_BROWSER_LINKS = "return Array.from(document.querySelectorAll(arguments[0]), a => a.getAttribute('href'));"
+
+
+def fingerprint(links):
+    """Hash the product links of a page, in order, or return None for a page without any."""
+    links = list(links)
+    if not links:
+        return None
+    return hashlib.sha1('\n'.join(links).encode('utf-8')).hexdigest()[:16]
+
+
+def html_links(html, link_selector):
+    """Return the hrefs of the elements matching a tag.class selector, scanning the HTML without parsing it."""
+    tag, _, cls = link_selector.partition('.')
+    links = []
+    for match in re.finditer(rf'<{tag}\b[^>]*>', html, re.I):
+        classes = _CLASS.search(match.group(0))
+        if classes and cls in classes.group(1).split():
+            href = _HREF.search(match.group(0))
+            if href:
+                links.append(href.group(1))
+    return links
+
+
+def html_fingerprint(html, link_selector):
+    """Fingerprint a page from its HTML, before it is parsed."""
+    return fingerprint(html_links(html, link_selector))
+
+
+def browser_fingerprint(driver, link_selector):
+    """Fingerprint the page open in the browser with one script call."""
+    return fingerprint(driver.execute_script(_BROWSER_LINKS, link_selector) or [])
+
+
+def wait_for_new_cards(driver, previous, link_selector, card_selector, label):
+    """After clicking Next, check that the cards are no longer the previous page's.
+
+    previous is the browser_fingerprint taken before the click. A stall, where
+    the click has not swapped the cards yet or did nothing, is waited out once
+    more; returns False when the cards never change, so the page is not parsed
+    again and the click is reported as failed.
+    """
+    if previous is None or browser_fingerprint(driver, link_selector) != previous:
+        return True
+    metrics.count("stalls")
+    print(f"{label}: the cards did not change after clicking Next; waiting again.")
+
+    def changed(driver):
+        return browser_fingerprint(driver, link_selector) != previous
+
+    if not page_ready.wait_until(driver, changed, f"{label} new cards"):
+        print(f"{label}: still showing the previous page's cards.")
+        return False
+    page_ready.wait_for_listing(driver, card_selector, label)
+    return True
+
+
+class PageFingerprints:
+    """Fingerprints of the pages of one category loaded so far, to catch a page served twice.
+
+    Past the last page some sites serve an earlier page again (or the first
+    one), which would otherwise keep pagination going with repeated products.
+    """
+
+    def __init__(self, label):
+        self.label = label
+        self.pages = {}  # fingerprint -> first page it was seen on
+        self.by_page = {}  # page -> its fingerprint, checkpointed with the page
+
+    def repeated(self, page, page_fingerprint):
+        """Record a page's fingerprint and return the earlier page it repeats, or None."""
+        if page_fingerprint is None:
+            return None
+        self.by_page[page] = page_fingerprint
+        earlier = self.pages.setdefault(page_fingerprint, page)
+        if earlier == page:
+            return None
+        metrics.count("repeated_pages")
+        print(f"{self.label}: page {page} repeats page {earlier}. Ending pagination.")
+        return earlier
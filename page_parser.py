@@ -0,0 +1,54 @@
+from bs4 import BeautifulSoup, SoupStrainer
+import metrics
+
+
+# Parser backends:
+#   "html.parser"   - pure-Python parser over the whole document (the original behaviour)
+#   "lxml"          - lxml's C parser over the whole document
+#   "lxml-strainer" - lxml, but only the elements a site asks for are built into the tree
+BACKENDS = ("html.parser", "lxml", "lxml-strainer")
+PARSER_BACKEND = "html.parser"
+
+
+def set_backend(backend):
+    """Select the parser backend used by make_soup."""
+    global PARSER_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown parser backend {backend!r}, expected one of {BACKENDS}")
+    PARSER_BACKEND = backend
+
+
+def class_strainer(targets):
+    """Build a SoupStrainer keeping elements that match any (tag, class) pair in targets."""
+    tags = sorted({tag for tag, _ in targets})
+    classes = {cls for _, cls in targets}
+
+    def has_class(value):
+        if value is None:
+            return False
+        if isinstance(value, (list, tuple)):
+            value = ' '.join(value)
+        return bool(classes & set(value.split()))
+
+    return SoupStrainer(tags, class_=has_class)
+
+
+def make_soup(html, targets=None, backend=None):
+    """Parse a page with the configured backend.
+
+    targets lists the (tag, class) pairs a site reads from the page, e.g. the product
+    containers and the total-count element. Only the strainer backend uses them;
+    everything inside a kept element is built as usual, so extraction code written
+    against the full document works unchanged.
+    """
+    backend = backend or PARSER_BACKEND
+    with metrics.stage("parse"):
+        if backend == "html.parser":
+            return BeautifulSoup(html, 'html.parser')
+        if backend == "lxml":
+            return BeautifulSoup(html, 'lxml')
+        if backend == "lxml-strainer":
+            if not targets:
+                return BeautifulSoup(html, 'lxml')
+            return BeautifulSoup(html, 'lxml', parse_only=class_strainer(targets))
+    raise ValueError(f"Unknown parser backend {backend!r}, expected one of {BACKENDS}")
@@ -0,0 +1,117 @@
+import threading
+import time
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+import metrics
+
+
+# How long to wait for a page before giving up and parsing whatever is there
+TIMEOUT = 15
+POLL_FREQUENCY = 0.1
+
+# (label, seconds waited, ready) for every wait, so slow pages can be spotted
+wait_log = []
+_wait_log_lock = threading.Lock()
+
+
+def wait_until(driver, condition, label, timeout=None):
+    """Wait until condition(driver) holds and record how long it took.
+
+    timeout defaults to TIMEOUT. Returns True if the page became ready, False
+    if the wait timed out.
+    """
+    timeout = TIMEOUT if timeout is None else timeout
+    start = time.monotonic()
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY,
+                      ignored_exceptions=(StaleElementReferenceException,)).until(condition)
+        ready = True
+    except TimeoutException:
+        print(f"Timed out after {timeout}s waiting for {label}.")
+        ready = False
+    waited = time.monotonic() - start
+    metrics.observe("wait", waited)
+    if not ready:
+        metrics.count("wait_timeouts")
+    with _wait_log_lock:
+        wait_log.append((label, waited, ready))
+    return ready
+
+
+def document_complete(driver):
+    """The browser has finished loading the document."""
+    return driver.execute_script("return document.readyState") == "complete"
+
+
+def elements_present(selector):
+    """At least one element matches the CSS selector."""
+    def condition(driver):
+        return len(driver.find_elements(By.CSS_SELECTOR, selector)) > 0
+    return condition
+
+
+def count_stable(selector, settle=0.5):
+    """The number of matching elements is non-zero and unchanged for `settle` seconds.
+
+    Listing pages render cards in batches, so presence alone can fire too early.
+    """
+    state = {"count": None, "since": None}
+
+    def condition(driver):
+        count = len(driver.find_elements(By.CSS_SELECTOR, selector))
+        now = time.monotonic()
+        if count != state["count"]:
+            state["count"] = count
+            state["since"] = now
+            return False
+        return count > 0 and now - state["since"] >= settle
+    return condition
+
+
+def capture_marker(driver, link_selector):
+    """Remember the first product link so a page change can be detected later."""
+    try:
+        element = driver.find_element(By.CSS_SELECTOR, link_selector)
+        return element, element.get_attribute("href")
+    except (NoSuchElementException, StaleElementReferenceException):
+        return None, None
+
+
+def page_changed(marker, link_selector):
+    """The first product link is gone or points somewhere else than before.
+
+    Used after clicking Next, when the URL may not change and the old cards
+    stay on screen until the new ones are swapped in.
+    """
+    old_element, old_href = marker
+
+    def condition(driver):
+        if old_element is None:
+            return len(driver.find_elements(By.CSS_SELECTOR, link_selector)) > 0
+        try:
+            old_element.is_enabled()
+        except StaleElementReferenceException:
+            return True
+        links = driver.find_elements(By.CSS_SELECTOR, link_selector)
+        return bool(links) and links[0].get_attribute("href") != old_href
+    return condition
+
+
+def wait_for_listing(driver, card_selector, label, widget_selector=None, widget_timeout=5):
+    """Wait for a listing page: document loaded and product cards rendered and settled.
+
+    widget_selector optionally names content injected after the cards (rating
+    widgets, review counts); it gets a shorter timeout because some pages have none.
+    """
+    ready = wait_until(driver, document_complete, f"{label} document")
+    ready = wait_until(driver, count_stable(card_selector), f"{label} cards") and ready
+    if widget_selector:
+        wait_until(driver, elements_present(widget_selector), f"{label} widgets", timeout=widget_timeout)
+    return ready
+
+
+def total_wait_time():
+    """Total seconds spent in readiness waits so far."""
+    with _wait_log_lock:
+        return sum(waited for _, waited, _ in wait_log)
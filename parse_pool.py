@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+import metrics
+import page_parser
+import structured_data
+
+
+# Worker processes that parse captured pages; 0 parses in the scraping thread
+PARSE_WORKERS = min(4, os.cpu_count() or 1)
+
+# Pages of one category captured but not yet parsed before the browser waits for the parser
+MAX_PENDING = 4
+
+# Labels under which a worker process collects the counters it sends back
+WORKER_LABELS = ("parse-worker", "-")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker(backend, fast_path):
+    # Settings chosen on the command line, for start methods that do not fork
+    page_parser.set_backend(backend)
+    structured_data.FAST_PATH = fast_path
+
+
+def pool():
+    """Return the process pool shared by every pipeline, or None when PARSE_WORKERS is 0."""
+    global _pool
+    with _pool_lock:
+        if _pool is None and PARSE_WORKERS > 0:
+            _pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS, initializer=_init_worker,
+                                        initargs=(page_parser.PARSER_BACKEND, structured_data.FAST_PATH))
+        return _pool
+
+
+def _extract(extract, html, category, args):
+    """Run in a worker: extract one page and return (result, seconds, counters, stage histograms it recorded)."""
+    start = time.perf_counter()
+    with metrics.context(*WORKER_LABELS):
+        result = extract(html, category, *args)
+    return (result, time.perf_counter() - start, metrics.take_counters(WORKER_LABELS),
+            metrics.take_histograms(WORKER_LABELS))
+
+
+def _completed(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+class PagePipeline:
+    """Parse captured pages in worker processes while the browser moves on to the next page.
+
+    extract(html, category, *args) must be a module-level function so it can be
+    sent to a worker. Results reach on_page(page, product_data, product_count)
+    in page order, in the thread that submits the pages. Once max_pending pages
+    are waiting, submit blocks until the oldest is parsed, so a slow parser
+    holds the browser back instead of piling up page sources in memory.
+    """
+
+    def __init__(self, extract, category, on_page, max_pending=None):
+        self.extract = extract
+        self.category = category
+        self.on_page = on_page
+        self.max_pending = max(1, max_pending or MAX_PENDING)
+        self.pending = deque()  # (page, future)
+
+    def submit(self, page, html, *args):
+        """Queue a page's HTML for extraction."""
+        executor = pool()
+        if executor is None or page == metrics.PROFILE_PAGE:
+            with metrics.stage("extract"), metrics.profiled(page):
+                result = self.extract(html, self.category, *args)
+            future = _completed((result, None, {}, {}))
+        else:
+            future = executor.submit(_extract, self.extract, html, self.category, args)
+        self.pending.append((page, future))
+        self._deliver_ready()
+        while len(self.pending) > self.max_pending:
+            self._deliver_next()
+
+    def add_result(self, page, product_data, product_count):
+        """Queue a page that is already extracted, such as one restored from a checkpoint."""
+        self.pending.append((page, _completed(((product_data, product_count), None, {}, {}))))
+        self._deliver_ready()
+
+    def drain(self):
+        """Wait for every queued page and hand it to on_page."""
+        while self.pending:
+            self._deliver_next()
+
+    def _deliver_ready(self):
+        while self.pending and self.pending[0][1].done():
+            self._deliver_next()
+
+    def _deliver_next(self):
+        page, future = self.pending.popleft()
+        (product_data, product_count), seconds, counters, histograms = future.result()
+        if seconds is not None:
+            metrics.observe("extract", seconds)
+        for name, n in counters.items():
+            metrics.count(name, n)
+        # Stages timed inside the worker, such as parse, count as this category's too
+        metrics.merge_histograms(histograms)
+        self.on_page(page, product_data, product_count)
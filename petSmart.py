@@ -1,13 +1,14 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-import re
-import openpyxl
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import time
+import browser_pool
+import browser_extract
+import page_ready
+import page_fingerprint
+import page_parser
+import metrics
+import rate_limit
+import structured_data
+import cli
+import site_adapter
 
 
 # Define the product categories and URLs
@@ -21,115 +22,173 @@ categories = {
     "Dog Toys": "https://www.petsmart.ca/dog/toys/"
 }
 
+# Short name used for checkpoints, stored history and log labels
+SITE = "petsmart"
+
+# Selectors used to tell when a listing page has rendered
+CARD_SELECTOR = "div.sparky-l-grid__item"
+LINK_SELECTOR = "a.sparky-c-product-card__text-link"
+
+# Third-party hosts the lean browser must load; kept in case card ratings come from Bazaarvoice
+ALLOWED_HOSTS = ["bazaarvoice.com"]
+
+# Listing order crawled with --early-stop, as a site_adapter.ListingSort. None while
+# the site's review-count sort parameter is unknown: the default order is crawled,
+# --early-stop warns that it cannot apply (unless ranking by rating), and only a bound
+# that holds on any order can stop it early. To try a parameter, set it here and run
+# with --verify-early-stop
+LISTING_SORT = None
+
+# Elements read from the page, for parser backends that only build part of the tree
+PARSE_TARGETS = [('div', 'sparky-l-grid__item')]
+
 def click_next_button(driver):
-    """Click the Next button on the page."""
+    """Click the Next button on the page.
+
+    Returns site_adapter.NEXT_PAGE, LAST_PAGE when the button is disabled or
+    missing from the pagination bar, or CLICK_FAILED when the click or the
+    page it should bring up failed.
+    """
     try:
         next_button = driver.find_element(By.CSS_SELECTOR, 'li[data-testid="paginate-last-item"] > a')
         parent_li = next_button.find_element(By.XPATH, "..")
         if "disabled" in parent_li.get_attribute("class"):
             print("Reached the last page. Stopping.")
-            return False
+            return site_adapter.LAST_PAGE
 
+        marker = page_ready.capture_marker(driver, LINK_SELECTOR)
+        previous = page_fingerprint.browser_fingerprint(driver, LINK_SELECTOR)
         driver.execute_script("arguments[0].scrollIntoView(true);", next_button)
-        driver.execute_script("arguments[0].click();", next_button)
-        time.sleep(3)
+        with rate_limit.paced(driver.current_url):
+            with metrics.stage("navigate"):
+                driver.execute_script("arguments[0].click();", next_button)
+            page_ready.wait_until(driver, page_ready.page_changed(marker, LINK_SELECTOR), f"{SITE} next page")
+            page_ready.wait_for_listing(driver, CARD_SELECTOR, SITE)
+            if not page_fingerprint.wait_for_new_cards(driver, previous, LINK_SELECTOR, CARD_SELECTOR, SITE):
+                return site_adapter.CLICK_FAILED
     except Exception as e:
         print(f"Failed to click 'Next' button: {e}")
-        return False
-    return True
-
-# def remove_duplicates(products):
-#     """Remove duplicate products based on the 'Link'."""
-#     unique_products = {product['Link']: product for product in products}
-#     return list(unique_products.values())
-
-def remove_duplicates(products):
-    """Remove duplicate products based on all fields."""
-    seen = set()
-    unique_products = []
+        return site_adapter.CLICK_FAILED
+    return site_adapter.NEXT_PAGE
+
+def find_product_containers(soup):
+    """Return the product containers on a listing page."""
+    return soup.find_all('div', class_='sparky-l-grid__item')
+
+def card_fields(product):
+    """Read the raw text of a product container's fields; missing optional fields are None."""
+    link_tag = product.find('a', class_='sparky-c-text-link sparky-c-product-card__text-link')
+    review_tag = product.find('div', class_='sparky-c-star-rating__rating-after')
+    price_tag = product.find('div', class_='sparky-c-price sparky-c-product-card__price-group sparky-c-price--lg')
+    icons = product.find('div', class_='sparky-c-star-rating__icons')
+    return {
+        'name': link_tag.text,
+        'link': link_tag.get('href'),
+        'review': review_tag.text if review_tag else None,
+        'rating_icons': icons is not None,
+        'rating': icons.get('aria-label') if icons else None,
+        'price': price_tag.text if price_tag else None
+    }
+
+# The same fields read in the browser by browser_extract
+CARD_SCRIPT = """
+return cards('div.sparky-l-grid__item', card => ({
+    name: text(card, 'a[class="sparky-c-text-link sparky-c-product-card__text-link"]'),
+    link: attr(card, 'a[class="sparky-c-text-link sparky-c-product-card__text-link"]', 'href'),
+    review: text(card, 'div.sparky-c-star-rating__rating-after'),
+    rating_icons: card.querySelector('div.sparky-c-star-rating__icons') !== null,
+    rating: attr(card, 'div.sparky-c-star-rating__icons', 'aria-label'),
+    price: text(card, 'div[class="sparky-c-price sparky-c-product-card__price-group sparky-c-price--lg"]')
+}));
+"""
+
+def parse_fields(fields, category):
+    """Build a product record from a card's raw fields, read from the soup or in the browser."""
+    name = fields['name'].strip()
+    if fields['link'] is None:
+        raise AttributeError("Product link not found")
+    if not fields['rating_icons']:
+        raise AttributeError("Rating icons not found")
+    full_link = f"https://www.petsmart.com{fields['link']}"
+
+    review = int(fields['review'].strip('()')) if fields['review'] is not None else 0
+
+    rating = float(fields['rating'].split("out of")[0].strip()) if fields['rating'] else 0
+
+    price = fields['price'].strip() if fields['price'] is not None else "N/A"
+
+    return {
+        'Category': category,
+        'Name': name,
+        'Link': full_link,
+        'Review': review,
+        'Rating': rating,
+        'Price': price
+    }
+
+def parse_product(product, category):
+    """Build a product record from a single product container."""
+    return parse_fields(card_fields(product), category)
+
+def extract_products(html, category):
+    """Parse a listing page and return (product records, number of product containers).
+
+    Works on HTML alone, without the network or a browser.
+    """
+    soup = page_parser.make_soup(html, PARSE_TARGETS)
+    products = find_product_containers(soup)
+    product_data = []
     for product in products:
-        product_tuple = tuple(product.items())  # Convert the product dict to a tuple of items
-        if product_tuple not in seen:
-            seen.add(product_tuple)
-            unique_products.append(product)
-    return unique_products
-
-def scrape_category(driver, url, category):
-    """Scrape all pages for a single category."""
-    driver.get(url)
-    time.sleep(3)
-
-    all_products = []
-    page_number = 1
-
-    while True:
-        print(f"Scraping page {page_number} of {category}...")
-
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        products = soup.find_all('div', class_='sparky-l-grid__item')
-        print(f"Page {page_number} returned {len(products)} products.")
-
-        for product in products:
-            try:
-                name = product.find('a', class_='sparky-c-text-link sparky-c-product-card__text-link').text.strip()
-                link = product.find('a', class_='sparky-c-text-link sparky-c-product-card__text-link')['href']
-                full_link = f"https://www.petsmart.com{link}"
-
-                review_tag = product.find('div', class_='sparky-c-star-rating__rating-after')
-                review = int(review_tag.text.strip('()')) if review_tag else 0
-
-                rating_tag = product.find('div', class_='sparky-c-star-rating__icons')['aria-label']
-                rating = float(rating_tag.split("out of")[0].strip()) if rating_tag else 0
-
-                price_tag = product.find('div', class_='sparky-c-price sparky-c-product-card__price-group sparky-c-price--lg')
-                price = price_tag.text.strip() if price_tag else "N/A"
-
-                all_products.append({
-                    'Category': category,
-                    'Name': name,
-                    'Link': full_link,
-                    'Review': review,
-                    'Rating': rating,
-                    'Price': price
-                })
-
-            except AttributeError:
-                continue
-
-        # Click the next page
-        if not click_next_button(driver):
-            break
-
-        page_number += 1
-
-    # Remove duplicates
-    all_products = remove_duplicates(all_products)
-    print("----Product Detail----")
-    print(f"Category: {category}, Count: {len(all_products)}")
-    # Sort by reviews in descending order and keep top 10
-    sorted_products = sorted(all_products, key=lambda x: x['Review'], reverse=True)[:10]
-    return sorted_products
+        try:
+            product_data.append(parse_product(product, category))
+        except AttributeError:
+            metrics.count("parse_failures")
+            continue
+    soup.decompose()
+    return product_data, len(products)
+
+def extract_structured(html, category, page_url):
+    """Read a listing page's products from its embedded JSON-LD or hydration data.
+
+    Returns (product records, number of products), or None when the page carries none.
+    """
+    return structured_data.product_records(html, category, page_url)
+
+def extract_in_browser(driver, category):
+    """Read the open listing page's products in the browser, without page_source.
+
+    Returns (product records, number of product containers), like extract_products.
+    """
+    return browser_extract.extract(driver, CARD_SCRIPT, category, parse_fields, quiet=True)
+
+def page_url(url, page_number):
+    """Return the URL of a listing page, or None for pages only reachable through the Next button."""
+    return url if page_number == 1 else None
+
+ADAPTER = site_adapter.SiteAdapter(
+    site=SITE,
+    name="PetSmart",
+    categories=categories,
+    pagination=site_adapter.next_button(click_next_button, page_url),
+    extract_products=extract_products,
+    extract_structured=extract_structured,
+    extract_in_browser=extract_in_browser,
+    card_selector=CARD_SELECTOR,
+    link_selector=LINK_SELECTOR,
+    listing_sort=LISTING_SORT,
+    output_file="petsmart_top_products.xlsx",
+    make_driver=lambda: browser_pool.make_headless_driver(ALLOWED_HOSTS),
+    concurrency=browser_pool.POOL_SIZE
+)
 
-def main():
-    driver = webdriver.Chrome()
-    all_products = []
-
-    for category, url in categories.items():
-        print(f"Scraping {category}...")
-        products = scrape_category(driver, url, category)
-        all_products.extend(products)
 
-    driver.quit()
+def main():
+    args = cli.parse_args("Scrape the top products per category from petsmart.ca")
 
-    # Save data to Excel
-    df = pd.DataFrame(all_products)
-    output_file = "petsmart_top_products.xlsx"
-    try:
-        df.to_excel(output_file, index=False)
-        print(f"Data saved to {output_file}")
-    except Exception as e:
-        print(f"Error saving data to Excel: {e}")
+    products = site_adapter.run_site(ADAPTER, k=args.top_k, rank_by=args.rank_by)
+    print(f"Time spent waiting for pages: {page_ready.total_wait_time():.1f}s")
+    site_adapter.save_products(products, ADAPTER.output_file)
+    metrics.write_outputs()
 
 if __name__ == "__main__":
     main()
-
@@ -1,7 +1,7 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-import openpyxl
+import page_parser
+import metrics
+import cli
+import site_adapter
 
 
 # Define the product categories and URLs
@@ -15,131 +15,128 @@ categories = {
     "Dog Toys": "https://www.petvalu.ca/category/dog/toys/13046"
 }
 
+# Short name used for checkpoints, stored history and log labels
+SITE = "petvalu"
+
+# Listing pages are addressed as ?page=N
+PAGINATION = site_adapter.page_param("page")
+
+# Number of listing pages fetched in parallel per category
+PAGE_CONCURRENCY = 4
+
+# Listing order crawled with --early-stop, as a site_adapter.ListingSort. None while
+# the site's review-count sort parameter is unknown: the default order is crawled,
+# --early-stop warns that it cannot apply (unless ranking by rating), and only a bound
+# that holds on any order can stop it early. To try a parameter, set it here and run
+# with --verify-early-stop
+LISTING_SORT = None
+
+# Elements read from the page, for parser backends that only build part of the tree
+PARSE_TARGETS = [('div', 'product-tile__details'), ('div', 'filters-sort-order-wrapper')]
+
 def get_total_products(soup):
     """Extract the total number of products from the HTML."""
     total_text = soup.find('div', class_='filters-sort-order-wrapper show').find('p', class_='P1 semi-bold').text.strip()
     total_products = int(total_text.split('of')[1].split('Products')[0].strip())
     return total_products
 
-def get_product_data(category, base_url):
-    """Scrape product data for a specific category."""
-    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/86.0.4240.75 Safari/537.36"}
-    session = requests.Session()
 
-    # Fetch the first page to get total products
+def count_products(html):
+    """Return the total number of products a listing page reports."""
+    soup = page_parser.make_soup(html, PARSE_TARGETS)
     try:
-        response = session.get(base_url, headers=headers, timeout=30)
-        response.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching data from {base_url}: {e}")
-        return []
-
-    soup = BeautifulSoup(response.text, 'html.parser')
-
-    # Get total products
-    total_products = get_total_products(soup)
-    print(f"Total products for {category}: {total_products}")
-
+        return get_total_products(soup)
+    finally:
+        soup.decompose()
+
+
+def find_product_containers(soup):
+    """Return the product containers on a listing page."""
+    return soup.find_all('div', class_='product-tile__details')
+
+
+def parse_product(product, category):
+    """Build a product record from a single product container."""
+    name_tag = product.find('div', class_='title')
+    names = name_tag.find_all('p')
+    if not names:
+        raise AttributeError("Product name not found")
+    name = ' '.join(n.get_text(strip=True) for n in names)
+    # print(f"Name: {name}")
+    link_tag = name_tag.find('a')
+    if link_tag is None or link_tag.get('href') is None:
+        raise AttributeError("Product link not found")
+    link = link_tag['href']
+    full_link = f"https://www.petvalu.ca{link}"
+    price_tag = product.find('div', class_='price')
+    price = price_tag.find('p').text.strip() if price_tag else "N/A"
+    # print(f"Price: {price}")
+    review_tag = product.find('div', class_='reviews__information')
+    if review_tag:
+        rating_tag = review_tag.find('p')
+        if rating_tag:
+            rating = float(rating_tag.text.strip())
+        else:
+            rating = 0
+
+        reviews = review_tag.find_all('p')
+        if reviews:
+            review_text = ' '.join(r.get_text(strip=True) for r in reviews).split('(')[1].split(')')[0]
+            review = int(review_text)
+        else:
+            review = 0
+    else:
+        rating = 0
+        review = 0
+    # print(f"Review: {review}")
+
+    return {
+        'Category': category,
+        'Name': name,
+        'Link': full_link,
+        'Review': review,
+        'Rating': rating,
+        'Price': price
+    }
+
+
+def extract_products(html, category):
+    """Parse a listing page and return (product records, number of product containers).
+
+    Works on HTML alone, without the network or a browser.
+    """
+    soup = page_parser.make_soup(html, PARSE_TARGETS)
+    products = find_product_containers(soup)
     product_data = []
-    total_processed = 0
-    page = 1
-
-    while total_processed < total_products:
-        url = f"{base_url}?page={page}"
-        print(f"Fetching data from: {url}")
-
+    for product in products:
         try:
-            response = session.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching data from {url}: {e}")
-            break
-
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # Find product containers (adjust selectors as needed)
-        products = soup.find_all('div', class_='product-tile__details')
-        print(f"Page {page} returned {len(products)} products.")
-
-        for product in products:
-            try:
-                name_tag = product.find('div', class_='title')
-                names = name_tag.find_all('p')
-                if names:
-                    name = ' '.join(n.get_text(strip=True) for n in names)
-                    # print(f"Name: {name}")
-                link = name_tag.find('a')['href']
-                full_link = f"https://www.petvalu.ca{link}"
-                price_tag = product.find('div', class_='price')
-                price = price_tag.find('p').text.strip() if price_tag else "N/A"
-                # print(f"Price: {price}")
-                review_tag = product.find('div', class_='reviews__information')
-                if review_tag:
-                    rating_tag = review_tag.find('p')
-                    if rating_tag:
-                        rating = float(rating_tag.text.strip())
-                    else:
-                        rating = 0
-
-                    reviews = review_tag.find_all('p')
-                    if reviews:
-                        review_text = ' '.join(r.get_text(strip=True) for r in reviews).split('(')[1].split(')')[0]
-                        review = int(review_text)
-                    else:
-                        review = 0
-                else:
-                    review = 0
-                # print(f"Review: {review}")
-
-                product_data.append({
-                    'Category': category,
-                    'Name': name,
-                    'Link': full_link,
-                    'Review': review,
-                    'Rating': rating,
-                    'Price': price
-                })
-
-                total_processed += 1
-
-            except AttributeError as e:
-                print(f"Error parsing product data: {e}")
-                continue
-
-        if len(products) == 0:  # No more products found on the page
-            print("No more products found. Ending pagination.")
-            break
-
-        page += 1
-
-    # Sort by ratings in descending order and keep top 10
-    sorted_products = sorted(product_data, key=lambda x: x['Review'], reverse=True)[:10]
-
-    return sorted_products
+            product_data.append(parse_product(product, category))
+        except AttributeError as e:
+            metrics.count("parse_failures")
+            print(f"Error parsing product data: {e}")
+    soup.decompose()
+    return product_data, len(products)
+
+
+ADAPTER = site_adapter.SiteAdapter(
+    site=SITE,
+    name="Pet Valu",
+    categories=categories,
+    pagination=PAGINATION,
+    extract_products=extract_products,
+    count_products=count_products,
+    listing_sort=LISTING_SORT,
+    output_file="petvalu_top_products.xlsx",
+    page_concurrency=PAGE_CONCURRENCY
+)
 
 
 def main():
-    all_products = []
-
-    for category, url in categories.items():
-        print(f"Scraping {category}...")
-        products = get_product_data(category, url)
-        all_products.extend(products)
+    args = cli.parse_args("Scrape the top products per category from petvalu.ca")
 
-    if not all_products:
-        print("No products found. Exiting...")
-        return
-
-    # Convert to DataFrame
-    df = pd.DataFrame(all_products)
-
-    # Save to Excel
-    output_file = "petvalu_top_products.xlsx"
-    try:
-        df.to_excel(output_file, index=False)
-        print(f"Data saved to {output_file}")
-    except Exception as e:
-        print(f"Error saving data to Excel: {e}")
+    products = site_adapter.run_site(ADAPTER, k=args.top_k, rank_by=args.rank_by)
+    site_adapter.save_products(products, ADAPTER.output_file)
+    metrics.write_outputs()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+
+# Every retailer we scrape lists prices in Canadian dollars, so a bare "$" means CAD
+DEFAULT_CURRENCY = "CAD"
+
+# Explicit currency markers, checked before the default applies
+CURRENCY_MARKERS = {
+    "CAD": "CAD",
+    "CA$": "CAD",
+    "C$": "CAD",
+    "USD": "USD",
+    "US$": "USD",
+    "€": "EUR",
+    "£": "GBP"
+}
+
+PRICE_COLUMNS = ["price_min", "price_max", "price_regular", "price_sale", "currency", "price_unparsed"]
+
+_AMOUNT = r'(\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)'
+_DECIMAL_COMMA = r'(\d),(\d{2})(?!\d)'
+_RANGE = r'\d\s*(?:[-–—]|\bto\b)\s*(?:[A-Z]{0,2}\$|[€£])?\s*\d'
+_MARKER = '(' + '|'.join(sorted((m.replace('$', r'\$') for m in CURRENCY_MARKERS), key=len, reverse=True)) + ')'
+
+
+def normalize_prices(prices, default_currency=None):
+    """Turn raw Price values into numeric price columns, one row per value.
+
+    Works on the whole column at once with pandas string operations:
+    - one amount ("$12.99") is the regular price;
+    - two or more amounts joined by "-", "–" or "to" are a range, with only min and max set;
+    - two or more amounts otherwise (a deal next to a struck-out price) give the lowest
+      as the sale price and the highest as the regular price.
+    Values with no positive amount ("N/A", "Conflict in price data", the 0 fallback)
+    are left empty and flagged in price_unparsed.
+    """
+    raw = pd.Series(prices)
+    # Historical columns repeat the same few thousand price strings, so each
+    # distinct value is parsed once and the results are spread back out
+    codes, uniques = pd.factorize(raw.astype("string"), use_na_sentinel=False)
+    result = _normalize_distinct(pd.Series(uniques, dtype="string"),
+                                 default_currency or DEFAULT_CURRENCY).take(codes)
+    result.index = raw.index
+    return result
+
+
+def _normalize_distinct(text, currency_default):
+    text = (text.str.replace('\xa0', ' ', regex=False)
+            .str.replace(_DECIMAL_COMMA, r'\1.\2', regex=True))
+
+    amounts = text.str.extractall(_AMOUNT)[0].str.replace(',', '', regex=False).astype(float)
+    amounts = amounts[amounts > 0]
+    per_value = amounts.groupby(level=0)
+    price_min = per_value.min().reindex(text.index)
+    price_max = per_value.max().reindex(text.index)
+    count = per_value.size().reindex(text.index, fill_value=0)
+
+    is_range = text.str.contains(_RANGE, regex=True).fillna(False).astype(bool)
+    single = (count == 1) | ((count > 1) & ~is_range & (price_min == price_max))
+    deal = (count > 1) & ~is_range & (price_min < price_max)
+
+    parsed = count > 0
+    currency = text.str.extract(_MARKER, expand=False).map(CURRENCY_MARKERS)
+    currency = currency.where(currency.notna() | ~parsed, currency_default)
+
+    return pd.DataFrame({
+        "price_min": price_min,
+        "price_max": price_max,
+        "price_regular": np.where(single | deal, price_max, np.nan),
+        "price_sale": np.where(deal, price_min, np.nan),
+        "currency": currency.astype(object).where(parsed, None),
+        "price_unparsed": ~parsed
+    })
+
+
+def add_price_columns(df, column='Price', default_currency=None):
+    """Return df with the normalized price columns of df[column] appended."""
+    return df.join(normalize_prices(df[column], default_currency))
@@ -0,0 +1,352 @@
+import hashlib
+import math
+import re
+import unicodedata
+from collections import defaultdict
+import dedup
+import metrics
+
+
+# Score two names must reach to be listed as the same product
+MATCH_THRESHOLD = 0.55
+
+# Tokens in more names than this are too common to block on (they still count in the score)
+MAX_POSTING = 400
+
+# Rare tokens two names must share before they are scored
+MIN_SHARED_TOKENS = 2
+
+# Relative difference under which two pack sizes count as the same (7.25 kg vs 7.26 kg)
+SIZE_TOLERANCE = 0.03
+
+# Product lines and the brand each is listed under; longer aliases are tried first
+BRANDS = {
+    "purina pro plan": "purina pro plan",
+    "pro plan": "purina pro plan",
+    "purina one": "purina one",
+    "cat chow": "purina cat chow",
+    "dog chow": "purina dog chow",
+    "fancy feast": "purina fancy feast",
+    "friskies": "purina friskies",
+    "beneful": "purina beneful",
+    "hill's science diet": "hill's science diet",
+    "hills science diet": "hill's science diet",
+    "science diet": "hill's science diet",
+    "hill's prescription diet": "hill's prescription diet",
+    "royal canin": "royal canin",
+    "blue buffalo": "blue buffalo",
+    "iams": "iams",
+    "acana": "acana",
+    "orijen": "orijen",
+    "meow mix": "meow mix",
+    "instinct": "instinct",
+    "farmina": "farmina",
+    "wellness": "wellness",
+    "taste of the wild": "taste of the wild",
+    "nutro": "nutro",
+    "fromm": "fromm",
+    "go! solutions": "go! solutions",
+    "now fresh": "now fresh",
+    "open farm": "open farm",
+    "stella & chewy's": "stella & chewy's",
+    "merrick": "merrick",
+    "natural balance": "natural balance",
+    "nulo": "nulo",
+    "weruva": "weruva",
+    "tiki cat": "tiki cat",
+    "ziwi peak": "ziwi peak",
+    "canidae": "canidae",
+    "pedigree": "pedigree",
+    "cesar": "cesar",
+    "temptations": "temptations",
+    "greenies": "greenies",
+    "sheba": "sheba",
+    "whiskas": "whiskas",
+    "rachael ray nutrish": "rachael ray nutrish",
+    "nutrience": "nutrience",
+    "kong": "kong",
+    "nylabone": "nylabone"
+}
+
+# Grams or millilitres per unit
+UNITS = {
+    "kg": (1000.0, "g"), "kgs": (1000.0, "g"), "g": (1.0, "g"), "gm": (1.0, "g"),
+    "lb": (453.592, "g"), "lbs": (453.592, "g"), "oz": (28.3495, "g"),
+    "ml": (1.0, "ml"), "l": (1000.0, "ml"), "litre": (1000.0, "ml"), "liter": (1000.0, "ml")
+}
+
+# Words that name a flavour, life stage, species or form; two names that both give
+# one of these and disagree are different products however similar the rest is
+FLAVOURS = {"chicken", "turkey", "salmon", "beef", "lamb", "duck", "fish", "tuna", "rabbit", "venison",
+            "pork", "whitefish", "trout", "herring", "cod", "sardine", "mackerel", "bison", "boar",
+            "quail", "goat", "kangaroo", "shrimp", "crab", "liver", "pollock", "ocean", "seafood"}
+LIFE_STAGES = {"kitten": "young", "puppy": "young", "adult": "adult", "senior": "senior", "mature": "senior"}
+SPECIES = {"cat": "cat", "cats": "cat", "feline": "cat", "kitten": "cat",
+           "dog": "dog", "dogs": "dog", "canine": "dog", "puppy": "dog"}
+FORMS = {"dry": "dry", "kibble": "dry", "wet": "wet", "can": "wet", "canned": "wet", "pate": "wet", "stew": "wet"}
+
+# Abbreviations retailers use, spelled out
+SYNONYMS = {"feline": "cat", "canine": "dog", "mngmnt": "management", "mgmt": "management",
+            "spec": "specialized", "wt": "weight", "lrg": "large",
+            "sm": "small", "cats": "cat", "dogs": "dog"}
+
+# Words that say nothing about which product a name is
+STOPWORDS = {"and", "with", "for", "the", "of", "a", "in", "food", "formula", "recipe", "bag", "real",
+             "complete", "natural", "new", "plus", "size", "count", "ct", "pack", "case"}
+
+_SIZE = re.compile(r'(\d+(?:\.\d+)?)\s*-?\s*(kgs?|gm?|lbs?|oz|ml|l|litre|liter)\b')
+_PACK = re.compile(r'\b(?:(?:pack|case|box) of\s*(\d+)|(\d+)\s*-?\s*(?:pack|pk|ct|count)\b|(\d+)\s*x\b)')
+_CAMEL = re.compile(r'(?<=[a-z])(?=[A-Z])')
+_TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_BRAND = re.compile(r'\b(' + '|'.join(re.escape(alias) for alias in sorted(BRANDS, key=len, reverse=True)) + r')\b')
+
+
+class ProductName:
+    """The parts of a product name that decide whether two listings are the same product."""
+
+    def __init__(self, brand, size, unit, pack, flavours, life_stage, species, form, tokens):
+        self.brand = brand
+        self.size = size
+        self.unit = unit
+        self.pack = pack
+        self.flavours = flavours
+        self.life_stage = life_stage
+        self.species = species
+        self.form = form
+        self.tokens = tokens
+
+    def signature(self):
+        """A stable text form of the name, used to derive product IDs."""
+        size = f"{self.size:.0f}{self.unit}" if self.size else ""
+        return "|".join([self.brand or "", " ".join(sorted(self.tokens)), size, str(self.pack or "")])
+
+
+def _clean(name):
+    text = str(name)
+    if not text.isascii():
+        # Marks like ™ and ® (and their mis-decoded control characters) go before NFKD turns ™ into "TM"
+        text = "".join(c for c in text if unicodedata.category(c) not in ("So", "Cc"))
+        text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    # Joined words like "FelineAdult-SpecIndoorHairball" are split at each capital
+    text = _CAMEL.sub(" ", text).lower().replace("’", "'")
+    return re.sub(r'\s+', ' ', text.replace("&", " & ")).strip()
+
+
+def normalize_name(name):
+    """Split a free-text product name into brand, size, pack count, flavours and content tokens.
+
+    The brand is a known product line from BRANDS, or else the name's first word.
+    """
+    text = _clean(name)
+
+    match = _BRAND.search(text)
+    if match:
+        brand = BRANDS[match.group(1)]
+        text = text[:match.start()] + " " + text[match.end():]
+    else:
+        # Names start with the brand, so an unknown brand is taken to be the first word
+        brand = next((word for word in _TOKEN.findall(text) if word not in STOPWORDS), None)
+
+    size = unit = None
+    sizes = _SIZE.findall(text)
+    if sizes:
+        amount, unit_name = sizes[0]
+        factor, unit = UNITS[unit_name]
+        size = float(amount) * factor
+        text = _SIZE.sub(" ", text)
+
+    pack = None
+    packs = _PACK.search(text)
+    if packs:
+        pack = int(next(group for group in packs.groups() if group))
+        text = _PACK.sub(" ", text)
+    if pack == 1:
+        pack = None
+
+    words = [SYNONYMS.get(word, word) for word in _TOKEN.findall(text)]
+    raw = set(_TOKEN.findall(text))
+    stages = {LIFE_STAGES[word] for word in raw if word in LIFE_STAGES}
+    species = {SPECIES[word] for word in raw if word in SPECIES}
+    forms = {FORMS[word] for word in raw if word in FORMS}
+    tokens = {word for word in words if word not in STOPWORDS and not word.isdigit()}
+    return ProductName(brand, size, unit, pack,
+                       frozenset(word for word in tokens if word in FLAVOURS),
+                       next(iter(stages)) if len(stages) == 1 else None,
+                       next(iter(species)) if len(species) == 1 else None,
+                       next(iter(forms)) if len(forms) == 1 else None,
+                       frozenset(tokens))
+
+
+def _differ(a, b):
+    return a is not None and b is not None and a != b
+
+
+def compatible(a, b):
+    """Check that nothing two names both state (brand, size, pack, flavour...) contradicts."""
+    if _differ(a.brand, b.brand) or _differ(a.pack, b.pack) or _differ(a.life_stage, b.life_stage) \
+            or _differ(a.species, b.species) or _differ(a.form, b.form):
+        return False
+    if a.flavours and b.flavours and a.flavours != b.flavours:
+        return False
+    if a.size and b.size:
+        if a.unit != b.unit or abs(a.size - b.size) > SIZE_TOLERANCE * max(a.size, b.size):
+            return False
+    return True
+
+
+def score(a, b, weights):
+    """Similarity of two names in [0, 1]: the mean of their IDF-weighted Jaccard and containment.
+
+    Containment lets a short name ("Orijen Fit & Trim Cat Food") match a longer
+    listing of the same product, while Jaccard keeps it from matching every
+    longer name that happens to contain it.
+    """
+    shared = sum(weights.get(token, 0.0) for token in a.tokens & b.tokens)
+    weight_a = sum(weights.get(token, 0.0) for token in a.tokens)
+    weight_b = sum(weights.get(token, 0.0) for token in b.tokens)
+    if not shared:
+        return 0.0
+    jaccard = shared / (weight_a + weight_b - shared)
+    containment = shared / min(weight_a, weight_b)
+    return (jaccard + containment) / 2
+
+
+def blocking_keys(product_name):
+    """Inverted-index keys of a name: its tokens and adjacent-token joins ("pro plan" -> "proplan")."""
+    tokens = sorted(product_name.tokens)
+    keys = set(tokens)
+    keys.update(a + b for a, b in zip(tokens, tokens[1:]))
+    if product_name.brand:
+        keys.add("brand:" + product_name.brand)
+    return keys
+
+
+def candidate_pairs(names, retailers):
+    """Yield (i, j) pairs of names from different retailers that share enough rare index keys.
+
+    Keys held by more than MAX_POSTING names are skipped, so the work grows with
+    the number of genuinely similar names rather than with every pair.
+    """
+    index = defaultdict(list)
+    for i, name in enumerate(names):
+        for key in blocking_keys(name):
+            index[key].append(i)
+
+    for i, name in enumerate(names):
+        shared = defaultdict(int)
+        for key in blocking_keys(name):
+            posting = index[key]
+            if len(posting) > MAX_POSTING:
+                continue
+            for j in posting:
+                if j > i and retailers[j] != retailers[i]:
+                    shared[j] += 1
+        for j, n in shared.items():
+            if n >= MIN_SHARED_TOKENS:
+                yield i, j
+
+
+class UnionFind:
+    """Disjoint sets of labelled elements 0..n-1, with path halving and union by size.
+
+    Two sets that share a label are never joined; here the labels are retailers.
+    """
+
+    def __init__(self, labels):
+        self.parent = list(range(len(labels)))
+        self.size = [1] * len(labels)
+        self.labels = [{label} for label in labels]
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j):
+        """Join the sets of i and j unless their labels overlap; return whether they were joined."""
+        i, j = self.find(i), self.find(j)
+        if i == j or not self.labels[i].isdisjoint(self.labels[j]):
+            return False
+        if self.size[i] < self.size[j]:
+            i, j = j, i
+        self.parent[j] = i
+        self.size[i] += self.size[j]
+        self.labels[i] |= self.labels[j]
+        self.labels[j] = set()
+        return True
+
+
+def product_ids(retailers, names, links):
+    """Return a canonical product ID for each listing, shared by listings of the same product.
+
+    Listings with the same retailer and canonical link are one product and are
+    matched once, however many categories or scrape dates repeat them. Across
+    retailers, candidate pairs from the inverted index are checked for
+    contradictions and scored, and the pairs above MATCH_THRESHOLD are merged
+    best first. A group holds at most one product per retailer, so a chain of
+    loose matches cannot pull a retailer's other variants into it. The ID is
+    derived from the group member with the smallest signature, so it stays the
+    same from run to run while that listing is still scraped.
+    """
+    with metrics.stage("match"):
+        listing_of = {}  # (retailer, canonical link) -> listing number
+        rows = []  # listing number of each input row
+        listings = []  # (retailer, name, link) of each listing
+        for retailer, name, link in zip(retailers, names, links):
+            key = (retailer, dedup.canonical_key({'Link': link}))
+            if key not in listing_of:
+                listing_of[key] = len(listings)
+                listings.append((retailer, name, link))
+            rows.append(listing_of[key])
+
+        listing_retailers = [retailer for retailer, _, _ in listings]
+        parsed = [normalize_name(name) for _, name, _ in listings]
+        document_frequency = defaultdict(int)
+        for name in parsed:
+            for token in name.tokens:
+                document_frequency[token] += 1
+        weights = {token: math.log(1 + len(parsed) / n) for token, n in document_frequency.items()}
+
+        scored = []
+        candidates = 0
+        for i, j in candidate_pairs(parsed, listing_retailers):
+            candidates += 1
+            if not compatible(parsed[i], parsed[j]):
+                continue
+            similarity = score(parsed[i], parsed[j], weights)
+            if similarity >= MATCH_THRESHOLD:
+                scored.append((similarity, i, j))
+
+        groups = UnionFind(listing_retailers)
+        matches = 0
+        for _, i, j in sorted(scored, key=lambda pair: pair[0], reverse=True):
+            if groups.union(i, j):
+                matches += 1
+
+        group_ids = {}
+        for i, name in enumerate(parsed):
+            root = groups.find(i)
+            signature = f"{name.signature()}|{listings[i][2]}"
+            if root not in group_ids or signature < group_ids[root]:
+                group_ids[root] = signature
+        group_ids = {root: hashlib.sha1(signature.encode("utf-8")).hexdigest()[:12]
+                     for root, signature in group_ids.items()}
+
+    metrics.count("match_candidates", candidates)
+    metrics.count("matched_pairs", matches)
+    return [group_ids[groups.find(i)] for i in rows]
+
+
+def assign_product_ids(products, retailer='Retailer', name='Name', link='Link'):
+    """Set 'Product ID' on each product record, matching the same product across retailers."""
+    ids = product_ids([product[retailer] for product in products], [product[name] for product in products],
+                      [product[link] for product in products])
+    for product, product_id in zip(products, ids):
+        product['Product ID'] = product_id
+    return products
+
+
+def add_product_ids(df, retailer='retailer', name='name', link='link'):
+    """Return df with a product_id column, e.g. for a DataFrame from history_store.read_history."""
+    return df.assign(product_id=product_ids(df[retailer].tolist(), df[name].tolist(), df[link].tolist()))
@@ -0,0 +1,246 @@
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+import requests
+from selenium.common.exceptions import WebDriverException
+import metrics
+
+
+# Requests per second a host starts at, and the range it may move in
+INITIAL_RATE = 1.0
+MIN_RATE = 0.05
+MAX_RATE = 8.0
+
+# Requests that may go out back to back after an idle spell
+BURST = 2
+
+# Responses slower than this mean the host is straining, so the rate is cut;
+# faster ones raise it a little (additive increase, multiplicative decrease)
+TARGET_LATENCY = 3.0
+INCREASE = 0.1
+
+# A browser step that cannot be timed from the server's side, such as a Next
+# click, also waits for the cards to render and settle and for widgets a page
+# may not have, so it is held to a looser target
+BROWSER_TARGET_LATENCY = 10.0
+SLOW_FACTOR = 0.8
+THROTTLE_FACTOR = 0.5
+
+# Retries of throttled or failed requests, with jittered exponential backoff
+MAX_RETRIES = 4
+BACKOFF_BASE = 2.0
+BACKOFF_CAP = 120.0
+
+THROTTLE_STATUSES = {429, 503}
+RETRY_STATUSES = {500, 502, 504}
+
+# Time to the first byte of the document the browser last navigated to, in milliseconds
+_NAVIGATION_LATENCY = """
+const entry = performance.getEntriesByType('navigation')[0];
+return entry ? entry.responseStart - entry.startTime : null;
+"""
+
+# Page titles of bot-challenge and block pages
+CHALLENGE_TITLES = re.compile(r'access denied|access to this page has been denied|just a moment|'
+                              r'pardon our interruption|attention required|are you a robot|captcha', re.I)
+_TITLE = re.compile(r'<title[^>]*>(.*?)</title>', re.S | re.I)
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+class HostLimiter:
+    """Token bucket shared by every worker sending requests to one host.
+
+    The rate adapts to what the host reports: it creeps up while responses are
+    quick, drops when they slow down, and halves on throttling, which also pauses
+    the whole host for the backoff period.
+    """
+
+    def __init__(self, host, rate=None, max_rate=None):
+        self.host = host
+        self.max_rate = max_rate or MAX_RATE
+        self.rate = min(rate or INITIAL_RATE, self.max_rate)
+        self.tokens = BURST
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until the host's budget allows another request."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(BURST, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                wait = self.paused_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def success(self, latency, target=None):
+        """Adjust the rate after a good response that took latency seconds (against TARGET_LATENCY by default)."""
+        target = TARGET_LATENCY if target is None else target
+        with self._lock:
+            if latency > target:
+                self.rate = max(MIN_RATE, self.rate * SLOW_FACTOR)
+            else:
+                self.rate = min(self.max_rate, self.rate + INCREASE)
+
+    def failed(self):
+        """Slow down after a request that still failed once its retries ran out."""
+        with self._lock:
+            self.rate = max(MIN_RATE, self.rate * SLOW_FACTOR)
+        metrics.count("failed_requests")
+
+    def throttled(self, pause):
+        """Halve the rate and hold every request to the host for pause seconds."""
+        with self._lock:
+            self.rate = max(MIN_RATE, self.rate * THROTTLE_FACTOR)
+            self.tokens = 0
+            self.paused_until = max(self.paused_until, time.monotonic() + pause)
+        metrics.count("throttled")
+        print(f"{self.host} is throttling; pausing {pause:.1f}s at {self.rate:.2f} requests/s")
+
+
+def configure(host, rate=None, max_rate=None):
+    """Set a host's starting rate and ceiling, e.g. for sites that need a slow pace."""
+    with _limiters_lock:
+        _limiters[host] = HostLimiter(host, rate, max_rate)
+
+
+def limiter_for(url):
+    """Return the limiter shared by every request to the URL's host."""
+    host = urlsplit(url).netloc
+    with _limiters_lock:
+        if host not in _limiters:
+            _limiters[host] = HostLimiter(host)
+        return _limiters[host]
+
+
+def backoff(attempt):
+    """Seconds to wait before retry number attempt (0-based), with full jitter."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** (attempt + 1)))
+
+
+def retry_after(response):
+    """The Retry-After delay of a response in seconds, or 0 when it gives none."""
+    try:
+        return max(0.0, float(response.headers.get('Retry-After', 0)))
+    except ValueError:
+        return 0.0  # An HTTP date; the backoff applies instead
+
+
+def is_challenge_title(title):
+    """Check whether a page title belongs to a bot-challenge or block page."""
+    return bool(title) and bool(CHALLENGE_TITLES.search(title))
+
+
+def is_challenge(html):
+    """Check whether an HTML response is a bot-challenge page rather than the listing."""
+    match = _TITLE.search(html[:20000])
+    return match is not None and is_challenge_title(match.group(1))
+
+
+def get(session, url, **kwargs):
+    """GET a URL within its host's budget, retrying throttled and failed requests.
+
+    429/503 responses and challenge pages slow the host down for every worker
+    before the retry; connection errors, timeouts and other 5xx responses are
+    retried with backoff. The last failure is raised as a RequestException,
+    except a 5xx response, which is returned after slowing the host down.
+    """
+    limiter = limiter_for(url)
+    for attempt in range(MAX_RETRIES + 1):
+        last_attempt = attempt == MAX_RETRIES
+        limiter.acquire()
+        start = time.monotonic()
+        try:
+            response = session.get(url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if last_attempt:
+                raise
+            delay = backoff(attempt)
+            print(f"Request to {url} failed ({e}); retrying in {delay:.1f}s")
+            metrics.count("retries")
+            time.sleep(delay)
+            continue
+        latency = time.monotonic() - start
+
+        if response.status_code in THROTTLE_STATUSES or (
+                response.status_code in (200, 403) and is_challenge(response.text)):
+            limiter.throttled(max(retry_after(response), backoff(attempt)))
+            if last_attempt:
+                raise requests.exceptions.HTTPError(
+                    f"{url} still throttled after {MAX_RETRIES} retries (status {response.status_code})",
+                    response=response)
+            metrics.count("retries")
+            continue
+        if response.status_code in RETRY_STATUSES:
+            if last_attempt:
+                limiter.failed()
+                return response
+            delay = backoff(attempt)
+            print(f"{url} returned {response.status_code}; retrying in {delay:.1f}s")
+            metrics.count("retries")
+            time.sleep(delay)
+            continue
+
+        limiter.success(latency)
+        return response
+
+
+@contextmanager
+def paced(url):
+    """Run a browser navigation, such as a Next click, within the host's budget.
+
+    The whole step, renders and waits included, is held to BROWSER_TARGET_LATENCY.
+    """
+    limiter = limiter_for(url)
+    limiter.acquire()
+    start = time.monotonic()
+    yield
+    limiter.success(time.monotonic() - start, BROWSER_TARGET_LATENCY)
+
+
+def navigation_latency(driver):
+    """Seconds the server took to start answering the browser's last navigation, or None if unknown."""
+    try:
+        latency = driver.execute_script(_NAVIGATION_LATENCY)
+    except WebDriverException:
+        return None
+    return latency / 1000 if isinstance(latency, (int, float)) and latency >= 0 else None
+
+
+def browser_get(driver, url, wait_ready):
+    """Open a URL in the browser within its host's budget and return wait_ready().
+
+    The host's rate follows the server's time to first byte, not the readiness
+    waits after it; when the browser cannot report that, driver.get is timed
+    against BROWSER_TARGET_LATENCY. A bot-challenge page throttles the host and
+    is reloaded after the backoff, up to MAX_RETRIES times.
+    """
+    limiter = limiter_for(url)
+    for attempt in range(MAX_RETRIES + 1):
+        limiter.acquire()
+        start = time.monotonic()
+        with metrics.stage("navigate"):
+            driver.get(url)
+        loaded = time.monotonic() - start
+        ready = wait_ready()
+        if is_challenge_title(driver.title) and attempt < MAX_RETRIES:
+            limiter.throttled(backoff(attempt))
+            metrics.count("retries")
+            continue
+        latency = navigation_latency(driver)
+        if latency is None:
+            limiter.success(loaded, BROWSER_TARGET_LATENCY)
+        else:
+            limiter.success(latency)
+        return ready
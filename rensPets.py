@@ -1,10 +1,11 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-import time
-import openpyxl
+import browser_pool
+import browser_extract
+import page_ready
+import page_parser
+import metrics
+import structured_data
+import cli
+import site_adapter
 
 
 # Define the product categories and URLs
@@ -18,155 +19,241 @@ categories = {
     "Dog Toys": "https://www.renspets.com/categories/dog-toys"
 }
 
-def get_total_products(soup):
-    """Extract the total number of products from the HTML."""
-    total_text = soup.find('span', class_='browse-controls__total-products').text.strip()
-    total_products = int(total_text.split('of')[1].split('results')[0].strip())
-    return total_products
+# Short name used for checkpoints, stored history and log labels
+SITE = "renspets"
 
+# Listing pages are addressed as ?page=N
+PAGINATION = site_adapter.page_param("page")
 
-def get_product_data(driver, category, base_url):
-    """Scrape product data for a specific category."""
+# Selectors used to tell when a listing page has rendered; the review widgets
+# are injected by a third-party script after the cards appear
+CARD_SELECTOR = "div.product-summary"
+WIDGET_SELECTOR = "div.bv_numReviews_component_container"
 
-    # Fetch the first page to get total products
-    driver.get(base_url)
-    time.sleep(5)  # 等待页面加载
-    page_source = driver.page_source
-    soup = BeautifulSoup(page_source, 'html.parser')
+# Product links, fingerprinted to catch a page number that serves an earlier page again
+LINK_SELECTOR = "a.product-summary__link"
 
-    # Get total products
-    total_products = get_total_products(soup)
-    print(f"Total products for {category}: {total_products}")
+# Third-party hosts the lean browser must load: Bazaarvoice injects the ratings and review counts
+ALLOWED_HOSTS = ["bazaarvoice.com"]
 
-    product_data = []
-    total_processed = 0
-    page = 1
-
-    while total_processed < total_products:
-        url = f"{base_url}?page={page}"
-        print(f"Fetching data from: {url}")
-
-        # try:
-        #     response = session.get(url, headers=headers, timeout=30)
-        #     response.raise_for_status()
-        # except requests.exceptions.RequestException as e:
-        #     print(f"Error fetching data from {url}: {e}")
-        #     break
-        #
-        # soup = BeautifulSoup(response.text, 'html.parser')
-
-        # Fetch each page to get total products
-        driver.get(url)
-        time.sleep(5)  # 等待页面加载
-        page_source = driver.page_source
-        soup = BeautifulSoup(page_source, 'html.parser')
-
-        # Find product containers (adjust selectors as needed)
-        products = soup.find_all('div', class_='product-summary')
-        print(f"Page {page} returned {len(products)} products.")
-
-        for product in products:
-            try:
-                name = product.find('div', class_='product-summary__name').text.strip()
-                link = product.find('a', class_='product-summary__link')['href']
-                full_link = f"https://www.renspets.com{link}"
-
-                price_section = product.find('div', class_='product-prices__section')
-
-                if price_section:
-                    # 查找 autoship 格式的价格
-                    price_range = price_section.find('div',
-                                                     class_='product-prices__price product-prices__price--autoship')
-
-                    # 查找普通价格
-                    price_single = None
-                    for div in price_section.find_all('div', class_='product-prices__price'):
-                        if 'product-prices__price--autoship' not in div[
-                            'class'] and 'product-prices__price--small' not in div['class']:
-                            price_single = div
-                            break
-
-                    # 查找 small 格式的价格
-                    price_small = price_section.find('div', class_='product-prices__price product-prices__price--small')
-
-                    # 处理不同的价格情况
-                    if price_range and not price_single and not price_small:
-                        prices = price_range.find_all('span')
-                        price = ''.join(p.get_text(strip=True) for p in prices) if prices else "N/A"
-                    elif not price_range and price_single and not price_small:
-                        price = price_single.find('span').text.strip()
-                    elif not price_range and not price_single and price_small:
-                        # 处理 small 格式价格
-                        prices = price_small.find_all('s')
-                        price = ''.join(p.get_text(strip=True) for p in prices) if prices else "N/A"
-                    elif price_range and price_single and price_range != price_single:
-                        print(f"Both price_range and price_single exist: {price_section}")
-                        price = "Conflict in price data"
-                    else:
-                        print(f"Irregular Price Format: {price_section}")
-                        price = 0
-                else:
-                    print("Price section not found!")
-                    price = 0
-                # print(f"Price: {price}")
-
-                rating_tag = product.find('div', class_='product-summary__rating').find('div', class_='bv_averageRating_component_container').find('div', class_='bv_text')
-                rating = float(rating_tag.text.strip()) if rating_tag else 0
-                review_tag = product.find('div', class_='product-summary__rating').find('div', class_='bv_numReviews_component_container').find('div', class_='bv_text')
-                review = int(review_tag.text.strip('()')) if review_tag else 0
-
-                product_data.append({
-                    'Category': category,
-                    'Name': name,
-                    'Link': full_link,
-                    'Review': review,
-                    'Rating': rating,
-                    'Price': price
-                })
-
-                total_processed += 1
-
-            except AttributeError as e:
-                print(f"Error parsing product data: {e}")
-                continue
-
-        if len(products) == 0:  # No more products found on the page
-            print("No more products found. Ending pagination.")
-            break
-
-        page += 1
-
-    # Sort by ratings in descending order and keep top 10
-    sorted_products = sorted(product_data, key=lambda x: x['Review'], reverse=True)[:10]
-
-    return sorted_products
+# Listing order crawled with --early-stop, as a site_adapter.ListingSort. None while
+# the site's review-count sort parameter is unknown: the default order is crawled,
+# --early-stop warns that it cannot apply (unless ranking by rating), and only a bound
+# that holds on any order can stop it early. To try a parameter, set it here and run
+# with --verify-early-stop
+LISTING_SORT = None
 
+# Elements read from the page, for parser backends that only build part of the tree
+PARSE_TARGETS = [('div', 'product-summary'), ('span', 'browse-controls__total-products')]
 
-def main():
-    driver = webdriver.Chrome()  # 确保安装了 ChromeDriver
-    all_products = []
+def get_total_products(soup):
+    """Extract the total number of products from the HTML."""
+    total_text = soup.find('span', class_='browse-controls__total-products').text.strip()
+    total_products = int(total_text.split('of')[1].split('results')[0].strip())
+    return total_products
 
-    for category, url in categories.items():
-        print(f"Scraping {category}...")
-        products = get_product_data(driver, category, url)
-        all_products.extend(products)
 
-    driver.quit()
+def count_products(html):
+    """Return the total number of products a listing page reports."""
+    soup = page_parser.make_soup(html, PARSE_TARGETS)
+    try:
+        return get_total_products(soup)
+    finally:
+        soup.decompose()
+
+
+def find_product_containers(soup):
+    """Return the product containers on a listing page."""
+    return soup.find_all('div', class_='product-summary')
+
+
+def card_fields(product):
+    """Read the raw text of a product container's fields; missing optional fields are None.
+
+    range, single and small are the prices shown in the autoship, regular and
+    small (struck-through) formats, and price_section tells whether the price
+    section exists at all; single is None for a regular price without its span,
+    so single_box tells whether that format is shown, and rating_widgets tells
+    whether Bazaarvoice drew its rating and review-count containers.
+    """
+    price_section = product.find('div', class_='product-prices__section')
+    price_range = price_single = price_small = None
+    if price_section:
+        # 查找 autoship 格式的价格
+        price_range = price_section.find('div', class_='product-prices__price product-prices__price--autoship')
+
+        # 查找普通价格
+        for div in price_section.find_all('div', class_='product-prices__price'):
+            if 'product-prices__price--autoship' not in div[
+                'class'] and 'product-prices__price--small' not in div['class']:
+                price_single = div
+                break
+
+        # 查找 small 格式的价格
+        price_small = price_section.find('div', class_='product-prices__price product-prices__price--small')
+
+    rating_section = product.find('div', class_='product-summary__rating')
+    rating_box = rating_section.find('div', class_='bv_averageRating_component_container') if rating_section else None
+    review_box = rating_section.find('div', class_='bv_numReviews_component_container') if rating_section else None
+    rating_tag = rating_box.find('div', class_='bv_text') if rating_box else None
+    review_tag = review_box.find('div', class_='bv_text') if review_box else None
+    single_span = price_single.find('span') if price_single else None
+    link_tag = product.find('a', class_='product-summary__link')
+    return {
+        'name': product.find('div', class_='product-summary__name').text,
+        'link': link_tag.get('href') if link_tag else None,
+        'price_section': price_section is not None,
+        'range': [p.get_text(strip=True) for p in price_range.find_all('span')] if price_range else None,
+        'single_box': price_single is not None,
+        'single': single_span.text if single_span else None,
+        'small': [p.get_text(strip=True) for p in price_small.find_all('s')] if price_small else None,
+        'rating_widgets': rating_box is not None and review_box is not None,
+        'rating': rating_tag.text if rating_tag else None,
+        'review': review_tag.text if review_tag else None
+    }
+
+
+# The same fields read in the browser by browser_extract
+CARD_SCRIPT = """
+return cards('div.product-summary', card => {
+    const section = card.querySelector('div.product-prices__section');
+    const find = selector => section && section.querySelector(selector);
+    const range = find('div[class="product-prices__price product-prices__price--autoship"]');
+    const single = section && Array.from(section.querySelectorAll('div.product-prices__price')).find(div =>
+        !div.classList.contains('product-prices__price--autoship') &&
+        !div.classList.contains('product-prices__price--small'));
+    const small = find('div[class="product-prices__price product-prices__price--small"]');
+    const ratingSection = card.querySelector('div.product-summary__rating');
+    const ratingBox = ratingSection && ratingSection.querySelector('div.bv_averageRating_component_container');
+    const reviewBox = ratingSection && ratingSection.querySelector('div.bv_numReviews_component_container');
+    return {
+        name: text(card, 'div.product-summary__name'),
+        link: attr(card, 'a.product-summary__link', 'href'),
+        price_section: section !== null,
+        single_box: Boolean(single),
+        range: range ? Array.from(range.querySelectorAll('span'), strings) : null,
+        single: single ? text(single, 'span') : null,
+        small: small ? Array.from(small.querySelectorAll('s'), strings) : null,
+        rating_widgets: Boolean(ratingBox && reviewBox),
+        rating: text(ratingBox, 'div.bv_text'),
+        review: text(reviewBox, 'div.bv_text')
+    };
+});
+"""
+
+
+def parse_fields(fields, category):
+    """Build a product record from a card's raw fields, read from the soup or in the browser."""
+    name = fields['name'].strip()
+    if fields['link'] is None:
+        raise AttributeError("Product link not found")
+    full_link = f"https://www.renspets.com{fields['link']}"
+
+    if fields['price_section']:
+        price_range, price_small, single_box = fields['range'], fields['small'], fields['single_box']
+
+        # 处理不同的价格情况
+        if price_range is not None and not single_box and price_small is None:
+            price = ''.join(price_range) if price_range else "N/A"
+        elif price_range is None and single_box and price_small is None:
+            # A regular price without its span rejects the card only here, where it is read
+            if fields['single'] is None:
+                raise AttributeError("Regular price without its span")
+            price = fields['single'].strip()
+        elif price_range is None and not single_box and price_small is not None:
+            # 处理 small 格式价格
+            price = ''.join(price_small) if price_small else "N/A"
+        elif price_range is not None and single_box:
+            print(f"Both price_range and price_single exist: {name}")
+            price = "Conflict in price data"
+        else:
+            print(f"Irregular Price Format: {name}")
+            price = 0
+    else:
+        print("Price section not found!")
+        price = 0
+    # print(f"Price: {price}")
+
+    if not fields['rating_widgets']:
+        raise AttributeError("Rating widgets not found")
+    rating = float(fields['rating'].strip()) if fields['rating'] is not None else 0
+    review = int(fields['review'].strip('()')) if fields['review'] is not None else 0
+
+    return {
+        'Category': category,
+        'Name': name,
+        'Link': full_link,
+        'Review': review,
+        'Rating': rating,
+        'Price': price
+    }
+
+
+def parse_product(product, category):
+    """Build a product record from a single product container."""
+    return parse_fields(card_fields(product), category)
+
+
+def extract_structured(html, category, page_url):
+    """Read a listing page's products from its embedded JSON-LD or hydration data.
+
+    Returns (product records, number of products), or None when the page carries none.
+    """
+    return structured_data.product_records(html, category, page_url)
+
+
+def extract_in_browser(driver, category):
+    """Read the open listing page's products in the browser, without page_source.
+
+    Returns (product records, number of product containers), like extract_products.
+    """
+    return browser_extract.extract(driver, CARD_SCRIPT, category, parse_fields)
+
+
+def extract_products(html, category):
+    """Parse a listing page and return (product records, number of product containers).
+
+    Works on HTML alone, without the network or a browser.
+    """
+    soup = page_parser.make_soup(html, PARSE_TARGETS)
+    products = find_product_containers(soup)
+    product_data = []
+    for product in products:
+        try:
+            product_data.append(parse_product(product, category))
+        except AttributeError as e:
+            metrics.count("parse_failures")
+            print(f"Error parsing product data: {e}")
+    soup.decompose()
+    return product_data, len(products)
+
+
+ADAPTER = site_adapter.SiteAdapter(
+    site=SITE,
+    name="Ren's Pets",
+    categories=categories,
+    pagination=PAGINATION,
+    extract_products=extract_products,
+    extract_structured=extract_structured,
+    extract_in_browser=extract_in_browser,
+    count_products=count_products,
+    card_selector=CARD_SELECTOR,
+    widget_selector=WIDGET_SELECTOR,
+    link_selector=LINK_SELECTOR,
+    listing_sort=LISTING_SORT,
+    output_file="renspets_top_products.xlsx",
+    make_driver=lambda: browser_pool.make_headless_driver(ALLOWED_HOSTS),
+    concurrency=browser_pool.POOL_SIZE
+)
 
-    if not all_products:
-        print("No products found. Exiting...")
-        return
 
-    # Convert to DataFrame
-    df = pd.DataFrame(all_products)
+def main():
+    args = cli.parse_args("Scrape the top products per category from renspets.com")
 
-    # Save to Excel
-    output_file = "renspets_top_products.xlsx"
-    try:
-        df.to_excel(output_file, index=False)
-        print(f"Data saved to {output_file}")
-    except Exception as e:
-        print(f"Error saving data to Excel: {e}")
+    products = site_adapter.run_site(ADAPTER, k=args.top_k, rank_by=args.rank_by)
+    print(f"Time spent waiting for pages: {page_ready.total_wait_time():.1f}s")
+    site_adapter.save_products(products, ADAPTER.output_file)
+    metrics.write_outputs()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,64 @@
+from concurrent.futures import ThreadPoolExecutor
+import chewy
+import petSmart
+import homesAlive
+import rensPets
+import petValu
+import page_ready
+import metrics
+import cli
+import site_adapter
+import product_match
+
+
+# Every retailer the runner knows about
+ADAPTERS = {adapter.site: adapter for adapter in [
+    chewy.ADAPTER,
+    petSmart.ADAPTER,
+    homesAlive.ADAPTER,
+    rensPets.ADAPTER,
+    petValu.ADAPTER
+]}
+
+OUTPUT_FILE = "all_top_products.xlsx"
+
+
+def run_all(adapters, k=None, rank_by=None):
+    """Scrape all retailers at the same time and return their products in one list.
+
+    Each retailer runs with its own browser pool and concurrency. A retailer
+    that fails is reported and left out; the others still finish.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, len(adapters))) as executor:
+        futures = [(adapter, executor.submit(site_adapter.run_site, adapter, None, k, rank_by)) for adapter in adapters]
+
+    all_products = []
+    for adapter, future in futures:
+        try:
+            products = future.result()
+        except Exception as e:
+            print(f"Error scraping {adapter.name}: {e}")
+            continue
+        print(f"{adapter.name}: {len(products)} products")
+        all_products.extend({'Retailer': adapter.name, **product} for product in products)
+    return all_products
+
+
+def main():
+    parser = cli.build_parser("Scrape the top products per category from every retailer at once")
+    parser.add_argument("--sites", nargs="+", choices=sorted(ADAPTERS), default=sorted(ADAPTERS),
+                        help="Retailers to scrape")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="Excel file for the combined results")
+    parser.add_argument("--match-products", action="store_true",
+                        help="Add a Product ID column shared by listings of the same product at different retailers")
+    args = cli.apply_args(parser.parse_args())
+
+    products = run_all([ADAPTERS[site] for site in args.sites], k=args.top_k, rank_by=args.rank_by)
+    if args.match_products:
+        product_match.assign_product_ids(products)
+    print(f"Time spent waiting for pages: {page_ready.total_wait_time():.1f}s")
+    site_adapter.save_products(products, args.output)
+    metrics.write_outputs()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,591 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+import requests
+import browser_extract
+import browser_pool
+import catalog_store
+import checkpoints
+import dedup
+import early_stop
+import history_store
+import http_client
+import page_cache
+import page_fingerprint
+import page_ready
+import parse_pool
+import rate_limit
+import snapshot_store
+import structured_data
+import metrics
+import top_k
+
+
+# Whether each run's top products are also written to an Excel workbook
+EXPORT_EXCEL = True
+
+
+# What clicking a listing's Next button led to: the next page, the end of the
+# listing, or a failure that leaves the category open for --resume
+NEXT_PAGE = "next_page"
+LAST_PAGE = "last_page"
+CLICK_FAILED = "click_failed"
+
+
+class Pagination:
+    """How a retailer moves from one listing page to the next.
+
+    "query" pages are addressed as ?<param>=N. "next_button" pages are reached
+    with click(driver), which returns NEXT_PAGE, LAST_PAGE or CLICK_FAILED;
+    page_url(url, page) gives the pages that also have a URL of their own, or
+    None for those that do not.
+    """
+
+    def __init__(self, kind, param=None, click=None, page_url=None):
+        self.kind = kind
+        self.param = param
+        self.click = click
+        self.page_url = page_url
+
+    def url(self, base_url, page):
+        """Return the URL of a listing page, or None when it can only be reached by clicking Next."""
+        if self.kind == "query":
+            separator = "&" if "?" in base_url else "?"
+            return f"{base_url}{separator}{self.param}={page}"
+        if self.page_url is not None:
+            return self.page_url(base_url, page)
+        return base_url if page == 1 else None
+
+
+def page_param(name):
+    """Pagination through a ?<name>=N query parameter."""
+    return Pagination("query", name)
+
+
+def next_button(click, page_url=None):
+    """Pagination by clicking the listing's Next button."""
+    return Pagination("next_button", click=click, page_url=page_url)
+
+
+class ListingSort:
+    """A listing order a retailer offers through a ?<param>=<value> query parameter.
+
+    order is early_stop.REVIEWS for most reviews first, or early_stop.POPULARITY
+    for best sellers first.
+    """
+
+    def __init__(self, param, value, order):
+        self.param = param
+        self.value = value
+        self.order = order
+
+    def url(self, base_url):
+        """Return the category URL with this sort applied."""
+        separator = "&" if "?" in base_url else "?"
+        return f"{base_url}{separator}{self.param}={self.value}"
+
+
+class SiteAdapter:
+    """Everything the runner needs to know to scrape one retailer.
+
+    site is the retailer's short name, used for checkpoints and stored history.
+    A retailer declares how its listing pages follow each other (pagination)
+    and how products are read from a page; the page loop is shared:
+
+    - extract_products(html, category) returns (product records, number of
+      product containers); it runs in parse workers, so it must be a
+      module-level function, as must extract_structured.
+    - extract_structured(html, category, url) reads the page's embedded
+      product data for the fast path, or returns None.
+    - extract_in_browser(driver, category) reads the open page's cards with
+      browser_extract.
+    - count_products(html) returns the total a "query" listing reports.
+    - card_selector and widget_selector tell when a page has rendered;
+      link_selector picks the product links fingerprinted to catch a page
+      served twice.
+
+    make_driver starts that retailer's browser (None for retailers fetched over
+    plain HTTP, page_concurrency pages at a time), and concurrency is the number
+    of categories scraped at once. make_tab_session, for retailers limited to
+    one browser session, returns a browser_pool.TabSession; with
+    browser_pool.TABS above 1 the categories then run in that many tabs of the
+    one session instead.
+    """
+
+    def __init__(self, name, site, categories, pagination, extract_products, output_file,
+                 extract_structured=None, extract_in_browser=None, count_products=None,
+                 card_selector=None, widget_selector=None, link_selector=None, listing_sort=None,
+                 make_driver=None, concurrency=1, page_concurrency=1, make_tab_session=None):
+        self.name = name
+        self.site = site
+        self.categories = categories
+        self.pagination = pagination
+        self.extract_products = extract_products
+        self.output_file = output_file
+        self.extract_structured = extract_structured
+        self.extract_in_browser = extract_in_browser
+        self.count_products = count_products
+        self.card_selector = card_selector
+        self.widget_selector = widget_selector
+        self.link_selector = link_selector
+        self.listing_sort = listing_sort
+        self.make_driver = make_driver
+        self.concurrency = concurrency
+        self.page_concurrency = page_concurrency
+        self.make_tab_session = make_tab_session
+
+    @property
+    def uses_browser(self):
+        return self.make_driver is not None
+
+    @property
+    def reads_in_browser(self):
+        """Whether cards are read with browser_extract instead of parsing page_source."""
+        return (browser_extract.ENABLED and self.uses_browser and self.extract_in_browser is not None
+                and not page_cache.REPLAY)
+
+
+class CategoryRun:
+    """The state of one category being scraped: its checkpoint, top products and early stop.
+
+    keep_page takes each parsed page in page order, scraped now or restored
+    from the checkpoint, and records it everywhere a page goes.
+    """
+
+    def __init__(self, adapter, category, seen_products, k=None, rank_by=None):
+        self.site = adapter.site
+        self.category = category
+        self.checkpoint = checkpoints.CategoryCheckpoint(adapter.site, category)
+        self.top_products = top_k.TopK(k, rank_by)
+        self.seen_products = seen_products
+        self.stop = early_stop.EarlyStop(self.top_products, adapter.listing_sort)
+        self.fingerprints = page_fingerprint.PageFingerprints(f"{adapter.site} {category}")
+        # Pages restored from the checkpoint still count, so a later page repeating one is caught
+        for page, fingerprint in sorted(self.checkpoint.fingerprints.items()):
+            self.fingerprints.repeated(page, fingerprint)
+        self.total_products = None  # What a "query" listing reports; next-button listings end on the last page
+        self.page_size = None
+        self.processed = 0
+        self.finished = False
+
+    def keep_page(self, page, product_data, product_count):
+        """Record one parsed page; return True once pagination should end."""
+        if self.finished:
+            return True  # Loaded ahead past the last page
+        if page in self.checkpoint.pages:
+            print(f"Page {page} restored from checkpoint.")
+        else:
+            self.checkpoint.save_page(page, product_data, product_count, self.fingerprints.by_page.get(page))
+            history_store.record_page(self.site, product_data)
+            metrics.count("pages")
+            metrics.count("cards", product_count)
+            metrics.count("records", len(product_data))
+            print(f"Page {page} returned {product_count} products.")
+        # Restored pages are upserted and written to the catalog too, so both cover every page
+        snapshot_store.record_page(self.site, self.category, product_data)
+        if self.page_size is None:
+            self.page_size = product_count
+
+        new_records = []
+        with metrics.stage("dedup"):
+            for product_record in product_data:
+                first_category = self.seen_products.add(product_record)
+                if first_category is None:
+                    new_records.append(product_record)
+                # Repeats within the category replace the held record; products first
+                # listed under another category are left to that category
+                if first_category in (None, self.category):
+                    self.top_products.push(product_record, key=self.seen_products.key(product_record))
+        # The catalog gets each product once, from its first listing
+        catalog_store.record_page(self.site, new_records)
+        self.processed += len(product_data)
+
+        if product_count == 0:  # No more products found on the page
+            print("No more products found. Ending pagination.")
+            self.finished = True
+        elif self.total_products is not None and self.processed >= self.total_products:
+            self.finished = True
+        elif self.stop.page_done(page, product_data):
+            self.finished = True
+        return self.finished
+
+    def results(self):
+        """The top products so far; partial while the category is unfinished."""
+        return self.top_products.results()
+
+    def finish(self):
+        """Mark the category scraped to the end and return its top products."""
+        if not self.checkpoint.done:
+            self.checkpoint.mark_done()
+        print("----Product Detail----")
+        print(f"Category: {self.category}, Count: {self.seen_products.category_counts[self.category]}, "
+              f"Duplicates: {self.seen_products.category_duplicates[self.category]}")
+        self.stop.verify(self.results())
+        return self.results()
+
+
+def fetch_page(url):
+    """Fetch a listing page over HTTP through the page cache, or return None if it could not be fetched."""
+    try:
+        return page_cache.cached_get(http_client.session(), url)
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching data from {url}: {e}")
+        return None
+
+
+def open_page(adapter, driver, url):
+    """Open a listing page in the browser and wait for its cards and review widgets."""
+    return rate_limit.browser_get(driver, url, lambda: page_ready.wait_for_listing(
+        driver, adapter.card_selector, adapter.site, adapter.widget_selector))
+
+
+def load_page(adapter, driver, url, fast_path=True):
+    """Return a listing page's HTML, going through the page cache, or None if it could not be loaded.
+
+    Retailers without a browser are fetched over HTTP. Otherwise, with
+    structured_data.FAST_PATH the page is first fetched over plain HTTP and used
+    as is when it embeds product data; only then is it rendered. In replay mode
+    the browser is skipped and None is returned for pages that were never cached.
+    """
+    if not adapter.uses_browser:
+        return fetch_page(url)
+    if fast_path and structured_data.FAST_PATH and adapter.extract_structured is not None:
+        html = structured_data.fetch(url)
+        if html is not None and adapter.extract_structured(html, None, url) is not None:
+            return html
+    if not page_cache.REPLAY:
+        open_page(adapter, driver, url)
+    return page_cache.rendered_page(driver, url)
+
+
+def load_products(adapter, driver, url, category, repeated):
+    """Open a listing page and read its products in the browser, without page_source.
+
+    Returns (product records, number of product containers), or None when
+    repeated(fingerprint) holds for the fingerprint of the page's product links,
+    taken before its cards are read. As in load_page, the fast path is tried
+    first. Pages read this way are not added to the page cache; their records
+    are checkpointed as usual.
+    """
+    if structured_data.FAST_PATH and adapter.extract_structured is not None:
+        html = structured_data.fetch(url)
+        found = adapter.extract_structured(html, category, url) if html is not None else None
+        if found is not None:
+            if repeated(page_fingerprint.html_fingerprint(html, adapter.link_selector)):
+                return None
+            return found
+    open_page(adapter, driver, url)
+    if repeated(page_fingerprint.browser_fingerprint(driver, adapter.link_selector)):
+        return None
+    return adapter.extract_in_browser(driver, category)
+
+
+def extract_page(html, category, page_url, extract_products, extract_structured=None):
+    """Return a page's (product records, product count), from its structured data in fast-path mode."""
+    if structured_data.FAST_PATH and extract_structured is not None:
+        found = extract_structured(html, category, page_url)
+        if found is not None:
+            return found
+    return extract_products(html, category)
+
+
+def read_total(adapter, driver, base_url):
+    """Load a category's first page and return (html, total products it reports), or None if it could not be loaded."""
+    html = load_page(adapter, driver, base_url)
+    if html is None:
+        return None
+    try:
+        return html, adapter.count_products(html)
+    except AttributeError:
+        if not (structured_data.FAST_PATH and adapter.uses_browser):
+            raise
+    # A page fetched without the browser may lack the count the front end draws
+    html = load_page(adapter, driver, base_url, fast_path=False)
+    if html is None:
+        return None
+    return html, adapter.count_products(html)
+
+
+def fetch_pages(adapter, base_url, first_page, last_page=0, skip=()):
+    """Yield (page, url, html) for the listing pages from first_page on, fetched over HTTP.
+
+    Pages up to last_page are requested at once, adapter.page_concurrency at a
+    time; later pages follow in batches of page_concurrency until the caller
+    stops iterating. Pages in skip (already checkpointed) are not requested.
+    html is None for a page that could not be fetched.
+    """
+    max_workers = max(adapter.page_concurrency, 1)
+    page = first_page
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            end = page + max_workers - 1
+            if max_workers > 1 and last_page >= page:
+                end = last_page
+            pages = [p for p in range(page, end + 1) if p not in skip]
+            urls = [adapter.pagination.url(base_url, p) for p in pages]
+            for url in urls:
+                print(f"Fetching data from: {url}")
+            yield from zip(pages, urls, executor.map(metrics.carry(fetch_page), urls))
+            page = end + 1
+
+
+def browser_pages(adapter, driver, base_url, first_page, skip=()):
+    """Yield (page, url, html) for the listing pages from first_page on, loaded one at a time in the browser."""
+    page = first_page
+    while True:
+        if page not in skip:
+            url = adapter.pagination.url(base_url, page)
+            print(f"Fetching data from: {url}")
+            yield page, url, load_page(adapter, driver, url)
+        page += 1
+
+
+def scrape_numbered_pages(adapter, run, driver, base_url):
+    """Scrape a category whose pages are addressed by number, until the total its first page reports."""
+    category, checkpoint = run.category, run.checkpoint
+
+    def repeated(page, html):
+        # Checked before the page is parsed, so a page served again is not parsed twice
+        if adapter.link_selector is None:
+            return False
+        fingerprint = page_fingerprint.html_fingerprint(html, adapter.link_selector)
+        return run.fingerprints.repeated(page, fingerprint) is not None
+
+    run.total_products = checkpoint.meta.get('total_products')
+    if checkpoint.done:
+        # Finished by an earlier run, perhaps on an empty or repeated page: restored, not loaded again
+        for page, (product_data, product_count) in sorted(checkpoint.pages.items()):
+            run.keep_page(page, product_data, product_count)
+        return run.results()
+
+    # Pages are parsed in worker processes while the next ones load
+    pipeline = parse_pool.PagePipeline(extract_page, category, run.keep_page)
+    first_html = None
+    if run.total_products is None:
+        # Fetch the first page to get total products
+        loaded = read_total(adapter, driver, base_url)
+        if loaded is None:
+            return []
+        first_html, run.total_products = loaded
+        checkpoint.save_meta(total_products=run.total_products)
+    print(f"Total products for {category}: {run.total_products}")
+
+    page = 1
+    if first_html is not None:
+        # The page loaded for the count is parsed as page 1
+        repeated(1, first_html)
+        pipeline.submit(1, first_html, base_url, adapter.extract_products, adapter.extract_structured)
+        page = 2
+
+    sources = None
+    while not run.finished and run.total_products > 0:
+        if page in checkpoint.pages:
+            pipeline.add_result(page, *checkpoint.pages[page])
+            page += 1
+            continue
+
+        # A page the product count puts past the end is only loaded once every
+        # earlier page is parsed and more products are still expected
+        if page > 1 and (run.page_size is None or (page - 1) * run.page_size >= run.total_products):
+            pipeline.drain()
+            if run.finished:
+                break
+
+        if adapter.reads_in_browser:
+            url = adapter.pagination.url(base_url, page)
+            print(f"Fetching data from: {url}")
+            # Fingerprinted from the same product links as page 1's HTML, before the cards are read
+            loaded = load_products(adapter, driver, url, category,
+                                   lambda fingerprint: run.fingerprints.repeated(page, fingerprint) is not None)
+            if loaded is None:
+                break
+            pipeline.add_result(page, *loaded)
+        else:
+            if sources is None:
+                skip = set(checkpoint.pages)
+                if adapter.uses_browser:
+                    sources = browser_pages(adapter, driver, base_url, page, skip)
+                else:
+                    # Pages the count promises are fetched together, unless the crawl may stop
+                    # early or is a full catalog, whose pages must not pile up ahead of the parser
+                    expected = math.ceil(run.total_products / run.page_size) if run.page_size else page
+                    all_at_once = not (run.stop.enabled or catalog_store.ENABLED)
+                    sources = fetch_pages(adapter, base_url, page, expected if all_at_once else 0, skip)
+            _, url, html = next(sources)
+            if html is None:
+                pipeline.drain()
+                if not run.finished:
+                    sources.close()
+                    return run.results()  # Incomplete; the category stays open for --resume
+                break
+            if repeated(page, html):
+                break
+            pipeline.submit(page, html, url, adapter.extract_products, adapter.extract_structured)
+        if run.stop.enabled:
+            pipeline.drain()  # The next page is only requested once this one shows it is needed
+        page += 1
+    if sources is not None:
+        sources.close()
+    pipeline.drain()
+    return run.finish()
+
+
+def open_listing(adapter, driver, url, page):
+    """Open a next-button listing at the given page and return NEXT_PAGE, LAST_PAGE or CLICK_FAILED.
+
+    A page with a URL of its own is opened directly; if it is past the end it
+    shows no cards, which ends pagination once it is parsed. Otherwise the first
+    page is opened and Next clicked up to the page, without parsing the pages
+    passed; LAST_PAGE then means the listing ends before it.
+    """
+    page_link = adapter.pagination.url(url, page)
+    open_page(adapter, driver, page_link or url)
+    if page_link is None:
+        for _ in range(page - 1):
+            clicked = adapter.pagination.click(driver)
+            if clicked != NEXT_PAGE:
+                return clicked
+    return NEXT_PAGE
+
+
+def scrape_next_pages(adapter, run, driver, url):
+    """Scrape a category by clicking its listing's Next button until the last page."""
+    category, checkpoint = run.category, run.checkpoint
+
+    # Pages finished by an earlier run are restored instead of scraped again
+    for page, (product_data, product_count) in sorted(checkpoint.pages.items()):
+        run.keep_page(page, product_data, product_count)
+    if checkpoint.done:
+        return run.results()
+    if run.finished:
+        return run.finish()
+
+    page = checkpoint.last_page + 1
+    if structured_data.FAST_PATH and adapter.extract_structured is not None:
+        # Pages are read over plain HTTP while they carry product data; the
+        # browser takes over from the first page that does not
+        page, finished = structured_data.read_pages(
+            lambda number: adapter.pagination.url(url, number), page,
+            lambda html, page_link: adapter.extract_structured(html, category, page_link), run.keep_page)
+        if finished:
+            return run.finish()
+
+    if not page_cache.REPLAY:
+        opened = open_listing(adapter, driver, url, page)
+        if opened == LAST_PAGE:
+            # There is no page after the last checkpoint, so the earlier run reached the end
+            return run.finish()
+        if opened == CLICK_FAILED:
+            print(f"Could not reach page {page} of {category}; it stays open for --resume.")
+            return run.results()
+
+    # The browser moves on to the next page while earlier ones are parsed
+    pipeline = parse_pool.PagePipeline(adapter.extract_products, category, run.keep_page)
+    while True:
+        print(f"Scraping page {page} of {category}...")
+
+        if adapter.reads_in_browser:
+            fingerprint = page_fingerprint.browser_fingerprint(driver, adapter.link_selector)
+            if run.fingerprints.repeated(page, fingerprint) is not None:
+                break
+            pipeline.add_result(page, *adapter.extract_in_browser(driver, category))
+        else:
+            # Pages reached by clicking Next share the category URL, so the page number is part of the cache key
+            html = page_cache.rendered_page(driver, f"{url}#page={page}")
+            if html is None:
+                pipeline.drain()
+                return run.results()  # Incomplete; the category stays open for --resume
+            # Checked before the page is parsed, so a page served again is not parsed twice
+            fingerprint = page_fingerprint.html_fingerprint(html, adapter.link_selector)
+            if run.fingerprints.repeated(page, fingerprint) is not None:
+                break
+            pipeline.submit(page, html)
+        if run.stop.enabled:
+            pipeline.drain()  # The next page is only opened once this one shows it is needed
+            if run.finished:
+                break
+
+        if not page_cache.REPLAY:
+            clicked = adapter.pagination.click(driver)
+            if clicked == LAST_PAGE:
+                break
+            if clicked == CLICK_FAILED:
+                pipeline.drain()
+                if run.finished:
+                    break
+                print(f"Could not reach page {page + 1} of {category}; it stays open for --resume.")
+                return run.results()
+        page += 1
+
+    pipeline.drain()
+    return run.finish()
+
+
+def scrape_category(adapter, driver, category, url, seen_products, k=None, rank_by=None):
+    """Scrape every page of one category and return its top k products by rank_by.
+
+    seen_products is a dedup.DedupIndex, usually shared by every category of a
+    run, that filters repeated cards as they are parsed. k and rank_by default
+    to top_k.TOP_K and top_k.RANK_BY. Every parsed page is checkpointed; with
+    checkpoints.RESUME, pages already done are not loaded again.
+    """
+    run = CategoryRun(adapter, category, seen_products, k, rank_by)
+    url = early_stop.listing_url(url, adapter.listing_sort)
+    try:
+        if adapter.pagination.kind == "query":
+            return scrape_numbered_pages(adapter, run, driver, url)
+        return scrape_next_pages(adapter, run, driver, url)
+    finally:
+        snapshot_store.release_category(adapter.site, category)
+
+
+def run_site(adapter, seen_products=None, k=None, rank_by=None):
+    """Scrape every category of a retailer and return each one's top k products by rank_by, in category order."""
+    if seen_products is None:
+        seen_products = dedup.DedupIndex()
+    if (early_stop.EARLY_STOP or early_stop.VERIFY) and not early_stop.applies(adapter.listing_sort,
+                                                                                rank_by or top_k.RANK_BY):
+        print(f"Warning: early stopping cannot apply to {adapter.name}: it has no listing sorted by review "
+              f"count or best sellers (LISTING_SORT), so every page of every category is crawled.")
+
+    def job(driver, category, url):
+        with metrics.context(adapter.site, category):
+            return scrape_category(adapter, driver, category, url, seen_products, k, rank_by)
+
+    if adapter.uses_browser:
+        make_driver, pool_size = adapter.make_driver, adapter.concurrency
+        if adapter.make_tab_session is not None and browser_pool.TABS > 1:
+            make_driver, pool_size = adapter.make_tab_session().new_tab, browser_pool.TABS
+        results = browser_pool.scrape_categories(adapter.categories, job, pool_size=pool_size,
+                                                 make_driver=make_driver)
+    else:
+        def run(item):
+            category, url = item
+            print(f"Scraping {category}...")
+            return job(None, category, url)
+
+        with ThreadPoolExecutor(max_workers=max(1, adapter.concurrency)) as executor:
+            results = list(executor.map(run, adapter.categories.items()))
+
+    return [product for products in results for product in products]
+
+
+def save_products(products, output_file):
+    """Flush the history store and catalog and, unless disabled, write the top products to Excel."""
+    with metrics.stage("output"):
+        history_store.flush_all()
+        snapshot_store.flush()
+        catalog_store.close_all()
+
+        if not products:
+            print("No products found. Exiting...")
+            return
+
+        if not EXPORT_EXCEL:
+            return
+
+        # Save to Excel
+        try:
+            history_store.export_excel(products, output_file)
+            print(f"Data saved to {output_file}")
+        except Exception as e:
+            print(f"Error saving data to Excel: {e}")
@@ -0,0 +1,297 @@
+import argparse
+import datetime
+import sqlite3
+import threading
+import dedup
+import price_normalize
+
+
+# SQLite database of per-day listing snapshots
+DB_FILE = "snapshots.db"
+
+# Whether scraped pages are upserted into the snapshot store
+ENABLED = True
+
+# Listings buffered before they are written in one transaction
+BATCH_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    retailer   TEXT NOT NULL,
+    link       TEXT NOT NULL,  -- dedup.canonical_key of the product's URL
+    url        TEXT NOT NULL,
+    name       TEXT,
+    first_seen TEXT NOT NULL,
+    last_seen  TEXT NOT NULL,
+    PRIMARY KEY (retailer, link)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS listings (
+    retailer      TEXT NOT NULL,
+    link          TEXT NOT NULL,
+    category      TEXT NOT NULL,
+    snapshot      TEXT NOT NULL,  -- scrape date, YYYY-MM-DD
+    scraped_at    TEXT NOT NULL,
+    rank          INTEGER,        -- position in the category listing, from 1
+    review        INTEGER,
+    rating        REAL,
+    price_raw     TEXT,
+    price_min     REAL,
+    price_max     REAL,
+    price_regular REAL,
+    price_sale    REAL,
+    PRIMARY KEY (retailer, link, category, snapshot)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS listings_by_category ON listings (retailer, category, scraped_at);
+CREATE INDEX IF NOT EXISTS listings_by_snapshot ON listings (snapshot, retailer, category);
+"""
+
+UPSERT_PRODUCT = """
+INSERT INTO products (retailer, link, url, name, first_seen, last_seen)
+VALUES (:retailer, :link, :url, :name, :snapshot, :snapshot)
+ON CONFLICT (retailer, link) DO UPDATE SET
+    url = excluded.url, name = excluded.name, last_seen = MAX(last_seen, excluded.last_seen)
+"""
+
+UPSERT_LISTING = """
+INSERT INTO listings (retailer, link, category, snapshot, scraped_at, rank, review, rating,
+                      price_raw, price_min, price_max, price_regular, price_sale)
+VALUES (:retailer, :link, :category, :snapshot, :scraped_at, :rank, :review, :rating,
+        :price_raw, :price_min, :price_max, :price_regular, :price_sale)
+ON CONFLICT (retailer, link, category, snapshot) DO UPDATE SET
+    scraped_at = excluded.scraped_at, rank = excluded.rank, review = excluded.review,
+    rating = excluded.rating, price_raw = excluded.price_raw, price_min = excluded.price_min,
+    price_max = excluded.price_max, price_regular = excluded.price_regular, price_sale = excluded.price_sale
+"""
+
+# Each comparison joins the new snapshot to the old one on the listings primary key,
+# and looks up names and URLs only for the rows it returns
+PRICE_CHANGES = """
+WITH changed AS (
+    SELECT n.retailer, n.category, n.link, o.price_min AS old_price, n.price_min AS new_price
+    FROM listings n
+    JOIN listings o ON o.retailer = n.retailer AND o.link = n.link AND o.category = n.category
+                    AND o.snapshot = :old
+    WHERE n.snapshot = :new AND ABS(n.price_min - o.price_min) >= :min_change
+      AND (:retailer IS NULL OR n.retailer = :retailer)
+    ORDER BY ABS(n.price_min - o.price_min) / o.price_min DESC
+    LIMIT :limit
+)
+SELECT c.retailer, c.category, p.name, p.url, c.old_price, c.new_price,
+       ROUND(c.new_price - c.old_price, 2) AS change,
+       ROUND(100.0 * (c.new_price - c.old_price) / c.old_price, 1) AS change_pct
+FROM changed c JOIN products p ON p.retailer = c.retailer AND p.link = c.link
+ORDER BY ABS(c.new_price - c.old_price) / c.old_price DESC
+"""
+
+REVIEW_VELOCITY = """
+WITH gained AS (
+    SELECT n.retailer, n.category, n.link, o.review AS old_reviews, n.review AS new_reviews,
+           (n.review - o.review) / MAX(julianday(n.scraped_at) - julianday(o.scraped_at), 1.0 / 24) AS per_day
+    FROM listings n
+    JOIN listings o ON o.retailer = n.retailer AND o.link = n.link AND o.category = n.category
+                    AND o.snapshot = :old
+    WHERE n.snapshot = :new AND n.review > o.review
+      AND (:retailer IS NULL OR n.retailer = :retailer)
+    ORDER BY per_day DESC
+    LIMIT :limit
+)
+SELECT g.retailer, g.category, p.name, p.url, g.old_reviews, g.new_reviews,
+       g.new_reviews - g.old_reviews AS gained, ROUND(g.per_day, 2) AS per_day
+FROM gained g JOIN products p ON p.retailer = g.retailer AND p.link = g.link
+ORDER BY g.per_day DESC
+"""
+
+RANK_MOVERS = """
+WITH moved AS (
+    SELECT n.retailer, n.category, n.link, o.rank AS old_rank, n.rank AS new_rank
+    FROM listings n
+    JOIN listings o ON o.retailer = n.retailer AND o.link = n.link AND o.category = n.category
+                    AND o.snapshot = :old
+    WHERE n.snapshot = :new AND ABS(o.rank - n.rank) >= :min_move
+      AND (:retailer IS NULL OR n.retailer = :retailer)
+      AND (:category IS NULL OR n.category = :category)
+    ORDER BY ABS(o.rank - n.rank) DESC
+    LIMIT :limit
+)
+SELECT m.retailer, m.category, p.name, p.url, m.old_rank, m.new_rank, m.old_rank - m.new_rank AS moved
+FROM moved m JOIN products p ON p.retailer = m.retailer AND p.link = m.link
+ORDER BY ABS(m.old_rank - m.new_rank) DESC
+"""
+
+def connect(db_file=None):
+    """Open the snapshot database in WAL mode, creating the tables if needed."""
+    connection = sqlite3.connect(db_file or DB_FILE, check_same_thread=False)
+    connection.row_factory = sqlite3.Row
+    # WAL lets the comparison queries read while a scrape is writing
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+class SnapshotWriter:
+    """Upsert scraped listings into the snapshot database in batches.
+
+    Pages must be recorded in listing order, as the pipelines deliver them, so
+    that each listing gets its rank within the category; a product repeated
+    later in the same category keeps its first rank. The ranks of a category
+    are held until release() is called once it is scraped. Re-scraping on the
+    same day updates that day's snapshot in place. Safe to share between threads.
+    """
+
+    def __init__(self, db_file=None, batch_size=None):
+        self.connection = connect(db_file)
+        self.batch_size = batch_size or BATCH_SIZE
+        self.rows = []
+        self.ranked = {}  # (retailer, category) -> links ranked so far, for categories in progress
+        self.written = 0
+        self._lock = threading.Lock()
+
+    def write(self, retailer, category, products):
+        """Buffer the records of one page, writing once a batch is full."""
+        scraped_at = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+        snapshot, scraped_at = scraped_at.date().isoformat(), scraped_at.isoformat()
+        with self._lock:
+            ranked = self.ranked.setdefault((retailer, category), {})
+            for product in products:
+                link = dedup.canonical_key(product)
+                if link in ranked:
+                    continue
+                ranked[link] = len(ranked) + 1
+                rating = product.get('Rating')
+                self.rows.append({
+                    "retailer": retailer,
+                    "link": link,
+                    "url": product['Link'],
+                    "name": product['Name'],
+                    "category": category,
+                    "snapshot": snapshot,
+                    "scraped_at": scraped_at,
+                    "rank": ranked[link],
+                    "review": int(product.get('Review') or 0),
+                    "rating": float(rating) if rating is not None else None,
+                    "price_raw": None if product.get('Price') is None else str(product['Price'])
+                })
+            if len(self.rows) >= self.batch_size:
+                self._flush()
+
+    def release(self, retailer, category):
+        """Forget the ranks given in a category that is no longer being scraped."""
+        with self._lock:
+            self.ranked.pop((retailer, category), None)
+
+    def flush(self):
+        """Write any buffered listings."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self.rows:
+            return
+        prices = price_normalize.normalize_prices([row["price_raw"] for row in self.rows])
+        for column in ("price_min", "price_max", "price_regular", "price_sale"):
+            for row, value in zip(self.rows, prices[column].tolist()):
+                row[column] = None if value != value else value  # NaN: no price
+        with self.connection:  # One transaction per batch
+            self.connection.executemany(UPSERT_PRODUCT, self.rows)
+            self.connection.executemany(UPSERT_LISTING, self.rows)
+        self.written += len(self.rows)
+        self.rows = []
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def writer():
+    """Return the shared writer, or None when the snapshot store is off."""
+    global _writer
+    if not ENABLED:
+        return None
+    with _writer_lock:
+        if _writer is None:
+            _writer = SnapshotWriter()
+        return _writer
+
+
+def record_page(retailer, category, products):
+    """Upsert the records of one scraped page, if the snapshot store is on."""
+    snapshot_writer = writer()
+    if snapshot_writer is not None and products:
+        snapshot_writer.write(retailer, category, products)
+
+
+def release_category(retailer, category):
+    """Drop a finished category's ranks, so they are only held while it is scraped."""
+    snapshot_writer = writer()
+    if snapshot_writer is not None:
+        snapshot_writer.release(retailer, category)
+
+
+def flush():
+    """Write every buffered listing; call at the end of a run."""
+    with _writer_lock:
+        snapshot_writer = _writer
+    if snapshot_writer is not None:
+        snapshot_writer.flush()
+
+
+def snapshots(connection):
+    """Return the snapshot dates in the database, oldest first."""
+    return [row[0] for row in connection.execute("SELECT DISTINCT snapshot FROM listings ORDER BY snapshot")]
+
+
+def _between(connection, query, old, new, **params):
+    if old is None or new is None:
+        dates = snapshots(connection)
+        if len(dates) < 2:
+            return []
+        old, new = old or dates[-2], new or dates[-1]
+    rows = connection.execute(query, {"old": old, "new": new, **params})
+    return [dict(row) for row in rows]
+
+
+def price_changes(connection, old=None, new=None, retailer=None, min_change=0.01, limit=50):
+    """Listings whose lowest price changed between two snapshots (default: the last two), largest change first."""
+    return _between(connection, PRICE_CHANGES, old, new, retailer=retailer, min_change=min_change, limit=limit)
+
+
+def review_velocity(connection, old=None, new=None, retailer=None, limit=50):
+    """Listings that gained reviews between two snapshots, fastest-growing (reviews per day) first."""
+    return _between(connection, REVIEW_VELOCITY, old, new, retailer=retailer, limit=limit)
+
+
+def rank_movers(connection, old=None, new=None, retailer=None, category=None, min_move=1, limit=50):
+    """Listings whose position in their category moved between two snapshots, biggest move first."""
+    return _between(connection, RANK_MOVERS, old, new, retailer=retailer, category=category,
+                    min_move=min_move, limit=limit)
+
+
+QUERIES = {
+    "prices": price_changes,
+    "reviews": review_velocity,
+    "ranks": rank_movers
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two snapshots in the snapshot database")
+    parser.add_argument("query", choices=sorted(QUERIES), help="What to compare")
+    parser.add_argument("--db", default=DB_FILE, help="Snapshot database")
+    parser.add_argument("--old", help="Earlier snapshot date (default: the second most recent)")
+    parser.add_argument("--new", help="Later snapshot date (default: the most recent)")
+    parser.add_argument("--retailer", help="Only this retailer's listings")
+    parser.add_argument("--limit", type=int, default=50, help="Rows to show")
+    args = parser.parse_args()
+
+    connection = connect(args.db)
+    rows = QUERIES[args.query](connection, args.old, args.new, retailer=args.retailer, limit=args.limit)
+    if not rows:
+        print("No changes found (a comparison needs two snapshots).")
+    for row in rows:
+        print("\t".join(str(value) for value in row.values()))
+
+if __name__ == "__main__":
+    main()
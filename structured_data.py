@@ -0,0 +1,157 @@
+import json
+import re
+from urllib.parse import urljoin
+import requests
+import http_client
+import metrics
+import page_cache
+
+
+# Read listing pages over plain HTTP from the product data they embed, and
+# render them in the browser only when that data is missing
+FAST_PATH = False
+
+# Fields of a full product record; each retailer keeps the ones its card parser fills
+RECORD_FIELDS = ['Category', 'Name', 'Link', 'Review', 'Rating', 'Price']
+
+_JSON_LD = re.compile(r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.S | re.I)
+_NEXT_DATA = re.compile(r'<script[^>]*id=["\']__NEXT_DATA__["\'][^>]*>(.*?)</script>', re.S | re.I)
+_STATE = re.compile(r'window\.__(?:INITIAL|PRELOADED)_STATE__\s*=\s*(\{.*?\})\s*;?\s*</script>', re.S)
+
+def fetch(url, timeout=None):
+    """GET a listing page through the page cache, or return None if it cannot be fetched."""
+    try:
+        return page_cache.cached_get(http_client.session(), url, timeout=timeout)
+    except requests.exceptions.RequestException as e:
+        print(f"Fast path could not fetch {url}: {e}")
+        return None
+
+
+def json_blobs(html):
+    """Yield the JSON-LD and hydration JSON documents embedded in a page."""
+    for pattern in (_JSON_LD, _NEXT_DATA, _STATE):
+        for match in pattern.finditer(html):
+            try:
+                yield json.loads(match.group(1))
+            except ValueError:
+                continue
+
+
+def _is_product(node):
+    kind = node.get('@type')
+    if kind == 'Product' or (isinstance(kind, list) and 'Product' in kind):
+        return True
+    return 'name' in node and 'url' in node and ('aggregateRating' in node or 'offers' in node)
+
+
+def find_products(document):
+    """Return (product-like objects in document order, whether the document holds an empty ItemList).
+
+    An ItemList of bare ListItems (links only, as SEO markup often has) is not
+    an empty list: it holds no products to read, so the page is not either.
+    """
+    products = []
+    empty_list = False
+    stack = [document]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+        elif isinstance(node, dict):
+            if node.get('@type') == 'ItemList' and not node.get('itemListElement'):
+                empty_list = True
+            if _is_product(node):
+                products.append(node)
+            else:
+                stack.extend(reversed(list(node.values())))
+    return products, empty_list
+
+
+def _money(value):
+    try:
+        return f"${float(value):.2f}"
+    except (TypeError, ValueError):
+        return None
+
+
+def format_price(offers):
+    """Render schema.org offers as a Price string like the card parsers produce."""
+    if isinstance(offers, list):
+        offers = offers[0] if offers else {}
+    offers = offers or {}
+    price = _money(offers.get('price'))
+    if price:
+        return price
+    low, high = _money(offers.get('lowPrice')), _money(offers.get('highPrice'))
+    if low and high and low != high:
+        return f"{low}-{high}"
+    return low or high or "N/A"
+
+
+def to_record(item, category, page_url):
+    """Build a product record from a schema.org Product object."""
+    rating = item.get('aggregateRating') or {}
+    return {
+        'Category': category,
+        'Name': str(item['name']).strip(),
+        'Link': urljoin(page_url, item['url']),
+        'Review': int(float(rating.get('reviewCount') or rating.get('ratingCount') or 0)),
+        'Rating': float(rating.get('ratingValue') or 0),
+        'Price': format_price(item.get('offers'))
+    }
+
+
+def product_records(html, category, page_url, fields=RECORD_FIELDS):
+    """Return (product records, number of products) from a page's structured data.
+
+    An ItemList whose itemListElement is empty gives ([], 0). Returns None when
+    the page embeds no product data, including a list whose elements yield no
+    product, so the caller falls back to the browser. A product listed in more
+    than one blob is kept once.
+    """
+    records = {}
+    empty_list = False
+    for document in json_blobs(html):
+        products, empty = find_products(document)
+        empty_list = empty_list or empty
+        for item in products:
+            try:
+                record = to_record(item, category, page_url)
+            except (KeyError, TypeError, ValueError):
+                continue
+            records.setdefault(record['Link'], {key: record[key] for key in fields})
+    if not records and not empty_list:
+        return None
+    return list(records.values()), len(records)
+
+
+def read_pages(page_url, first_page, extract, on_page):
+    """Read consecutive listing pages over plain HTTP, passing each to on_page(page, records, count).
+
+    page_url(page) returns a page's URL, or None when the page can only be
+    reached in the browser; extract(html, url) returns the page's records
+    or None. Returns (next page number, finished): reading stops at the first
+    empty page, a page that only repeats earlier products as sites do past
+    the last page, or once on_page returns True (finished), or at the first
+    page without structured product data, from which the browser takes over.
+    """
+    page = first_page
+    seen_links = set()
+    while True:
+        url = page_url(page)
+        html = fetch(url) if url else None
+        found = None
+        if html is not None:
+            with metrics.stage("extract"), metrics.profiled(page):
+                found = extract(html, url)
+        if found is None:
+            return page, False
+        product_data, product_count = found
+        links = {record['Link'] for record in product_data}
+        if links and links <= seen_links:
+            metrics.count("repeated_pages")
+            return page, True
+        seen_links |= links
+        if on_page(page, product_data, product_count) or product_count == 0:
+            return page + 1, True
+        page += 1
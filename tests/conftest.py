@@ -0,0 +1,74 @@
+import http.server
+import os
+import sys
+import threading
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import page_parser
+
+
+@pytest.fixture
+def parser_backend():
+    """Select a parser backend for one test, restoring the configured one afterwards."""
+    previous = page_parser.PARSER_BACKEND
+    yield page_parser.set_backend
+    page_parser.set_backend(previous)
+
+
+@pytest.fixture
+def scrape_env(tmp_path, monkeypatch):
+    """Keep a test scrape's checkpoints and page cache in tmp_path, with the stores off and no request pacing."""
+    import checkpoints
+    import history_store
+    import page_cache
+    import rate_limit
+    import snapshot_store
+
+    monkeypatch.setattr(checkpoints, "CHECKPOINT_DIR", str(tmp_path / "checkpoints"))
+    monkeypatch.setattr(checkpoints, "RESUME", False)
+    monkeypatch.setattr(page_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(history_store, "ENABLED", False)
+    monkeypatch.setattr(snapshot_store, "ENABLED", False)
+    monkeypatch.setattr(rate_limit, "INITIAL_RATE", 1000.0)
+    monkeypatch.setattr(rate_limit, "MAX_RATE", 1000.0)
+    return tmp_path
+
+
+@pytest.fixture
+def stand_in_server():
+    """Start local stand-ins for a retailer's site; serve(respond) returns a server's base URL.
+
+    respond(path, headers) gives (status, response headers, body) for each GET.
+    The servers are shut down when the test ends.
+    """
+    servers = []
+
+    def serve(respond):
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, headers, body = respond(self.path, self.headers)
+                body = body.encode('utf-8')
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,49 @@
+import itertools
+
+from selenium.webdriver.remote.command import Command
+
+import browser_pool
+
+
+class FakeDriver:
+    """The parts of an attached WebDriver session that TabSession uses."""
+
+    def __init__(self):
+        self.current_window_handle = "attached"
+        self._handles = (f"tab{n}" for n in itertools.count(1))
+        self.closed = []
+        self.quit_calls = 0
+
+    def execute(self, command, params=None):
+        if command == Command.NEW_WINDOW:
+            return {"value": {"handle": next(self._handles)}}
+        return {"value": None}
+
+    def close(self):
+        self.closed.append(self.current_window_handle)
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+def test_closing_the_last_tab_quits_and_a_new_tab_starts_a_fresh_session(monkeypatch):
+    monkeypatch.setattr(browser_pool, "BLOCK_RESOURCES", False)
+    drivers = []
+
+    def make_driver():
+        drivers.append(FakeDriver())
+        return drivers[-1]
+
+    session = browser_pool.TabSession(make_driver)
+    first, second = session.new_tab(), session.new_tab()
+    assert (first.handle, second.handle) == ("attached", "tab1")
+    session.close_tab(second.handle)
+    assert session.driver is drivers[0]
+    session.close_tab(first.handle)
+    assert drivers[0].quit_calls == 1
+    assert session.driver is None
+
+    tab = session.new_tab()
+    assert len(drivers) == 2
+    assert session.driver is drivers[1]
+    assert tab.handle == "attached"
@@ -0,0 +1,65 @@
+import browser_extract
+import homesAlive
+import rensPets
+from fixtures import page
+
+
+class Browser:
+    """A driver whose card script returns the given fields, as the site's CARD_SCRIPT reads them."""
+
+    def __init__(self, cards):
+        self.cards = cards
+
+    def execute_script(self, script, *args):
+        return self.cards
+
+
+def both_paths(module, card_html, browser_fields):
+    soup = module.extract_products(page([card_html]), "Fixture")
+    browser = browser_extract.extract(Browser([browser_fields]), module.CARD_SCRIPT, "Fixture", module.parse_fields)
+    assert soup == browser
+    return soup
+
+
+HOMESALIVE_CARD = ('<div class="product-item-info"><a class="product-item-link" href="/p">Kibble</a>'
+                   '<div class="price-box price-final_price">{prices}</div></div>')
+SPECIAL = '<span class="special-price hidden-price">{}</span>'
+FINAL = '<span class="price-container price-final_price tax weee">{}</span>'
+
+
+def homesalive_fields(special_box, final_box, special=None, final=None):
+    return {'name': "Kibble", 'link': "/p", 'price_section': True, 'special_box': special_box,
+            'final_box': final_box, 'special': special, 'final': final, 'review': None}
+
+
+def test_homesalive_both_prices_without_a_final_span_are_kept():
+    card = HOMESALIVE_CARD.format(prices=SPECIAL.format('<span class="price">$9.99</span>') + FINAL.format("$12"))
+    records, count = both_paths(homesAlive, card, homesalive_fields(True, True, special="$9.99"))
+    assert count == 1 and [r['Price'] for r in records] == [0]
+
+
+def test_homesalive_lone_price_without_its_span_is_dropped():
+    card = HOMESALIVE_CARD.format(prices=SPECIAL.format("$9.99"))
+    assert both_paths(homesAlive, card, homesalive_fields(True, False)) == ([], 1)
+
+
+RENSPETS_CARD = ('<div class="product-summary"><a class="product-summary__link" href="/p"></a>'
+                 '<div class="product-summary__name">Kibble</div><div class="product-prices__section">{prices}</div>'
+                 '<div class="product-summary__rating"><div class="bv_averageRating_component_container"></div>'
+                 '<div class="bv_numReviews_component_container"></div></div></div>')
+RANGE = '<div class="product-prices__price product-prices__price--autoship"><span>$1</span> - <span>$2</span></div>'
+SINGLE = '<div class="product-prices__price">$4</div>'
+
+
+def renspets_fields(price_range):
+    return {'name': "Kibble", 'link': "/p", 'price_section': True, 'single_box': True, 'range': price_range,
+            'single': None, 'small': None, 'rating_widgets': True, 'rating': None, 'review': None}
+
+
+def test_renspets_range_and_single_without_its_span_are_a_conflict():
+    records, count = both_paths(rensPets, RENSPETS_CARD.format(prices=RANGE + SINGLE), renspets_fields(["$1", "$2"]))
+    assert count == 1 and [r['Price'] for r in records] == ["Conflict in price data"]
+
+
+def test_renspets_lone_single_without_its_span_is_dropped():
+    assert both_paths(rensPets, RENSPETS_CARD.format(prices=SINGLE), renspets_fields(None)) == ([], 1)
@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+
+import catalog_store
+
+
+def products(count):
+    records = [{'Category': "Dry Food", 'Name': f'Acme "Crunchy", Bites n°{i}', 'Link': f"https://a.ca/p/{i}",
+                'Review': i, 'Rating': 4.5, 'Price': f"${i}.99"} for i in range(count)]
+    if count > 3:
+        records[3].update(Rating=None, Price=None)
+    return records
+
+
+def rows(frames):
+    """Catalog rows read back, with empty cells as None whatever the format stored."""
+    df = pd.concat(frames, ignore_index=True)
+    return [{column: None if pd.isna(value) else value for column, value in row.items()}
+            for row in df[catalog_store.COLUMNS].to_dict('records')]
+
+
+@pytest.mark.parametrize("fmt", catalog_store.FORMATS)
+def test_chunked_write_and_read_round_trip(tmp_path, fmt):
+    if fmt == "parquet":
+        pytest.importorskip("pyarrow")
+    writer = catalog_store.CatalogWriter("chewy", base_dir=str(tmp_path), fmt=fmt, chunk_size=4)
+    records = products(10)
+    for start in range(0, 10, 3):
+        writer.write(records[start:start + 3])
+        # Fewer than a chunk of records is ever held between pages
+        assert len(writer.rows) < 4
+        assert writer.written + len(writer.rows) == min(start + 3, 10)
+    writer.close()
+    assert writer.written == 10
+    assert writer.path == str(tmp_path / f"chewy.{fmt}")
+
+    frames = list(catalog_store.read_catalog(writer.path, chunk_size=4))
+    assert [len(frame) for frame in frames] == [4, 4, 2]
+    assert rows(frames) == [catalog_store.to_row(product) for product in records]
+
+
+def test_parquet_chunks_are_row_groups(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    writer = catalog_store.CatalogWriter("chewy", base_dir=str(tmp_path), fmt="parquet", chunk_size=4)
+    writer.write(products(9))
+    writer.write(products(2))
+    writer.close()
+    assert pq.ParquetFile(writer.path).metadata.num_row_groups == 2
+
+
+def test_each_run_starts_the_file_afresh(tmp_path):
+    writer = catalog_store.CatalogWriter("chewy", base_dir=str(tmp_path), fmt="jsonl", chunk_size=4)
+    writer.write(products(5))
+    writer.close()
+    writer = catalog_store.CatalogWriter("chewy", base_dir=str(tmp_path), fmt="jsonl", chunk_size=4)
+    writer.write(products(1))
+    writer.close()
+    assert len(rows(catalog_store.read_catalog(writer.path))) == 1
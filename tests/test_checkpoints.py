@@ -0,0 +1,61 @@
+import checkpoints
+
+
+def records(page):
+    return [{'Category': "Dry Food", 'Name': f"p{page}", 'Link': f"/p/{page}"}]
+
+
+def test_without_resume_the_file_starts_afresh(scrape_env):
+    checkpoint = checkpoints.CategoryCheckpoint("petvalu", "Dry Food")
+    checkpoint.save_page(1, records(1), 1)
+    assert checkpoints.CategoryCheckpoint("petvalu", "Dry Food").pages == {}
+
+
+def test_resume_restores_pages_meta_and_done(scrape_env, monkeypatch):
+    checkpoint = checkpoints.CategoryCheckpoint("petvalu", "Dry Food & Treats")
+    checkpoint.save_meta(total_products=2)
+    checkpoint.save_page(1, records(1), 1)
+    checkpoint.save_page(2, records(2), 1)
+    assert checkpoint.last_page == 2 and checkpoint.pages == {}
+    checkpoint.mark_done()
+
+    monkeypatch.setattr(checkpoints, "RESUME", True)
+    restored = checkpoints.CategoryCheckpoint("petvalu", "Dry Food & Treats")
+    assert restored.path.endswith("dry-food-treats.jsonl")
+    assert restored.pages == {1: (records(1), 1), 2: (records(2), 1)}
+    assert restored.meta == {'total_products': 2}
+    assert restored.done and restored.last_page == 2
+
+
+def test_torn_last_line_is_dropped_and_appended_over(scrape_env, monkeypatch):
+    checkpoint = checkpoints.CategoryCheckpoint("petvalu", "Dry Food")
+    checkpoint.save_page(1, records(1), 1)
+    checkpoint.save_page(2, records(2), 1)
+    with open(checkpoint.path, 'rb+') as f:
+        f.truncate(f.seek(0, 2) - 10)  # A crash part way through writing page 2
+
+    monkeypatch.setattr(checkpoints, "RESUME", True)
+    restored = checkpoints.CategoryCheckpoint("petvalu", "Dry Food")
+    assert list(restored.pages) == [1] and restored.last_page == 1
+    restored.save_page(2, records(2), 1)
+    assert checkpoints.CategoryCheckpoint("petvalu", "Dry Food").pages == {1: (records(1), 1), 2: (records(2), 1)}
+
+
+def test_finished_numbered_category_is_not_loaded_again(scrape_env, stand_in_server, monkeypatch):
+    import dedup
+    import petValu
+    import site_adapter
+
+    requested = []
+    url = stand_in_server(lambda path, headers: requested.append(path) or (200, {}, "")) + "/dog/food"
+    # An earlier run ended on a repeated page, before the total the site reported
+    checkpoint = checkpoints.CategoryCheckpoint("petvalu", "Dog Food")
+    checkpoint.save_meta(total_products=100)
+    checkpoint.save_page(1, [dict(record, Review=5) for record in records(1)], 1)
+    checkpoint.save_page(2, [dict(record, Review=7) for record in records(2)], 1)
+    checkpoint.mark_done()
+
+    monkeypatch.setattr(checkpoints, "RESUME", True)
+    products = site_adapter.scrape_category(petValu.ADAPTER, None, "Dog Food", url, dedup.DedupIndex())
+    assert [product['Name'] for product in products] == ["p2", "p1"]
+    assert requested == []
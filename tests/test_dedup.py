@@ -0,0 +1,46 @@
+import dedup
+
+
+def record(link, category="Dry Food"):
+    return {'Category': category, 'Link': link}
+
+
+def test_canonical_key_drops_host_case_www_slash_and_tracking():
+    assert (dedup.canonical_key(record("https://WWW.Chewy.com/ca/DP/123/?utm_source=x&pos=4"))
+            == dedup.canonical_key(record("http://chewy.com/ca/dp/123")) == "chewy.com/ca/dp/123")
+
+
+def test_canonical_key_keeps_variant_params_in_sorted_order():
+    assert dedup.canonical_key(record("https://a.ca/p?variant=2&ref=x&sku=9")) == "a.ca/p?sku=9&variant=2"
+    assert dedup.canonical_key(record("https://a.ca/p?sku=1")) != dedup.canonical_key(record("https://a.ca/p?sku=2"))
+
+
+def test_index_is_per_category_by_default():
+    index = dedup.DedupIndex()
+    assert index.add(record("https://a.ca/p")) is None
+    assert index.add(record("https://a.ca/p/")) == "Dry Food"
+    assert index.add(record("https://a.ca/p", "Treats")) is None
+    assert len(index) == 2
+    assert index.duplicates == 1
+
+
+def test_index_across_categories_reports_first_category():
+    index = dedup.DedupIndex(across_categories=True)
+    assert index.add(record("https://a.ca/p", "Treats")) is None
+    assert index.add(record("https://www.a.ca/p", "Dry Food")) == "Treats"
+    assert index.key(record("https://a.ca/p")) == "a.ca/p"
+
+
+def test_default_mode_is_read_when_the_index_is_made(monkeypatch):
+    monkeypatch.setattr(dedup, "DEDUP_ACROSS_CATEGORIES", True)
+    assert dedup.DedupIndex().across_categories
+    assert not dedup.DedupIndex(across_categories=False).across_categories
+
+
+def test_counts_are_kept_per_category():
+    index = dedup.DedupIndex(across_categories=True)
+    for product in [record("https://a.ca/p", "Treats"), record("https://a.ca/q", "Treats"),
+                    record("https://a.ca/p", "Treats"), record("https://a.ca/p"), record("https://a.ca/r")]:
+        index.add(product)
+    assert index.category_counts == {"Treats": 2, "Dry Food": 1}
+    assert index.category_duplicates == {"Treats": 1, "Dry Food": 1}
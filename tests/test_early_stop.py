@@ -0,0 +1,128 @@
+import pytest
+
+import early_stop
+import top_k
+from site_adapter import ListingSort
+
+
+BY_REVIEWS = ListingSort("sort", "reviews", early_stop.REVIEWS)
+BY_POPULARITY = ListingSort("sort", "bestsellers", early_stop.POPULARITY)
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(early_stop, "EARLY_STOP", True)
+    monkeypatch.setattr(early_stop, "VERIFY", False)
+    monkeypatch.setattr(early_stop, "PATIENCE", 2)
+
+
+def product(n, review=0, rating=0.0):
+    return {'Name': f"p{n}", 'Link': f"https://a.ca/p/{n}", 'Review': review, 'Rating': rating}
+
+
+def crawl(stop, heap, pages):
+    """Offer pages in order as the page loop does; return the page stopped after, or None."""
+    for page, products in enumerate(pages, start=1):
+        heap.extend(products)
+        if stop.page_done(page, products):
+            return page
+    return None
+
+
+def review_pages(reviews, per_page=3):
+    products = [product(n, review) for n, review in enumerate(reviews)]
+    return [products[i:i + per_page] for i in range(0, len(products), per_page)]
+
+
+def test_review_order_stops_once_fewest_reviews_cannot_beat_the_kth(enabled):
+    heap = top_k.TopK(3, "Review")
+    stop = early_stop.EarlyStop(heap, BY_REVIEWS)
+    pages = review_pages([90, 80, 70, 70, 60, 50, 40, 30], per_page=2)
+    assert crawl(stop, heap, pages) == 2
+    assert stop.settled_page == 2
+    assert [p['Review'] for p in heap.results()] == [90, 80, 70]
+
+
+def test_review_order_settles_on_a_tie_with_the_kth(enabled):
+    heap = top_k.TopK(2, "Review")
+    stop = early_stop.EarlyStop(heap, BY_REVIEWS)
+    # A later 80 ties the 2nd best and never displaces it
+    assert crawl(stop, heap, review_pages([90, 80, 80, 80])) == 1
+
+
+def test_review_order_waits_for_k_products(enabled):
+    heap = top_k.TopK(3, "Review")
+    stop = early_stop.EarlyStop(heap, BY_REVIEWS)
+    assert crawl(stop, heap, review_pages([90, 80, 70, 1], per_page=2)) == 2
+
+
+def test_weighted_ranking_uses_the_review_bound(enabled):
+    heap = top_k.TopK(2, "Weighted")
+    stop = early_stop.EarlyStop(heap, BY_REVIEWS)
+    pages = [[product(0, 100, 4.5), product(1, 90, 5.0)], [product(2, 10, 5.0), product(3, 5, 5.0)]]
+    assert crawl(stop, heap, pages) == 2
+
+
+def test_popularity_listing_stops_after_patience_quiet_pages(enabled):
+    heap = top_k.TopK(2, "Review")
+    stop = early_stop.EarlyStop(heap, BY_POPULARITY)
+    pages = [[product(0, 50), product(1, 40)],
+             [product(2, 60), product(3, 1)],  # Changes the top 2
+             [product(4, 2), product(5, 3)],   # Quiet 1
+             [product(6, 4), product(7, 5)],   # Quiet 2: stop
+             [product(8, 500)]]
+    assert crawl(stop, heap, pages) == 4
+    assert stop.quiet_pages == 2
+
+
+def test_popularity_quiet_count_restarts_when_a_page_changes_the_top(enabled):
+    heap = top_k.TopK(1, "Review")
+    stop = early_stop.EarlyStop(heap, BY_POPULARITY)
+    pages = [[product(0, 10)], [product(1, 1)], [product(2, 20)], [product(3, 1)], [product(4, 2)]]
+    assert crawl(stop, heap, pages) == 5
+
+
+def test_out_of_order_pages_turn_the_bound_off(enabled):
+    heap = top_k.TopK(3, "Review")
+    stop = early_stop.EarlyStop(heap, BY_REVIEWS)
+    # Page 2 starts above page 1's fewest reviews: the site ignored the sort
+    pages = [[product(0, 90), product(1, 80)], [product(2, 85), product(3, 1)], [product(4, 0)]]
+    assert crawl(stop, heap, pages) is None
+    assert stop.order is None
+    assert not stop.enabled
+
+
+def test_out_of_order_pages_still_stop_on_the_rating_bound(enabled):
+    heap = top_k.TopK(1, "Rating")
+    stop = early_stop.EarlyStop(heap, BY_REVIEWS)
+    pages = [[product(0, 1, 4.0), product(1, 5, 4.5)], [product(2, 0, 5.0)]]
+    assert crawl(stop, heap, pages) == 2
+    assert stop.order is None
+
+
+def test_disabled_without_a_listing_sort_unless_ranking_by_rating(enabled):
+    assert not early_stop.EarlyStop(top_k.TopK(2, "Review")).enabled
+    assert early_stop.EarlyStop(top_k.TopK(2, "Rating")).enabled
+
+
+def test_verify_crawls_on_and_confirms_the_settled_top(enabled, monkeypatch, capsys):
+    monkeypatch.setattr(early_stop, "VERIFY", True)
+    heap = top_k.TopK(3, "Review")
+    stop = early_stop.EarlyStop(heap, BY_REVIEWS)
+    assert crawl(stop, heap, review_pages([90, 80, 70, 70, 60, 50, 40, 30], per_page=2)) is None
+    assert stop.settled_page == 2
+    stop.verify(heap.results())
+    assert "Early stop verified: stopping after page 2 gives the same top 3." in capsys.readouterr().out
+
+
+def test_verify_reports_products_a_wrong_stop_missed(enabled, monkeypatch, capsys):
+    monkeypatch.setattr(early_stop, "VERIFY", True)
+    heap = top_k.TopK(1, "Review")
+    stop = early_stop.EarlyStop(heap, BY_POPULARITY)
+    pages = [[product(0, 10)], [product(1, 1)], [product(2, 1)], [product(3, 99)]]
+    assert crawl(stop, heap, pages) is None
+    assert stop.settled_page == 3
+    stop.verify(heap.results())
+    out = capsys.readouterr().out
+    assert "Early stop after page 3 would have been wrong" in out
+    assert "https://a.ca/p/3" in out
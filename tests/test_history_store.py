@@ -0,0 +1,71 @@
+import datetime
+import types
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import history_store
+
+
+class Clock(datetime.datetime):
+    """datetime.datetime with a settable now(), standing in for the scrape time."""
+
+    current = None
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    monkeypatch.setattr(history_store, "datetime", types.SimpleNamespace(datetime=Clock, timezone=datetime.timezone))
+    return tmp_path / "history"
+
+
+def scrape(base_dir, retailer, when, records):
+    """Append one run's (category, name, price) records for a retailer."""
+    Clock.current = datetime.datetime.fromisoformat(when).replace(tzinfo=datetime.timezone.utc)
+    writer = history_store.HistoryWriter(retailer, base_dir=str(base_dir), batch_size=2)
+    for category, name, price in records:
+        writer.write([{'Category': category, 'Name': name, 'Link': f"https://a.ca/{name}",
+                       'Review': 3, 'Rating': 4.0, 'Price': price}])
+    writer.flush()
+    return writer
+
+
+def test_append_writes_hive_partitions_and_never_rewrites_files(history):
+    writer = scrape(history, "chewy", "2026-03-01T12:00:00",
+                    [("Dry Food", "a", "$10.00"), ("Dry Food", "b", "$12.50"), ("Treats", "c", "$3.00")])
+    assert writer.written == 3
+    first = sorted(history.rglob("*.parquet"))
+    assert {path.parent.relative_to(history).as_posix() for path in first} == {
+        "retailer=chewy/category=Dry%20Food/scrape_date=2026-03-01",
+        "retailer=chewy/category=Treats/scrape_date=2026-03-01"}
+    before = {path: path.stat().st_mtime_ns for path in first}
+
+    scrape(history, "chewy", "2026-03-02T12:00:00", [("Dry Food", "a", "$9.00")])
+    after = sorted(history.rglob("*.parquet"))
+    assert len(after) == len(first) + 1
+    assert all(path.stat().st_mtime_ns == mtime for path, mtime in before.items())
+
+
+def test_read_history_filters_prune_partitions(history):
+    scrape(history, "chewy", "2026-03-01T12:00:00", [("Dry Food", "a", "$10.00"), ("Treats", "c", "$3.00")])
+    scrape(history, "chewy", "2026-03-02T12:00:00", [("Dry Food", "a", "$9.00")])
+    scrape(history, "petvalu", "2026-03-02T12:00:00", [("Dry Food", "z", "$20.00 - $25.00")])
+
+    df = history_store.read_history(str(history))
+    assert len(df) == 4
+    assert set(history_store.PARTITION_COLS) <= set(df.columns)
+
+    df = history_store.read_history(str(history), filters=[("retailer", "=", "chewy"), ("category", "=", "Dry Food")],
+                                    columns=["scrape_date", "name", "price_min"])
+    assert sorted(df.itertuples(index=False, name=None)) == [
+        ("2026-03-01", "a", 10.0), ("2026-03-02", "a", 9.0)]
+
+    df = history_store.read_history(str(history), filters=[("scrape_date", ">=", "2026-03-02")])
+    assert sorted(zip(df['retailer'].astype(str), df['name'])) == [("chewy", "a"), ("petvalu", "z")]
+    row = df[df['name'] == "z"].iloc[0]
+    assert (row['price_min'], row['price_max']) == (20.0, 25.0)
@@ -0,0 +1,101 @@
+import pytest
+
+import http_client
+import page_cache
+
+
+ETAG = '"v1"'
+
+
+@pytest.fixture
+def cache(scrape_env, monkeypatch):
+    monkeypatch.setattr(page_cache, "REPLAY", False)
+    monkeypatch.setattr(page_cache, "TTL", 0)
+    monkeypatch.setattr(page_cache, "_cache_size", None)
+    return scrape_env
+
+
+@pytest.fixture
+def site(stand_in_server):
+    """A page served with an ETag, answering 304 to a matching If-None-Match; yields (URL, request headers seen)."""
+    requests = []
+
+    def respond(path, headers):
+        requests.append(headers.get('If-None-Match'))
+        if headers.get('If-None-Match') == ETAG:
+            return 304, {'ETag': ETAG}, ""
+        return 200, {'ETag': ETAG}, f"<html>{path}</html>"
+
+    return f"{stand_in_server(respond)}/listing?page=1", requests
+
+
+def get(url):
+    return page_cache.cached_get(http_client.session(), url)
+
+
+def test_every_fetch_is_revalidated_by_default(cache, site):
+    url, requests = site
+    assert get(url) == get(url) == "<html>/listing?page=1</html>"
+    assert requests == [None, ETAG]
+
+
+def test_a_304_serves_the_cached_copy_and_resets_its_age(cache, site, monkeypatch):
+    url, requests = site
+    get(url)
+    fetched_at = page_cache.load(url)[1]['fetched_at']
+    monkeypatch.setattr(page_cache.time, "time", lambda: fetched_at + 100)
+    assert get(url) == "<html>/listing?page=1</html>"
+    assert page_cache.load(url)[1]['fetched_at'] == fetched_at + 100
+    assert requests == [None, ETAG]
+
+
+def test_pages_younger_than_the_ttl_are_not_requested(cache, site, monkeypatch):
+    url, requests = site
+    monkeypatch.setattr(page_cache, "TTL", 60)
+    get(url)
+    get(url)
+    assert requests == [None]
+
+
+def test_replay_never_requests_and_misses_return_none(cache, site, monkeypatch, capsys):
+    url, requests = site
+    get(url)
+    monkeypatch.setattr(page_cache, "REPLAY", True)
+    assert get(url) == "<html>/listing?page=1</html>"
+    assert get(url.replace("page=1", "page=2")) is None
+    assert requests == [None]
+    assert "Not in page cache" in capsys.readouterr().out
+
+
+class Browser:
+    page_source = "<html>rendered cards</html>"
+
+
+def test_rendered_pages_do_not_overwrite_http_bodies(cache, site, monkeypatch):
+    url, _ = site
+    get(url)
+    assert page_cache.rendered_page(Browser(), url) == Browser.page_source
+    monkeypatch.setattr(page_cache, "REPLAY", True)
+    assert get(url) == "<html>/listing?page=1</html>"
+    assert page_cache.rendered_page(None, url) == Browser.page_source
+
+
+def test_overwriting_a_page_does_not_grow_the_size(cache):
+    for _ in range(5):
+        page_cache.store("https://a.ca/1", "x" * 1000)
+        assert page_cache._cache_size == page_cache.directory_size()
+
+
+def test_least_recently_used_pages_are_evicted(cache, monkeypatch):
+    clock = iter(range(1000, 2000, 10))
+    for n in range(4):
+        page_cache.store(f"https://a.ca/{n}", f"page {n}")
+        _, meta_path = page_cache._paths(f"https://a.ca/{n}")
+        t = next(clock)
+        page_cache.os.utime(meta_path, (t, t))
+    page_cache.load("https://a.ca/0")  # Read again, so page 1 is now the oldest
+    entry = page_cache.directory_size() // 4
+    monkeypatch.setattr(page_cache, "MAX_SIZE", entry * 3 + entry // 2)
+    page_cache.store("https://a.ca/4", "page 4")
+    assert [n for n in range(5) if page_cache.load(f"https://a.ca/{n}")[0] is not None] == [0, 3, 4]
+    assert page_cache._cache_size == page_cache.directory_size()
@@ -0,0 +1,166 @@
+import importlib
+from urllib.parse import urlsplit
+
+import pytest
+
+import metrics
+import page_fingerprint
+import page_ready
+from bench_extract import SITES
+import fixtures
+from fixtures import SYNTHETIC_PAGES
+
+
+LABELS = ("fingerprint-test", "-")
+
+
+@pytest.fixture
+def counters():
+    """Read back the counters recorded while the test ran."""
+    with metrics.context(*LABELS):
+        yield lambda: metrics.take_counters(LABELS)
+    metrics.take_counters(LABELS)
+
+
+def test_fingerprint_is_ordered_and_none_without_links():
+    assert page_fingerprint.fingerprint([]) is None
+    assert page_fingerprint.fingerprint(["/a", "/b"]) == page_fingerprint.fingerprint(iter(["/a", "/b"]))
+    assert page_fingerprint.fingerprint(["/a", "/b"]) != page_fingerprint.fingerprint(["/b", "/a"])
+
+
+def test_html_links_match_the_class_among_others():
+    html = ('<a class="card-link big" href="/1">x</a><a class="card-link-2" href="/2"></a>'
+            "<div class='card-link' href='/3'></div><A CLASS='big card-link' HREF='/4'></A><a class=\"card-link\"></a>")
+    assert page_fingerprint.html_links(html, "a.card-link") == ["/1", "/4"]
+
+
+@pytest.mark.parametrize("site", ["chewy", "petsmart", "homesalive", "renspets"])
+def test_html_links_are_the_parsed_product_links(site):
+    module = importlib.import_module(SITES[site])
+    html = SYNTHETIC_PAGES[site](12)
+    records, _ = module.extract_products(html, "Fixture")
+    links = page_fingerprint.html_links(html, module.LINK_SELECTOR)
+    assert len(links) == 12
+    assert [urlsplit(record['Link']).path for record in records] == [urlsplit(link).path for link in links]
+
+
+def test_repeated_pages_are_reported_once_seen(counters):
+    pages = page_fingerprint.PageFingerprints("site category")
+    assert pages.repeated(1, "f1") is None
+    assert pages.repeated(2, "f2") is None
+    assert pages.repeated(2, "f2") is None  # The same page loaded again is not a repeat
+    assert pages.repeated(3, None) is None  # Nor are pages without product links
+    assert pages.repeated(4, None) is None
+    assert pages.repeated(5, "f1") == 1
+    assert counters() == {"repeated_pages": 1}
+
+
+class Listing:
+    """A driver whose product links change to the next page's after a number of reads."""
+
+    def __init__(self, reads_before_change):
+        self.reads = 0
+        self.reads_before_change = reads_before_change
+
+    def execute_script(self, script, *args):
+        self.reads += 1
+        return ["/a", "/b"] if self.reads <= self.reads_before_change else ["/c", "/d"]
+
+
+@pytest.fixture
+def waits(monkeypatch):
+    monkeypatch.setattr(page_ready, "TIMEOUT", 0.3)
+    monkeypatch.setattr(page_ready, "POLL_FREQUENCY", 0.01)
+    listings = []
+    monkeypatch.setattr(page_ready, "wait_for_listing", lambda driver, *args: listings.append(driver) or True)
+    return listings
+
+
+def new_cards(driver):
+    before = page_fingerprint.fingerprint(["/a", "/b"])
+    return page_fingerprint.wait_for_new_cards(driver, before, "a.card", "div.card", "site")
+
+
+def test_changed_cards_pass_at_once(waits, counters):
+    assert new_cards(Listing(0))
+    assert counters() == {} and waits == []
+
+
+def test_a_stall_is_waited_out(waits, counters):
+    driver = Listing(3)
+    assert new_cards(driver)
+    assert driver.reads > 3
+    assert counters() == {"stalls": 1} and waits == [driver]
+
+
+def test_cards_that_never_change_fail_the_click(waits, counters):
+    assert not new_cards(Listing(10 ** 9))
+    assert counters() == {"stalls": 1, "wait_timeouts": 1} and waits == []
+
+
+def test_nothing_to_compare_passes(waits, counters):
+    assert page_fingerprint.wait_for_new_cards(Listing(10 ** 9), None, "a.card", "div.card", "site")
+    assert counters() == {}
+
+
+class RensPetsBrowser:
+    """A driver showing stand-in rensPets pages: open_page loads a URL's HTML, scripts read its links."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.opened = []
+        self.page_source = None
+
+    def open(self, url):
+        self.opened.append(url)
+        self.page_source = self.pages.get(url, fixtures.page([]))
+
+    def execute_script(self, script, *args):
+        return page_fingerprint.html_links(self.page_source, args[0])
+
+
+@pytest.fixture
+def renspets(scrape_env, monkeypatch):
+    """Scrape a rensPets category from stand-in pages; yields (pages by number, scrape(driver) -> products)."""
+    import dedup
+    import rensPets
+    import site_adapter
+
+    monkeypatch.setattr(site_adapter, "open_page", lambda adapter, driver, url: driver.open(url))
+    monkeypatch.setattr(rensPets.ADAPTER, "extract_in_browser",
+                        lambda driver, category: rensPets.extract_products(driver.page_source, category))
+    base = "https://www.renspets.com/dog-food"
+    url = rensPets.ADAPTER.pagination.url
+
+    def scrape(pages):
+        driver = RensPetsBrowser({url(base, page) if page > 1 else base: html for page, html in pages.items()})
+        products = site_adapter.scrape_category(rensPets.ADAPTER, driver, "Dog Food", base, dedup.DedupIndex())
+        return products, [1 if opened == base else int(opened.rsplit('=', 1)[1]) for opened in driver.opened]
+
+    return scrape
+
+
+def renspets_page(batch):
+    return fixtures.renspets_page(12).replace('/products/food-', f'/products/{batch}-food-')
+
+
+def test_repeated_first_page_is_caught_under_browser_extract(renspets, monkeypatch, counters):
+    import browser_extract
+
+    monkeypatch.setattr(browser_extract, "ENABLED", True)
+    products, opened = renspets({1: renspets_page("a"), 2: renspets_page("b"), 3: renspets_page("a")})
+    assert opened == [1, 2, 3]
+    assert len(products) == 10
+    assert counters()["repeated_pages"] == 1
+
+
+def test_restored_pages_are_fingerprinted(renspets, monkeypatch, counters, scrape_env):
+    renspets({1: renspets_page("a"), 2: renspets_page("b"), 3: fixtures.page([])})
+    # Cut the checkpoint back to the first two pages, as if the run had stopped there
+    path = scrape_env / "checkpoints" / "renspets" / "dog-food.jsonl"
+    path.write_text(''.join(path.read_text().splitlines(keepends=True)[:3]))
+
+    monkeypatch.setattr("checkpoints.RESUME", True)
+    _, opened = renspets({1: renspets_page("a"), 2: renspets_page("b"), 3: renspets_page("a")})
+    assert opened == [3]
+    assert counters()["repeated_pages"] == 1
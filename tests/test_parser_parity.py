@@ -0,0 +1,21 @@
+import importlib
+
+import pytest
+
+import page_parser
+from bench_extract import SITES
+from fixtures import fixture_pages
+
+
+PAGES = [(site, name, html) for site in SITES for name, html in fixture_pages(site)]
+
+
+@pytest.mark.parametrize("site, name, html", PAGES, ids=[f"{site}/{name}" for site, name, _ in PAGES])
+def test_backends_extract_identical_records(parser_backend, site, name, html):
+    extract_products = importlib.import_module(SITES[site]).extract_products
+    parser_backend("html.parser")
+    expected = extract_products(html, "Fixture")
+    assert expected[1] > 0
+    for backend in page_parser.BACKENDS[1:]:
+        parser_backend(backend)
+        assert extract_products(html, "Fixture") == expected, backend
@@ -0,0 +1,21 @@
+import petValu
+from fixtures import page, petvalu_page
+
+
+CARD = ('<div class="product-tile__details"><div class="title"><a href="/product/x">{name}</a></div>'
+        '<div class="price"><p>$5.99</p></div><div class="reviews__information"><p>4.5</p><p>(12)</p></div></div>')
+
+
+def test_card_without_a_name_is_a_parse_failure(capsys):
+    html = page([CARD.format(name="<p>Brand</p><p>Kibble</p>"), CARD.format(name="")])
+    records, count = petValu.extract_products(html, "Dog Food")
+    assert count == 2
+    assert [record['Name'] for record in records] == ["Brand Kibble"]
+    assert "Product name not found" in capsys.readouterr().out
+
+
+def test_card_without_a_link_is_a_parse_failure():
+    html = petvalu_page(2).replace('<a href="/product/food-1">', '<a>')
+    records, count = petValu.extract_products(html, "Dog Food")
+    assert count == 2
+    assert [record['Link'] for record in records] == ["https://www.petvalu.ca/product/food-0"]
@@ -0,0 +1,68 @@
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+import checkpoints
+import dedup
+import petValu
+import site_adapter
+from fixtures import petvalu_page
+
+
+TOTAL = 50
+PER_PAGE = 12
+PAGES = -(-TOTAL // PER_PAGE)
+
+
+@pytest.fixture
+def listing_server(stand_in_server):
+    """A local stand-in for a petvalu.ca category; yields (category URL, list of pages requested)."""
+    requested = []
+
+    def respond(path, headers):
+        page = int(parse_qs(urlsplit(path).query).get('page', ['1'])[0])
+        requested.append(page)
+        first = (page - 1) * PER_PAGE
+        return 200, {}, petvalu_page(max(0, min(PER_PAGE, TOTAL - first)), first, TOTAL)
+
+    return f"{stand_in_server(respond)}/dog/food", requested
+
+
+def scrape(url, page_concurrency, monkeypatch):
+    monkeypatch.setattr(petValu.ADAPTER, "page_concurrency", page_concurrency)
+    return site_adapter.scrape_category(petValu.ADAPTER, None, "Dog Food", url, dedup.DedupIndex(), k=TOTAL)
+
+
+def test_concurrent_fetch_matches_sequential(scrape_env, listing_server, monkeypatch):
+    url, requested = listing_server
+    sequential = scrape(url, 1, monkeypatch)
+    assert sorted(requested) == list(range(1, PAGES + 1))
+    assert len(sequential) == TOTAL
+
+    requested.clear()
+    monkeypatch.setattr("page_cache.CACHE_DIR", str(scrape_env / "cache-concurrent"))
+    assert scrape(url, 4, monkeypatch) == sequential
+    assert sorted(requested) == list(range(1, PAGES + 1))
+
+
+def test_resume_refetches_only_missing_pages(scrape_env, listing_server, monkeypatch):
+    url, requested = listing_server
+    expected = scrape(url, 4, monkeypatch)
+    path = scrape_env / "checkpoints" / "petvalu" / "dog-food.jsonl"
+    lines = path.read_text().splitlines(keepends=True)
+    # Keep the total and the first two pages, as if the run had stopped there
+    path.write_text(''.join(lines[:3]))
+
+    requested.clear()
+    monkeypatch.setattr("page_cache.CACHE_DIR", str(scrape_env / "cache-resume"))
+    monkeypatch.setattr(checkpoints, "RESUME", True)
+    assert scrape(url, 4, monkeypatch) == expected
+    assert sorted(requested) == list(range(3, PAGES + 1))
+
+
+def test_summary_counts_this_category(scrape_env, listing_server, monkeypatch, capsys):
+    url, _ = listing_server
+    seen = dedup.DedupIndex()
+    seen.add({'Category': "Cat Food", 'Link': "https://www.petvalu.ca/product/other"})
+    site_adapter.scrape_category(petValu.ADAPTER, None, "Dog Food", url, seen)
+    assert f"Category: Dog Food, Count: {TOTAL}, Duplicates: 0" in capsys.readouterr().out
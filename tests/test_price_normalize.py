@@ -0,0 +1,47 @@
+import math
+
+import pandas as pd
+import pytest
+
+import price_normalize
+
+
+def row(value, default_currency=None):
+    return price_normalize.normalize_prices([value], default_currency).iloc[0].to_dict()
+
+
+def same(actual, expected):
+    return all(pd.isna(actual[k]) if pd.isna(v) else actual[k] == v for k, v in expected.items())
+
+
+NAN = float("nan")
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("$12.99", {"price_min": 12.99, "price_max": 12.99, "price_regular": 12.99, "price_sale": NAN, "currency": "CAD"}),
+    ("$10.99-$15.99", {"price_min": 10.99, "price_max": 15.99, "price_regular": NAN, "price_sale": NAN}),
+    ("$3 to $4", {"price_min": 3.0, "price_max": 4.0, "price_regular": NAN}),
+    ("$8.99$11.99", {"price_regular": 11.99, "price_sale": 8.99}),
+    ("1,299.00", {"price_regular": 1299.0}),
+    ("$12,99", {"price_regular": 12.99}),
+    ("US$5", {"price_regular": 5.0, "currency": "USD"}),
+])
+def test_parses_formats(value, expected):
+    result = row(value)
+    assert not result["price_unparsed"]
+    assert same(result, expected), result
+
+
+@pytest.mark.parametrize("value", ["N/A", "Conflict in price data", 0, None])
+def test_unparsed_values_are_flagged(value):
+    result = row(value)
+    assert result["price_unparsed"]
+    assert math.isnan(result["price_min"]) and result["currency"] is None
+
+
+def test_default_currency_and_index():
+    df = pd.DataFrame({"Price": ["$1", "€2", "$1"]}, index=[5, 6, 7])
+    out = price_normalize.add_price_columns(df, default_currency="USD")
+    assert list(out.index) == [5, 6, 7]
+    assert list(out["currency"]) == ["USD", "EUR", "USD"]
+    assert list(out["price_regular"]) == [1.0, 2.0, 1.0]
@@ -0,0 +1,108 @@
+import pandas as pd
+
+import product_match
+
+
+def parse(name):
+    return product_match.normalize_name(name)
+
+
+def test_normalize_name_reads_sizes_in_grams():
+    assert parse("Acana Wild Prairie Dry Cat Food, 4.5-kg bag").size == 4500.0
+    assert parse("Orijen Original Dog Food 25 lbs").size == 25 * 453.592
+    assert parse("Weruva Paw Lickin' Chicken 3oz").size == 3 * 28.3495
+    name = parse("Nutro Gravy Topper 1.5 L")
+    assert (name.size, name.unit) == (1500.0, "ml")
+    assert "5" not in parse("Acana Wild Prairie Dry Cat Food, 4.5-kg bag").tokens
+
+
+def test_normalize_name_reads_pack_counts():
+    assert parse("Fancy Feast Pate 24 x 85g").pack == 24
+    assert parse("Whiskas Tuna Pouches, 12-pack").pack == 12
+    assert parse("Sheba Perfect Portions Case of 36").pack == 36
+    assert parse("Greenies Dental Treats 1 count").pack is None
+
+
+def test_normalize_name_finds_brands_and_their_aliases():
+    assert parse("Purina Pro Plan Adult Chicken").brand == "purina pro plan"
+    assert parse("Pro Plan Adult Chicken").brand == "purina pro plan"
+    assert parse("Hills Science Diet Adult").brand == parse("Hill’s Science Diet Adult").brand == "hill's science diet"
+    # An unknown brand is the first word that is not a stopword
+    assert parse("The Acme Crunchy Bites").brand == "acme"
+    assert "pro" not in parse("Pro Plan Adult Chicken").tokens
+
+
+def test_normalize_name_splits_joined_words_and_spells_out_abbreviations():
+    name = parse("Royal Canin FelineAdult-SpecIndoorHairball™ 3.5lb")
+    assert name.brand == "royal canin"
+    assert {"cat", "adult", "specialized", "indoor", "hairball"} <= name.tokens
+    assert (name.species, name.life_stage) == ("cat", "adult")
+
+
+def test_compatible_accepts_the_same_product_in_other_words():
+    assert product_match.compatible(parse("Purina Pro Plan Adult Chicken & Rice Dry Dog Food, 15.9-kg"),
+                                    parse("Pro Plan Adult Chicken Rice Formula Dry Dog Food 35 lbs"))
+    # Facts only one name states never contradict
+    assert product_match.compatible(parse("Orijen Fit & Trim Cat Food"), parse("Orijen Fit & Trim Dry Cat Food 5.4 kg"))
+
+
+def test_compatible_rejects_contradicting_names():
+    base = parse("Acana Adult Chicken Dry Dog Food 6 kg")
+    for other in ["Orijen Adult Chicken Dry Dog Food 6 kg",  # brand
+                  "Acana Adult Chicken Dry Dog Food 11.4 kg",  # size
+                  "Acana Adult Chicken Dry Dog Food 6 L",  # unit
+                  "Acana Puppy Chicken Dry Dog Food 6 kg",  # life stage
+                  "Acana Adult Chicken Dry Cat Food 6 kg",  # species
+                  "Acana Adult Chicken Wet Dog Food 6 kg",  # form
+                  "Acana Adult Lamb Dry Dog Food 6 kg"]:  # flavour
+        assert not product_match.compatible(base, parse(other)), other
+    assert not product_match.compatible(parse("Sheba Pate 12 x 85g"), parse("Sheba Pate 24 x 85g"))
+    assert product_match.compatible(base, parse("Acana Adult Chicken Dry Dog Food 6.1 kg"))
+
+
+def test_candidate_pairs_only_pairs_names_sharing_rare_keys_across_retailers():
+    names = [parse(f"Brand{i} Word{i}a Word{i}b") for i in range(300)] * 2
+    retailers = ["a"] * 300 + ["b"] * 300
+    assert sorted(product_match.candidate_pairs(names, retailers)) == [(i, i + 300) for i in range(300)]
+    # The same retailer's listings are never candidates
+    assert list(product_match.candidate_pairs(names[:300] * 2, ["a"] * 600)) == []
+
+
+def test_candidate_pairs_skips_keys_held_by_too_many_names(monkeypatch):
+    monkeypatch.setattr(product_match, "MAX_POSTING", 10)
+    names = [parse(f"Acme Crunchy Bites Item{i}") for i in range(40)]
+    retailers = ["a", "b"] * 20
+    assert list(product_match.candidate_pairs(names, retailers)) == []
+    monkeypatch.setattr(product_match, "MAX_POSTING", 400)
+    assert len(list(product_match.candidate_pairs(names, retailers))) == 20 * 20
+
+
+def test_add_product_ids_groups_across_retailers_one_listing_each():
+    df = pd.DataFrame({
+        'retailer': ["chewy", "petsmart", "petvalu", "petvalu", "chewy", "chewy"],
+        'name': ["Orijen Original Dry Dog Food 11.4 kg",
+                 "ORIJEN Original Dog Food, 11.4kg",
+                 "Orijen Original Dry Dog Food 11.4 kg bag",
+                 "Orijen Original Dry Dog Food 11.4-kg",
+                 "Acana Wild Prairie Dry Cat Food 4.5 kg",
+                 "Orijen Original Dry Dog Food 11.4 kg"],
+        'link': ["https://www.chewy.com/ca/dp/1", "https://www.petsmart.ca/p/9", "https://petvalu.ca/p/1",
+                 "https://petvalu.ca/p/2", "https://www.chewy.com/ca/dp/2", "https://chewy.com/ca/dp/1/?utm_source=x"],
+    })
+    ids = product_match.add_product_ids(df)['product_id'].tolist()
+    # One listing per retailer joins the group; petvalu's second listing stays apart
+    assert ids[0] == ids[1] == ids[2]
+    assert ids[3] != ids[0]
+    assert ids[4] not in (ids[0], ids[3])
+    # The same retailer and canonical link is the same listing
+    assert ids[5] == ids[0]
+    # IDs come from the listings, so a later run over the same listings gives the same ones
+    assert product_match.add_product_ids(df.copy())['product_id'].tolist() == ids
+
+
+def test_union_find_never_joins_sets_sharing_a_label():
+    groups = product_match.UnionFind(["a", "b", "a", "c"])
+    assert groups.union(0, 1)
+    assert not groups.union(1, 2)
+    assert groups.union(2, 3)
+    assert groups.find(0) == groups.find(1) != groups.find(2) == groups.find(3)
@@ -0,0 +1,148 @@
+import pytest
+import requests
+
+import rate_limit
+
+
+class Clock:
+    """Stands in for the time module inside rate_limit: sleeping moves the clock on at once."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit, "time", clock)
+    monkeypatch.setattr(rate_limit.random, "uniform", lambda low, high: high)
+    monkeypatch.setattr(rate_limit, "_limiters", {})
+    return clock
+
+
+def test_rate_rises_on_quick_responses_and_drops_on_slow_ones(clock):
+    limiter = rate_limit.HostLimiter("a.ca", rate=1.0, max_rate=1.25)
+    limiter.success(0.5)
+    assert limiter.rate == pytest.approx(1.1)
+    limiter.success(0.5)
+    limiter.success(0.5)
+    assert limiter.rate == 1.25
+    limiter.success(rate_limit.TARGET_LATENCY + 1)
+    assert limiter.rate == pytest.approx(1.0)
+    limiter.success(rate_limit.TARGET_LATENCY + 1, target=rate_limit.TARGET_LATENCY + 2)
+    assert limiter.rate == pytest.approx(1.1)
+    for _ in range(100):
+        limiter.failed()
+    assert limiter.rate == rate_limit.MIN_RATE
+
+
+def test_throttling_halves_the_rate_and_pauses_the_host(clock):
+    limiter = rate_limit.HostLimiter("a.ca", rate=2.0)
+    limiter.throttled(30)
+    assert limiter.rate == 1.0
+    limiter.acquire()
+    assert clock.now == pytest.approx(1030)
+
+
+def test_tokens_pace_requests_after_the_burst(clock):
+    limiter = rate_limit.HostLimiter("a.ca", rate=0.5)
+    for _ in range(rate_limit.BURST + 2):
+        limiter.acquire()
+    assert clock.now == pytest.approx(1000 + 2 / 0.5)
+
+
+def test_backoff_doubles_up_to_the_cap(clock):
+    assert [rate_limit.backoff(attempt) for attempt in range(3)] == [4.0, 8.0, 16.0]
+    assert rate_limit.backoff(20) == rate_limit.BACKOFF_CAP
+
+
+@pytest.mark.parametrize("html, challenge", [
+    ("<html><head><title>Just a moment...</title></head></html>", True),
+    ("<title>Access to this page has been denied</title>", True),
+    ("<TITLE>Pardon Our Interruption</TITLE>", True),
+    ("<title>Dog Food | Chewy</title>", False),
+    ("<html>no title</html>", False),
+])
+def test_challenge_pages_are_told_apart_by_title(html, challenge):
+    assert rate_limit.is_challenge(html) == challenge
+
+
+class Response:
+    def __init__(self, status, text="<title>Dog Food</title>", headers=None):
+        self.status_code = status
+        self.text = text
+        self.headers = headers or {}
+
+
+class Session:
+    """Answers each GET with the next response and moves the clock on by latency."""
+
+    def __init__(self, clock, responses, latency=0.1):
+        self.clock = clock
+        self.responses = list(responses)
+        self.latency = latency
+
+    def get(self, url, **kwargs):
+        self.clock.now += self.latency
+        return self.responses.pop(0)
+
+
+def test_throttled_request_is_retried_after_retry_after(clock):
+    session = Session(clock, [Response(429, headers={'Retry-After': "60"}), Response(200)])
+    assert rate_limit.get(session, "https://a.ca/1").status_code == 200
+    limiter = rate_limit.limiter_for("https://a.ca/1")
+    assert limiter.rate == pytest.approx(rate_limit.INITIAL_RATE * rate_limit.THROTTLE_FACTOR + rate_limit.INCREASE)
+    assert clock.now >= 1060
+
+
+def test_challenge_page_is_throttled_then_raised(clock):
+    session = Session(clock, [Response(200, "<title>Just a moment...</title>")] * (rate_limit.MAX_RETRIES + 1))
+    with pytest.raises(requests.exceptions.HTTPError):
+        rate_limit.get(session, "https://a.ca/1")
+
+
+def test_server_errors_are_retried_and_the_last_is_a_failure(clock):
+    session = Session(clock, [Response(500)] * (rate_limit.MAX_RETRIES + 1))
+    assert rate_limit.get(session, "https://a.ca/1").status_code == 500
+    assert clock.slept[:2] == [4.0, 8.0]
+    assert rate_limit.limiter_for("https://a.ca/1").rate == pytest.approx(
+        rate_limit.INITIAL_RATE * rate_limit.SLOW_FACTOR)
+
+
+class Browser:
+    """A driver whose page takes `load` seconds to open and reports `first_byte` ms to first byte."""
+
+    title = "Dog Food"
+
+    def __init__(self, clock, load, first_byte):
+        self.clock = clock
+        self.load = load
+        self.first_byte = first_byte
+
+    def get(self, url):
+        self.clock.now += self.load
+
+    def execute_script(self, script, *args):
+        return self.first_byte
+
+
+def test_browser_loads_are_rated_by_time_to_first_byte(clock):
+    slow_widgets = lambda: clock.sleep(6) or True  # Settle and a widget wait that times out
+    for _ in range(14):
+        assert rate_limit.browser_get(Browser(clock, 1.0, 200), "https://a.ca/1", slow_widgets)
+    assert rate_limit.limiter_for("https://a.ca/1").rate == pytest.approx(rate_limit.INITIAL_RATE + 14 * rate_limit.INCREASE)
+
+
+def test_browser_loads_without_timing_use_the_browser_target(clock):
+    rate_limit.browser_get(Browser(clock, 5.0, None), "https://a.ca/1", lambda: True)
+    assert rate_limit.limiter_for("https://a.ca/1").rate > rate_limit.INITIAL_RATE
+    rate_limit.browser_get(Browser(clock, rate_limit.BROWSER_TARGET_LATENCY + 1, None), "https://a.ca/2", lambda: True)
+    assert rate_limit.limiter_for("https://a.ca/2").rate < rate_limit.INITIAL_RATE
@@ -0,0 +1,100 @@
+import datetime
+import types
+
+import pytest
+
+import snapshot_store
+
+
+class Clock(datetime.datetime):
+    """datetime.datetime with a settable now(), standing in for the scrape time."""
+
+    current = None
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_store, "datetime", types.SimpleNamespace(datetime=Clock, timezone=datetime.timezone))
+    writer = snapshot_store.SnapshotWriter(str(tmp_path / "snapshots.db"), batch_size=1000)
+    yield writer
+    writer.connection.close()
+
+
+def scrape(writer, when, pages, retailer="chewy", category="Dry Food"):
+    """Record pages of (name, review, price) as one day's scrape of a category."""
+    Clock.current = datetime.datetime.fromisoformat(when).replace(tzinfo=datetime.timezone.utc)
+    for page in pages:
+        writer.write(retailer, category, [{'Name': name, 'Link': f"https://www.chewy.com/ca/dp/{name}",
+                                           'Review': review, 'Rating': 4.5, 'Price': price}
+                                          for name, review, price in page])
+    writer.release(retailer, category)
+    writer.flush()
+
+
+def rows(writer, query):
+    return [tuple(row) for row in writer.connection.execute(query)]
+
+
+def test_database_is_in_wal_mode(store):
+    assert store.connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_same_day_rescrape_updates_that_days_snapshot(store):
+    scrape(store, "2026-03-01T08:00:00", [[("a", 10, "$20.00"), ("b", 5, "$10.00")]])
+    scrape(store, "2026-03-01T20:00:00", [[("b", 6, "$9.00"), ("a", 11, "$20.00")]])
+    assert rows(store, "SELECT link, snapshot, rank, review, price_min FROM listings ORDER BY link") == [
+        ("chewy.com/ca/dp/a", "2026-03-01", 2, 11, 20.0),
+        ("chewy.com/ca/dp/b", "2026-03-01", 1, 6, 9.0)]
+    assert rows(store, "SELECT scraped_at FROM listings") == [("2026-03-01T20:00:00+00:00",)] * 2
+    assert rows(store, "SELECT first_seen, last_seen FROM products") == [("2026-03-01", "2026-03-01")] * 2
+
+
+def test_repeated_product_keeps_its_first_rank_across_pages(store):
+    scrape(store, "2026-03-01T08:00:00", [[("a", 1, "$1.00"), ("b", 1, "$1.00")], [("a", 1, "$1.00"), ("c", 1, "$1.00")]])
+    assert rows(store, "SELECT link, rank FROM listings ORDER BY rank") == [
+        ("chewy.com/ca/dp/a", 1), ("chewy.com/ca/dp/b", 2), ("chewy.com/ca/dp/c", 3)]
+
+
+@pytest.fixture
+def two_days(store):
+    scrape(store, "2026-03-01T12:00:00", [[("a", 100, "$50.00"), ("b", 10, "$20.00"), ("c", 40, "$8.00")]])
+    scrape(store, "2026-03-03T12:00:00", [[("c", 60, "$8.00"), ("a", 104, "$40.00"), ("b", 10, "$22.00")]])
+    scrape(store, "2026-03-03T12:00:00", [[("d", 1, "$5.00")]], retailer="petsmart")
+    return store.connection
+
+
+def test_price_changes_largest_relative_change_first(two_days):
+    changes = snapshot_store.price_changes(two_days)
+    assert [(row['name'], row['old_price'], row['new_price'], row['change_pct']) for row in changes] == [
+        ("a", 50.0, 40.0, -20.0), ("b", 20.0, 22.0, 10.0)]
+    assert snapshot_store.price_changes(two_days, retailer="petsmart") == []
+
+
+def test_review_velocity_is_reviews_gained_per_day(two_days):
+    gained = snapshot_store.review_velocity(two_days)
+    assert [(row['name'], row['gained'], row['per_day']) for row in gained] == [("c", 20, 10.0), ("a", 4, 2.0)]
+
+
+def test_rank_movers_biggest_move_first(two_days):
+    moved = snapshot_store.rank_movers(two_days)
+    moves = [(row['name'], row['old_rank'], row['new_rank'], row['moved']) for row in moved]
+    assert moves[0] == ("c", 3, 1, 2)
+    assert sorted(moves[1:]) == [("a", 1, 2, -1), ("b", 2, 3, -1)]
+    assert [row['name'] for row in snapshot_store.rank_movers(two_days, min_move=2)] == ["c"]
+    assert snapshot_store.rank_movers(two_days, category="Wet Food") == []
+
+
+def test_comparisons_default_to_the_last_two_snapshots(two_days, store):
+    scrape(store, "2026-03-05T12:00:00", [[("a", 104, "$45.00")]])
+    assert snapshot_store.snapshots(two_days) == ["2026-03-01", "2026-03-03", "2026-03-05"]
+    assert [row['new_price'] for row in snapshot_store.price_changes(two_days)] == [45.0]
+    assert [row['new_price'] for row in snapshot_store.price_changes(two_days, old="2026-03-01")] == [45.0]
+
+
+def test_comparisons_need_two_snapshots(store):
+    scrape(store, "2026-03-01T12:00:00", [[("a", 1, "$1.00")]])
+    assert snapshot_store.price_changes(store.connection) == []
@@ -0,0 +1,166 @@
+import importlib
+import json
+from urllib.parse import urlsplit
+
+import pytest
+
+import site_adapter
+import structured_data
+from bench_extract import SITES
+from fixtures import SYNTHETIC_PAGES, json_ld
+
+
+BROWSER_SITES = ["chewy", "petsmart", "homesalive", "renspets"]
+PAGE_URL = "https://www.example.ca/c/dog-food?page=2"
+
+
+def schema_product(record):
+    """The schema.org Product a retailer would embed for a record its card parser produced."""
+    rating = {"reviewCount": record['Review']}
+    if 'Rating' in record:
+        rating["ratingValue"] = record['Rating']
+    return {"@type": "Product", "name": f" {record['Name']} ", "url": urlsplit(record['Link']).path,
+            "aggregateRating": rating, "offers": {"@type": "Offer", "price": record['Price'].lstrip('$')}}
+
+
+@pytest.mark.parametrize("site", BROWSER_SITES)
+def test_card_only_pages_fall_back(site):
+    module = importlib.import_module(SITES[site])
+    assert module.extract_structured(SYNTHETIC_PAGES[site](), "Fixture", PAGE_URL) is None
+
+
+@pytest.mark.parametrize("site", BROWSER_SITES)
+def test_structured_records_match_card_records(site):
+    module = importlib.import_module(SITES[site])
+    html = SYNTHETIC_PAGES[site](12)
+    records, count = module.extract_products(html, "Fixture")
+    page_url = f"https://{urlsplit(records[0]['Link']).netloc}/listing"
+    html = html.replace("</head>", json_ld([schema_product(r) for r in records]) + "</head>")
+    assert module.extract_structured(html, "Fixture", page_url) == (records, count)
+
+
+def test_extract_page_uses_structured_data_only_on_the_fast_path(monkeypatch):
+    module = importlib.import_module(SITES["petsmart"])
+    html = SYNTHETIC_PAGES["petsmart"](4)
+    cards = module.extract_products(html, "Fixture")
+    embedded = html.replace("</head>", json_ld([{"name": "Only", "url": "/only", "offers": {"price": 1}}]) + "</head>")
+    assert site_adapter.extract_page(embedded, "Fixture", PAGE_URL, module.extract_products,
+                                     module.extract_structured) == cards
+    monkeypatch.setattr(structured_data, "FAST_PATH", True)
+    records, count = site_adapter.extract_page(embedded, "Fixture", PAGE_URL, module.extract_products,
+                                               module.extract_structured)
+    assert count == 1 and records[0]['Link'] == "https://www.example.ca/only"
+    assert site_adapter.extract_page(html, "Fixture", PAGE_URL, module.extract_products,
+                                     module.extract_structured) == cards
+
+
+def test_records_prices_and_repeats():
+    html = json_ld([
+        {"@type": "Product", "name": "A", "url": "/a", "aggregateRating": {"ratingValue": "4.5", "ratingCount": "12"},
+         "offers": [{"price": "9.5"}]},
+        {"@type": "Product", "name": "B", "url": "https://other.ca/b", "offers": {"lowPrice": 3, "highPrice": 7}},
+        {"@type": "Product", "name": "C", "url": "/c"},
+        {"@type": "Product", "url": "/no-name"},
+    ]) + json_ld([{"@type": "Product", "name": "A again", "url": "/a"}])
+    records, count = structured_data.product_records(html, "Dog", PAGE_URL)
+    assert count == 3
+    assert records == [
+        {'Category': "Dog", 'Name': "A", 'Link': "https://www.example.ca/a", 'Review': 12, 'Rating': 4.5, 'Price': "$9.50"},
+        {'Category': "Dog", 'Name': "B", 'Link': "https://other.ca/b", 'Review': 0, 'Rating': 0.0, 'Price': "$3.00-$7.00"},
+        {'Category': "Dog", 'Name': "C", 'Link': "https://www.example.ca/c", 'Review': 0, 'Rating': 0.0, 'Price': "N/A"},
+    ]
+
+
+def test_empty_item_list_is_an_empty_page():
+    assert structured_data.product_records(json_ld([]), "Dog", PAGE_URL) == ([], 0)
+    assert structured_data.product_records('<script type="application/ld+json">{bad</script>', "Dog", PAGE_URL) is None
+
+
+def link_list(urls):
+    """An ItemList of bare ListItems, the links-only markup many listings carry for search engines."""
+    items = [{"@type": "ListItem", "position": i + 1, "url": url} for i, url in enumerate(urls)]
+    return f'<script type="application/ld+json">{json.dumps({"@type": "ItemList", "itemListElement": items})}</script>'
+
+
+def test_link_only_item_list_is_not_a_page():
+    assert structured_data.product_records(link_list(["/a", "/b"]), "Dog", PAGE_URL) is None
+
+
+def listing(names):
+    return json_ld([{"name": n, "url": f"/{n}", "offers": {"price": 1}} for n in names])
+
+
+@pytest.fixture
+def site(scrape_env, stand_in_server):
+    """A local stand-in serving {page: (status, body)} at /c?page=N; yields (pages, base URL, pages requested)."""
+    pages, requested = {}, []
+
+    def respond(path, headers):
+        page = int(path.rsplit('=', 1)[1])
+        requested.append(page)
+        status, body = pages.get(page, (404, "Not found"))
+        return status, {}, body
+
+    return pages, stand_in_server(respond), requested
+
+
+def read(site, on_page=None):
+    pages, base_url, _ = site
+    seen = []
+
+    def keep(page, records, count):
+        seen.append((page, [r['Name'] for r in records]))
+        return on_page(page) if on_page else False
+
+    result = structured_data.read_pages(
+        lambda page: f"{base_url}/c?page={page}" if page <= 4 else None, 1,
+        lambda html, url: structured_data.product_records(html, "Dog", url), keep)
+    return result, seen
+
+
+def test_read_pages_stops_at_an_empty_page(site):
+    site[0].update({1: (200, listing("ab")), 2: (200, listing("c")), 3: (200, json_ld([]))})
+    assert read(site) == ((4, True), [(1, ["a", "b"]), (2, ["c"]), (3, [])])
+    assert site[2] == [1, 2, 3]
+
+
+def test_read_pages_stops_at_a_repeated_page(site):
+    site[0].update({1: (200, listing("ab")), 2: (200, listing("ba"))})
+    assert read(site) == ((2, True), [(1, ["a", "b"])])
+
+
+@pytest.mark.parametrize("status, body", [
+    (200, "<html>cards drawn by the front end</html>"),
+    (200, link_list(["/x"])),
+    (404, "Not found"),
+])
+def test_read_pages_hands_over_to_the_browser(site, status, body):
+    site[0].update({1: (200, listing("ab")), 2: (status, body)})
+    assert read(site) == ((2, False), [(1, ["a", "b"])])
+
+
+def test_read_pages_hands_over_at_a_page_without_its_own_url(site):
+    site[0].update({page: (200, listing(str(page))) for page in range(1, 6)})
+    assert read(site) == ((5, False), [(page, [str(page)]) for page in range(1, 5)])
+
+
+def test_read_pages_stops_when_on_page_is_done(site):
+    site[0].update({1: (200, listing("ab")), 2: (200, listing("cd"))})
+    assert read(site, on_page=lambda page: True) == ((2, True), [(1, ["a", "b"])])
+
+
+class Browser:
+    page_source = "<html>rendered</html>"
+
+
+@pytest.mark.parametrize("page, rendered", [(1, False), (2, True), (3, True)])
+def test_load_page_renders_only_pages_without_product_data(site, monkeypatch, page, rendered):
+    site[0].update({1: (200, listing("ab")), 2: (200, link_list(["/a"]))})
+    opened = []
+    monkeypatch.setattr(structured_data, "FAST_PATH", True)
+    monkeypatch.setattr(site_adapter, "open_page", lambda adapter, driver, url: opened.append(url))
+    adapter = importlib.import_module(SITES["petsmart"]).ADAPTER
+    url = f"{site[1]}/c?page={page}"
+    html = site_adapter.load_page(adapter, Browser(), url)
+    assert opened == ([url] if rendered else [])
+    assert (html == Browser.page_source) == rendered
@@ -0,0 +1,63 @@
+import pytest
+
+import cli
+import top_k
+
+
+def product(name, review=0, rating=0.0):
+    return {'Name': name, 'Review': review, 'Rating': rating}
+
+
+def names(products):
+    return [p['Name'] for p in products]
+
+
+@pytest.mark.parametrize("rank_by", sorted(top_k.RANKINGS))
+def test_matches_stable_sort_and_slice(rank_by):
+    products = [product(f"p{i}", review=(i * 7) % 5, rating=(i * 3) % 4) for i in range(40)]
+    heap = top_k.TopK(10, rank_by)
+    heap.extend(products)
+    expected = sorted(products, key=top_k.RANKINGS[rank_by], reverse=True)[:10]
+    assert heap.results() == expected
+
+
+def test_ties_keep_the_order_they_were_added_in():
+    heap = top_k.TopK(3, "Review")
+    heap.extend([product("a", 5), product("b", 5), product("c", 5), product("d", 5)])
+    assert names(heap.results()) == ["a", "b", "c"]
+    assert heap.threshold() == 5
+
+
+def test_push_with_key_replaces_and_keeps_tie_place():
+    heap = top_k.TopK(3, "Review")
+    heap.push(product("a", 5), key="a")
+    heap.push(product("b", 5), key="b")
+    heap.push(product("a2", 5), key="a")
+    assert names(heap.results()) == ["a2", "b"]
+    assert len(heap) == 2
+
+
+def test_evicted_key_can_come_back():
+    heap = top_k.TopK(1, "Review")
+    heap.push(product("a", 1), key="a")
+    heap.push(product("b", 2), key="b")
+    heap.push(product("a", 3), key="a")
+    assert names(heap.results()) == ["a"]
+
+
+def test_defaults_are_read_at_construction(monkeypatch):
+    monkeypatch.setattr(top_k, "TOP_K", 2)
+    monkeypatch.setattr(top_k, "RANK_BY", "Rating")
+    heap = top_k.TopK()
+    heap.extend([product("a", 9, 1.0), product("b", 1, 5.0), product("c", 5, 3.0)])
+    assert names(heap.results()) == ["b", "c"]
+    assert heap.threshold() == 3.0
+
+
+@pytest.mark.parametrize("value", ["0", "-3"])
+def test_top_k_option_rejects_values_below_one(value, capsys):
+    parser = cli.build_parser("test")
+    with pytest.raises(SystemExit):
+        parser.parse_args(["--top-k", value])
+    assert "must be at least 1" in capsys.readouterr().err
+    assert parser.parse_args(["--top-k", "1"]).top_k == 1
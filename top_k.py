@@ -0,0 +1,89 @@
+import heapq
+import itertools
+import math
+
+
+# How many products to keep per category, and what to rank them by
+TOP_K = 10
+RANK_BY = "Review"
+
+
+def review_score(product):
+    """Rank by number of reviews."""
+    return product.get('Review', 0)
+
+
+def rating_score(product):
+    """Rank by average rating."""
+    return product.get('Rating', 0)
+
+
+def weighted_score(product):
+    """Rank by rating weighted by how many reviews back it up."""
+    return product.get('Rating', 0) * math.log1p(product.get('Review', 0))
+
+
+RANKINGS = {
+    "Review": review_score,
+    "Rating": rating_score,
+    "Weighted": weighted_score
+}
+
+
+class TopK:
+    """Keep the k best products seen so far in a bounded min-heap.
+
+    Products with equal scores keep the order they were added in, so the result
+    is the same as sorting the whole list (stable, descending) and slicing [:k].
+    Pushing with a key replaces the product held under that key, if any, and
+    keeps its place in the tie order.
+    """
+
+    def __init__(self, k=None, rank_by=None):
+        # Defaults are read when the heap is made, so the command line's choice applies
+        self.k = TOP_K if k is None else k
+        self.rank_by = rank_by or RANK_BY
+        rank_by = self.rank_by
+        self.score = RANKINGS[rank_by] if isinstance(rank_by, str) else rank_by
+        self._heap = []  # (score, -sequence, key, product); the weakest entry is at the top
+        self._entries = {}  # key -> heap entry, for products pushed with a key
+        self._sequence = itertools.count()
+        self.seen = 0
+        self.changes = 0  # Pushes that changed the held products
+
+    def push(self, product, key=None):
+        """Offer a product; it is kept only if it ranks in the current top k."""
+        self.seen += 1
+        order = -next(self._sequence)
+        if key is not None and key in self._entries:
+            previous = self._entries.pop(key)
+            order = previous[1]
+            self._heap.remove(previous)
+            heapq.heapify(self._heap)
+        entry = (self.score(product), order, key, product)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            evicted = heapq.heapreplace(self._heap, entry)
+            self._entries.pop(evicted[2], None)
+        else:
+            return
+        self.changes += 1
+        if key is not None:
+            self._entries[key] = entry
+
+    def extend(self, products):
+        """Offer several products in order."""
+        for product in products:
+            self.push(product)
+
+    def threshold(self):
+        """The score a product must beat to enter the top k, or None while fewer than k are held."""
+        return self._heap[0][0] if len(self._heap) >= self.k else None
+
+    def results(self):
+        """Return the current top k, best first. Safe to call mid-run for partial results."""
+        return [product for _, _, _, product in sorted(self._heap, key=lambda e: e[:2], reverse=True)]
+
+    def __len__(self):
+        return len(self._heap)